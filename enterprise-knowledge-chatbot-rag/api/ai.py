@@ -1,7 +1,7 @@
 import os
-import requests
 from typing import List, Tuple
 
+from api import ollama_client
 from api.learning import (
     get_learned_answer,
     save_pending
@@ -10,7 +10,6 @@ from api.learning import (
 # =========================
 # CONFIG
 # =========================
-OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api/chat")
 MODEL = os.getenv("MODEL", "llama3")
 
 FAIL_KEYWORDS = [
@@ -113,14 +112,8 @@ PERTANYAAN USER:
     # 5️⃣ CALL OLLAMA
     # =========================
     try:
-        r = requests.post(
-            OLLAMA_URL,
-            json=payload,
-            timeout=120
-        )
-        r.raise_for_status()
-
-        answer = r.json()["message"]["content"]
+        data = ollama_client.chat(payload)
+        answer = data["message"]["content"]
 
         # =========================
         # 6️⃣ DETECT FAILED AI ANSWER
@@ -1,23 +1,36 @@
 import json
-from typing import Tuple
-
-from api.search import search_products
-from api.ollama import ask_ollama
+import asyncio
+from typing import AsyncIterator, Tuple
+
+from api.search import search_products, normalize as normalize_query
+from api.ollama import (
+    ask_ollama, ask_ollama_async, stream_tokens,
+    TIMEOUT_ANSWER, UNAVAILABLE_ANSWER, EMPTY_ANSWER, BUSY_ANSWER,
+)
 from api.learning import get_learned_answer, save_pending
 
-from core.router import route_query
+from core.router import route_query, route_scored
+from core.fanout import retrieve_all, aretrieve_all, contexts as domain_contexts
 from core.engine import Engine
-from core.composer import CSComposer
-
-from knowledge.products.retriever import ProductRetriever
-from knowledge.profile.retriever import ProfileRetriever
-
-from api.product_engine import handle_product_flow
-from api.sop_engine import handle_sop_flow
-from api.profile_engine import handle_profile_flow
+from core.composer import CSComposer, BUSY_CONTEXT_PREFIX
+
+from core.retriever import get_retriever
+from core.reranker import reranker
+from core.embeddings import embed, embed_async
+from core.answer_cache import answer_cache
+from core.telemetry import stage, traced
+from core.llm_scheduler import llm_lane
+
+from api.product_engine import (
+    handle_product_flow, handle_product_flow_async, remember_products, last_products,
+    answer_price,
+)
+from api.sop_engine import handle_sop_flow, handle_sop_flow_async
+from api.profile_engine import handle_profile_flow, handle_profile_flow_async
 from api.general_engine import handle_general_flow
-from core.context_builder import ContextBuilder
+from core.context_builder import ContextBuilder, doc_text
 from core.confidence import log_confidence_event
+from config import RERANK_CANDIDATES
 
 
 
@@ -30,70 +43,42 @@ print("🔥 CHAT_ENGINE CLEAN VERSION LOADED 🔥")
 context_builder = ContextBuilder() # ✅ BARU
 rag_composer = CSComposer()
 
-product_retriever = ProductRetriever()
-profile_retriever = ProfileRetriever()
+# view murah di atas core.vectorstore.registry (index dimuat sekali, lazy)
+# produk: over-retrieve kandidat → reranker memilih PRODUCT_TOP_K untuk konteks
+PRODUCT_TOP_K = 5
+product_retriever = get_retriever(
+    "product", top_k=RERANK_CANDIDATES if reranker.enabled else PRODUCT_TOP_K
+)
+profile_retriever = get_retriever("profile", top_k=5)
+
+# top_k per domain untuk fan-out retrieval (embed sekali, search paralel)
+FANOUT_TOP_K = {"sop": 5, "profile": 5, "product": product_retriever.top_k}
 
-# =========================
-# USER MEMORY (FOLLOW-UP)
-# =========================
-USER_LAST_PRODUCTS = {}
+
+def _retrieve_products(message: str) -> list:
+    results = product_retriever.retrieve(message, with_score=True)
+    return reranker.rerank(message, results, PRODUCT_TOP_K)
 
 
 # =========================
 # RAG HANDLER
 # =========================
-def _handle_rag(message: str):
-    docs = product_retriever.retrieve(message)
-    if not docs:
-        return None
+RAG_HANDLER_MAX_TOKENS = 350  # ≈ 1200 karakter (batas UX lama)
 
-    context = context_builder.build(docs)
-    if not context:
-        return None
 
-    # =========================
-    # 🛠️ CLEAN CONTEXT (PRODUCT)
-    # =========================
-    cleaned_lines = []
-
-    for line in context.splitlines():
-        l = line.strip()
-        if not l:
-            continue
-
-        l_lower = l.lower()
-
-        # ❌ buang footer / header / navigasi web
-        if any(x in l_lower for x in [
-            "empowering your tomorrow",
-            "contact us",
-            "hak cipta",
-            "copyright",
-            "building",
-            "home about",
-            "news articles",
-            "follow information",
-            "syarat & ketentuan",
-            "kebijakan & privasi",
-            "©"
-        ]):
-            continue
-
-        # ❌ buang produk lain (biar fokus)
-        if "cni ginseng" in l_lower:
-            continue
-
-        cleaned_lines.append(l)
-
-    if not cleaned_lines:
+def _handle_rag(message: str):
+    # chunk terbaik di depan → yang tidak muat budget adalah yang terlemah
+    docs = [doc for doc, _ in _retrieve_products(message)]
+    if not docs:
         return None
 
-    cleaned_context = "\n".join(cleaned_lines)
+    # boilerplate sudah dibuang saat ingestion (core.text_cleaning)
+    # ❌ buang produk lain (biar fokus)
+    docs = [d for d in docs if "cni ginseng" not in doc_text(d).lower()]
 
-    # =========================
-    # ✂️ BATASI PANJANG (UX)
-    # =========================
-    return cleaned_context[:1200]
+    # ✂️ BATASI PANJANG (UX): dedupe + pack per token
+    context = context_builder.build(docs, max_tokens=RAG_HANDLER_MAX_TOKENS)
+    return context or None
 
 
 # =========================
@@ -110,9 +95,192 @@ def confidence_label(score: float) -> str:
 
 
 
+# =========================
+# PRODUCT RAG (CONFIDENCE POLICY)
+# =========================
+# Threshold cosine similarity: valid karena semua store memakai
+# kontrak index yang sama (core.vectorstore, manifest.json)
+HIGH_CONF = 0.75
+MEDIUM_CONF = 0.60
+
+NO_DATA_ANSWER = (
+    "Untuk memastikan informasi yang akurat, "
+    "kami perlu melakukan pengecekan lebih lanjut terlebih dahulu."
+)
+
+UNCLEAR_ANSWER = (
+    "Maaf, saya belum dapat memahami maksud pertanyaan Anda. "
+    "Silakan tuliskan pertanyaan dengan lebih jelas atau sertakan "
+    "nama produk yang ingin ditanyakan."
+)
+
+FALLBACK_ANSWER = (
+    "Maaf, saya belum bisa memahami maksud pertanyaan Anda. "
+    "Silakan tuliskan pertanyaan dengan lebih jelas atau sertakan "
+    "nama produk yang ingin ditanyakan."
+)
+
+
+def _plan_product_rag(message: str, user_id: str, results: list):
+    """
+    Terapkan confidence policy atas hasil retrieval produk.
+
+    Return (final_answer, prefix, context):
+    - final_answer terisi → jawab langsung tanpa LLM
+    - selain itu          → prefix + composer(context)
+    """
+
+    # --------------------------------
+    # NO DATA → SAFE ABSTAIN
+    # --------------------------------
+    if not results:
+        return NO_DATA_ANSWER, "", ""
+
+    # --------------------------------
+    # TOP SCORE
+    # --------------------------------
+    # urutan hasil = rerank; confidence tetap dari cosine FAISS
+    # (score None jika index ANN melewatkan chunk temuan BM25)
+    top_score = max(
+        (score for _, score in results if score is not None),
+        default=0.0
+    )
+    print("🎯 TOP SCORE:", round(top_score, 3))
+
+    # --------------------------------
+    # BUILD CONTEXT (ONCE)
+    # --------------------------------
+    with stage("context_build"):
+        context = context_builder.build([r[0] for r in results])
+
+    # --------------------------------
+    # CONFIDENCE LABEL
+    # --------------------------------
+    label = confidence_label(top_score)
+
+    # --------------------------------
+    # STEP 2 — CONFIDENCE LOGGING
+    # --------------------------------
+    log_confidence_event(
+        query=message,
+        score=top_score,
+        label=label,
+        domain="product"
+    )
+
+    # --------------------------------
+    # HIGH CONFIDENCE
+    # --------------------------------
+    if top_score >= HIGH_CONF:
+        return None, f"(Tingkat keyakinan: {label})\n\n", context
+
+    # --------------------------------
+    # MEDIUM CONFIDENCE
+    # --------------------------------
+    if top_score >= MEDIUM_CONF:
+        return None, (
+            f"(Tingkat keyakinan: {label})\n\n"
+            "Berdasarkan informasi yang tersedia, berikut penjelasannya:\n\n"
+        ), context
+
+    # --------------------------------
+    # LOW CONFIDENCE → ESCALATE
+    # --------------------------------
+    save_pending(message, user_id)
+
+    return UNCLEAR_ANSWER, "", ""
+
+
+def _price_follow_up(msg: str, user_id: str, products_data: list | None) -> list:
+    """
+    Produk terakhir user jika pesan hanya follow-up harga, selain itu [].
+    """
+    if msg not in ["harga", "berapa", "harganya"]:
+        return []
+    return last_products(user_id, products_data)
+
+
+# =========================
+# SEMANTIC ANSWER CACHE
+# =========================
+# Jawaban gagal / abstain tidak di-cache agar bisa dijawab ulang
+UNCACHEABLE_ANSWERS = {
+    NO_DATA_ANSWER, UNCLEAR_ANSWER, FALLBACK_ANSWER,
+    TIMEOUT_ANSWER, UNAVAILABLE_ANSWER, EMPTY_ANSWER, BUSY_ANSWER,
+}
+
+# Jawaban degradasi (LLM gagal / antrean penuh): di jalur RAG produk
+# tertempel di belakang prefix keyakinan → dicek di seluruh jawaban
+DEGRADED_MARKERS = (
+    TIMEOUT_ANSWER, UNAVAILABLE_ANSWER, EMPTY_ANSWER, BUSY_ANSWER, BUSY_CONTEXT_PREFIX,
+)
+
+
+def _cache_keywords(message: str) -> list | None:
+    """
+    Kata kunci (tanpa stopword) untuk guard cache.
+    None → pertanyaan tidak di-cache (follow-up satu kata, dsb.)
+    """
+    if not answer_cache.enabled or len(message.split()) < 2:
+        return None
+
+    keywords = normalize_query(message).split()
+    return keywords or None
+
+
+def _cached_answer(user_id: str, cached: tuple) -> Tuple[str, list]:
+    answer, products = cached
+
+    # follow-up ("harganya berapa") tetap bekerja setelah cache hit
+    if products:
+        remember_products(user_id, products)
+
+    return answer, list(products)
+
+
+def _remember_answer(message: str, key: tuple | None, answer: str, products: list):
+    if key is None or not answer or answer in UNCACHEABLE_ANSWERS:
+        return
+    if answer.startswith("⚠️") or any(m in answer for m in DEGRADED_MARKERS):
+        return
+
+    query_vec, domain, keywords = key
+    answer_cache.put(message, query_vec, domain, keywords, answer, products or [])
+
+
+def _answer_cache_key(message: str) -> tuple | None:
+    keywords = _cache_keywords(message)
+    if keywords is None:
+        return None
+
+    try:
+        # embedding di-cache → retrieval produk di bawah tidak embed ulang
+        query_vec = embed(message)
+    except Exception as e:
+        print("⚠️ Answer cache skipped:", e)
+        return None
+
+    return query_vec, route_query(message, query_vec), keywords
+
+
+async def _answer_cache_key_async(message: str) -> tuple | None:
+    keywords = _cache_keywords(message)
+    if keywords is None:
+        return None
+
+    try:
+        query_vec = await embed_async(message)
+    except Exception as e:
+        print("⚠️ Answer cache skipped:", e)
+        return None
+
+    return query_vec, route_query(message, query_vec), keywords
+
+
 # =========================
 # MAIN CHAT ENGINE (SATU PINTU)
 # =========================
+@traced("chat")
 def handle_chat_engine(
     message: str,
     user_id: str = "anonymous",
@@ -123,140 +291,248 @@ def handle_chat_engine(
     msg = message.lower().strip()
 
     # 1️⃣ LEARNED ANSWER
-    learned = get_learned_answer(message, user_id)
+    with stage("learned"):
+        learned = get_learned_answer(message, user_id)
     if learned:
         return learned, []
 
     # 2️⃣ FOLLOW-UP TANPA PRODUK
-    if msg in ["harga", "berapa", "harganya"] and user_id in USER_LAST_PRODUCTS:
-        matches = USER_LAST_PRODUCTS[user_id]
-        answer = ask_ollama(message, matches, user_id)
+    matches = _price_follow_up(msg, user_id, products_data)
+    if matches:
+        answer = ask_ollama(message, matches, user_id, fallback=answer_price(matches))
         return answer, matches
 
     # 3️⃣ PRODUCT FLOW (always first, deterministic)
-    product_answer, products = handle_product_flow(
-        message=message,
-        user_id=user_id,
-        products_data=products_data
-    )
+    with stage("product_flow"):
+        product_answer, products = handle_product_flow(
+            message=message,
+            user_id=user_id,
+            products_data=products_data
+        )
 
     if product_answer is not None:
         return product_answer, products or []
 
+    # 3️⃣b SEMANTIC ANSWER CACHE (pertanyaan mirip, jalur RAG saja)
+    # setelah product flow → jawaban katalog / harga tetap tanpa embedding
+    with stage("answer_cache"):
+        key = _answer_cache_key(message)
+        cached = answer_cache.get(*key) if key is not None else None
+    if cached is not None:
+        return _cached_answer(user_id, cached)
+
+    answer, products = _run_chat_pipeline(message, user_id)
+    _remember_answer(message, key, answer, products)
+    return answer, products
+
+
+def _run_chat_pipeline(message: str, user_id: str) -> Tuple[str, list]:
 
     # =========================
-    # DOMAIN ROUTING (KUNCI)
+    # FAN-OUT + DOMAIN ROUTING (KUNCI)
     # =========================
-    domain = route_query(message)
-
-    # 4️⃣ PROFILE (OFFICIAL INFO)
+    # embed sekali, SOP / profile / product dicari paralel,
+    # router memilih dari keyword + score (bukan rantai fallback)
+    with stage("embed"):
+        query_vec = embed(message)  # cache hit setelah answer cache key
+    with stage("fanout"):
+        retrieved = retrieve_all(message, top_k=FANOUT_TOP_K, query_vec=query_vec)
+    with stage("route"):
+        domain = route_scored(message, retrieved, query_vec=query_vec)
+
+    # 4️⃣ PROFILE (OFFICIAL INFO, tanpa LLM)
     if domain == "profile":
-        profile_answer, _ = handle_profile_flow(message)
+        profile_answer, _ = handle_profile_flow(
+            message, contexts=domain_contexts(retrieved, "profile")
+        )
         if profile_answer:
             return profile_answer, []
 
     # 5️⃣ SOP (PROCEDURAL ONLY)
+    # llm_lane → prioritas antrean LLM (core.llm_scheduler)
     if domain == "sop":
-        sop_answer, _ = handle_sop_flow(message)
+        with llm_lane("sop"):
+            sop_answer, _ = handle_sop_flow(
+                message,
+                profile_contexts=domain_contexts(retrieved, "profile"),
+                sop_contexts=domain_contexts(retrieved, "sop")
+            )
         if sop_answer:
             return sop_answer, []
-        
-
 
     # 6️⃣ PRODUCT RAG (CONFIDENCE-AWARE)
     if domain == "product":
         print("🔥 CONFIDENCE-AWARE RAG TRIGGERED 🔥")
 
-        # --------------------------------
-        # RETRIEVE PRODUCT KNOWLEDGE
-        # --------------------------------
-        results = product_retriever.retrieve(message, with_score=True)
-
-        # --------------------------------
-        # NO DATA → SAFE ABSTAIN
-        # --------------------------------
-        if not results:
-            return (
-                "Untuk memastikan informasi yang akurat, "
-                "kami perlu melakukan pengecekan lebih lanjut terlebih dahulu."
+        with stage("rerank"):
+            results = reranker.rerank(message, retrieved.get("product", []), PRODUCT_TOP_K)
+        answer, prefix, context = _plan_product_rag(message, user_id, results)
+        if answer is not None:
+            return answer, []
+
+        with llm_lane("product"):
+            return prefix + rag_composer.compose_product_answer(
+                query=message,
+                context=context
             ), []
 
-        # --------------------------------
-        # TOP SCORE
-        # --------------------------------
-        top_score = results[0][1]
-        print("🎯 TOP SCORE:", round(top_score, 3))
-
-        # --------------------------------
-        # CONFIDENCE POLICY
-        # --------------------------------
-        HIGH_CONF = 0.75
-        MEDIUM_CONF = 0.60
-
-        # --------------------------------
-        # BUILD CONTEXT (ONCE)
-        # --------------------------------
-        context = context_builder.build([r[0] for r in results])
+    print("⚠️ FINAL FALLBACK RETURN (NO DOMAIN MATCHED)")
+
+    return FALLBACK_ANSWER, []
 
-        # --------------------------------
-        # CONFIDENCE LABEL
-        # --------------------------------
-        label = confidence_label(top_score)
-
-        # --------------------------------
-        # STEP 2 — CONFIDENCE LOGGING
-        # --------------------------------
-        log_confidence_event(
-            query=message,
-            score=top_score,
-            label=label,
-            domain="product"
+
+# =========================
+# ASYNC CHAT ENGINE
+# =========================
+@traced("chat")
+async def handle_chat_engine_async(
+    message: str,
+    user_id: str = "anonymous",
+    platform: str | None = None,
+    products_data: list | None = None
+) -> Tuple[str, list]:
+    """
+    Versi async dari handle_chat_engine (alur & jawaban identik).
+
+    Semua I/O LLM & embedding di-await, sehingga satu worker uvicorn
+    bisa melayani ratusan percakapan paralel tanpa menahan thread.
+    handle_chat_engine (sync) tetap dipakai oleh script / Streamlit.
+    """
+
+    msg = message.lower().strip()
+
+    # 1️⃣ LEARNED ANSWER
+    with stage("learned"):
+        learned = get_learned_answer(message, user_id)
+    if learned:
+        return learned, []
+
+    # 2️⃣ FOLLOW-UP TANPA PRODUK
+    matches = _price_follow_up(msg, user_id, products_data)
+    if matches:
+        answer = await ask_ollama_async(
+            message, matches, user_id, fallback=answer_price(matches)
         )
+        return answer, matches
 
-        # --------------------------------
-        # HIGH CONFIDENCE
-        # --------------------------------
-        if top_score >= HIGH_CONF:
-            answer = (
-                f"(Tingkat keyakinan: {label})\n\n"
-                + rag_composer.compose_product_answer(
-                    query=message,
-                    context=context
-                )
-            )
-            return answer, []
+    # 3️⃣ PRODUCT FLOW (always first, deterministic)
+    with stage("product_flow"):
+        product_answer, products = await handle_product_flow_async(
+            message=message,
+            user_id=user_id,
+            products_data=products_data
+        )
 
-        # --------------------------------
-        # MEDIUM CONFIDENCE
-        # --------------------------------
-        if top_score >= MEDIUM_CONF:
-            answer = (
-                f"(Tingkat keyakinan: {label})\n\n"
-                "Berdasarkan informasi yang tersedia, berikut penjelasannya:\n\n"
-                + rag_composer.compose_product_answer(
-                    query=message,
-                    context=context
-                )
+    if product_answer is not None:
+        return product_answer, products or []
+
+    # 3️⃣b SEMANTIC ANSWER CACHE (jalur RAG saja)
+    with stage("answer_cache"):
+        key = await _answer_cache_key_async(message)
+        cached = answer_cache.get(*key) if key is not None else None
+    if cached is not None:
+        return _cached_answer(user_id, cached)
+
+    answer, products = await _run_chat_pipeline_async(message, user_id)
+    _remember_answer(message, key, answer, products)
+    return answer, products
+
+
+async def _run_chat_pipeline_async(message: str, user_id: str) -> Tuple[str, list]:
+
+    # FAN-OUT + DOMAIN ROUTING
+    with stage("embed"):
+        query_vec = await embed_async(message)
+    with stage("fanout"):
+        retrieved = await aretrieve_all(message, top_k=FANOUT_TOP_K, query_vec=query_vec)
+    with stage("route"):
+        domain = route_scored(message, retrieved, query_vec=query_vec)
+
+    # 4️⃣ PROFILE
+    if domain == "profile":
+        profile_answer, _ = await handle_profile_flow_async(
+            message, contexts=domain_contexts(retrieved, "profile")
+        )
+        if profile_answer:
+            return profile_answer, []
+
+    # 5️⃣ SOP
+    if domain == "sop":
+        with llm_lane("sop"):
+            sop_answer, _ = await handle_sop_flow_async(
+                message,
+                profile_contexts=domain_contexts(retrieved, "profile"),
+                sop_contexts=domain_contexts(retrieved, "sop")
             )
+        if sop_answer:
+            return sop_answer, []
+
+    # 6️⃣ PRODUCT RAG (CONFIDENCE-AWARE)
+    if domain == "product":
+        with stage("rerank"):
+            results = await reranker.arerank(message, retrieved.get("product", []), PRODUCT_TOP_K)
+        answer, prefix, context = _plan_product_rag(message, user_id, results)
+        if answer is not None:
             return answer, []
 
-        # --------------------------------
-        # LOW CONFIDENCE → ESCALATE
-        # --------------------------------
-        save_pending(message, user_id)
+        with llm_lane("product"):
+            return prefix + await rag_composer.compose_product_answer_async(
+                query=message,
+                context=context
+            ), []
+
+    return FALLBACK_ANSWER, []
 
-        return (
-            "Maaf, saya belum dapat memahami maksud pertanyaan Anda. "
-            "Silakan tuliskan pertanyaan dengan lebih jelas atau sertakan "
-            "nama produk yang ingin ditanyakan.",
-            []
-        )
-    
-    print("⚠️ FINAL FALLBACK RETURN (NO DOMAIN MATCHED)")
 
-    return (
-        "Maaf, saya belum bisa memahami maksud pertanyaan Anda. "
-        "Silakan tuliskan pertanyaan dengan lebih jelas atau sertakan "
-        "nama produk yang ingin ditanyakan.",
-        []
-    )
\ No newline at end of file
+# =========================
+# STREAMING CHAT ENGINE
+# =========================
+async def handle_chat_engine_astream(
+    message: str,
+    user_id: str = "anonymous",
+    platform: str | None = None,
+    products_data: list | None = None
+) -> AsyncIterator[dict]:
+    """
+    Versi streaming dari handle_chat_engine_async.
+
+    Yield event:
+    - {"type": "token", "text": ...}                 → token LLM saat diterima
+    - {"type": "done", "answer": ..., "products": ...} → jawaban final (selalu terakhir)
+    - {"type": "error", "error": ...}
+
+    Jawaban deterministik (tanpa LLM) langsung menghasilkan event "done".
+    Jawaban final bisa berisi prefix (mis. tingkat keyakinan),
+    jadi client sebaiknya mengganti teks token dengan "answer".
+    Pipeline berjalan sebagai task di event loop yang sama, tanpa thread;
+    client disconnect → task dibatalkan (slot LLM dilepas).
+    """
+
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def worker():
+        try:
+            with stream_tokens(lambda t: events.put_nowait({"type": "token", "text": t})):
+                answer, products = await handle_chat_engine_async(
+                    message=message,
+                    user_id=user_id,
+                    platform=platform,
+                    products_data=products_data
+                )
+            events.put_nowait({"type": "done", "answer": answer, "products": products or []})
+        except Exception as e:
+            print("STREAM ERROR:", e)
+            events.put_nowait({"type": "error", "error": str(e)})
+
+    task = asyncio.create_task(worker())
+
+    try:
+        while True:
+            event = await events.get()
+            yield event
+            if event["type"] in ("done", "error"):
+                return
+    finally:
+        # client disconnect → hentikan generasi
+        if not task.done():
+            task.cancel()
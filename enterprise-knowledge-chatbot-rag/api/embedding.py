@@ -1,6 +1,6 @@
 # api/embedding.py
-import requests
-from config import OLLAMA_EMBED_URL, EMBED_MODEL
+from api import ollama_client
+from config import EMBED_MODEL
 
 
 def embed_text(text: str) -> list[float]:
@@ -9,13 +9,12 @@ def embed_text(text: str) -> list[float]:
     Single source of truth for embedding.
     """
 
-    payload = {
-        "model": EMBED_MODEL,
-        "prompt": text
-    }
+    return ollama_client.embeddings(text, model=EMBED_MODEL)
 
-    response = requests.post(OLLAMA_EMBED_URL, json=payload)
-    response.raise_for_status()
 
-    data = response.json()
-    return data["embedding"]
+async def embed_text_async(text: str) -> list[float]:
+    """
+    Versi async dari embed_text (untuk request path async).
+    """
+
+    return await ollama_client.aembeddings(text, model=EMBED_MODEL)
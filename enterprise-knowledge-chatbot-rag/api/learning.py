@@ -1,19 +1,33 @@
 import json
 import os
+import sqlite3
+import threading
+import time
 from datetime import datetime
 import re
 
+from config import DATA_DIR, VECTORSTORE_RELOAD_INTERVAL
+
 # ======================
 # PATH
 # ======================
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-DATA_DIR = os.path.join(BASE_DIR, "data")
 ENABLE_AUTO_LEARN = False
 
+# Store utama: SQLite (WAL) → aman dipakai banyak worker / proses sekaligus
+LEARNING_DB = os.path.join(DATA_DIR, "learning.sqlite3")
+
+# Jawaban kurasi admin: tetap diedit di JSON, disinkronkan ke SQLite
+# saat file berubah (lihat _sync_learned)
 LEARNED_FILE = os.path.join(DATA_DIR, "learned_answers.json")
+# File JSON lama (hanya dibaca sekali untuk migrasi)
 PENDING_FILE = os.path.join(DATA_DIR, "pending_questions.json")
 CHAT_LOG_FILE = os.path.join(DATA_DIR, "chat_logs.jsonl")
 
+SCHEMA_VERSION = 2
+
+# Interval (detik) cek perubahan learned_answers.json
+LEARNED_CHECK_INTERVAL = VECTORSTORE_RELOAD_INTERVAL
+
 # ======================
 # FAILURE KEYWORDS
 # ======================
@@ -28,18 +42,18 @@ FAIL_KEYWORDS = [
 # UTIL
 # ======================
 def normalize(text: str) -> str:
-    return (
-        text.lower()
-        .strip()
-        .replace('"', "")
-        .replace("?", "")
-    )
+    if not text:
+        return ""
 
-def _ensure(path, default):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    if not os.path.exists(path):
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(default, f)
+    text = text.lower().strip()
+
+    # hapus tanda baca
+    text = re.sub(r"[^\w\s]", "", text)
+
+    # rapikan spasi
+    text = re.sub(r"\s+", " ", text)
+
+    return text
 
 def _load(path, default=None):
     if not os.path.exists(path):
@@ -51,10 +65,212 @@ def _load(path, default=None):
     except json.JSONDecodeError:
         return []
 
-def _save(path, data):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+# ======================
+# DATABASE
+# ======================
+# Satu koneksi per thread (sqlite3.Connection tidak thread-safe);
+# antar proses dikoordinasi oleh lock file SQLite + busy_timeout.
+_local = threading.local()
+
+def _connect() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return conn
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    conn = sqlite3.connect(LEARNING_DB, timeout=10, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=10000")
+
+    _init_schema(conn)
+    _sync_learned(conn, force=True)
+
+    _local.conn = conn
+    return conn
+
+def _init_schema(conn: sqlite3.Connection):
+    """
+    Buat tabel + migrasi JSON lama, sekali saja (PRAGMA user_version).
+    BEGIN IMMEDIATE → hanya satu proses yang menjalankan migrasi.
+
+    v1 → tabel learned / pending + impor pending_questions.json
+    v2 → learned.origin ('json' = kurasi admin, 'runtime' = auto-learn)
+         + tabel meta (signature learned_answers.json terakhir)
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        migrated = 0
+
+        if version < 1:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS learned (
+                    id INTEGER PRIMARY KEY,
+                    question TEXT NOT NULL,
+                    question_norm TEXT NOT NULL UNIQUE,
+                    answer TEXT NOT NULL,
+                    products TEXT NOT NULL DEFAULT '[]',
+                    created_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pending (
+                    id INTEGER PRIMARY KEY,
+                    question TEXT NOT NULL,
+                    question_norm TEXT NOT NULL UNIQUE,
+                    source TEXT,
+                    created_at TEXT NOT NULL
+                )
+            """)
+            migrated = _migrate_json(conn)
+
+        if version < 2:
+            # baris v1 berasal dari impor JSON (auto-learn nonaktif)
+            conn.execute(
+                "ALTER TABLE learned ADD COLUMN origin TEXT NOT NULL DEFAULT 'json'"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    if migrated:
+        print(f"📦 Learning store migrated from JSON ({migrated} rows)")
+
+# ======================
+# ADMIN ANSWERS (JSON → SQLITE)
+# ======================
+_learned_checked_at = float("-inf")
+
+def _learned_signature() -> str:
+    try:
+        stat = os.stat(LEARNED_FILE)
+    except FileNotFoundError:
+        return ""
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+def _sync_learned(conn: sqlite3.Connection, force: bool = False):
+    """
+    learned_answers.json tetap sumber jawaban kurasi admin: file berubah
+    (mtime / ukuran) → baris origin 'json' diganti isi file (edit, tambah,
+    hapus berlaku seperti dulu). Dicek maks. sekali per
+    LEARNED_CHECK_INTERVAL; signature di tabel meta → impor sekali per
+    perubahan untuk semua proses.
+    """
+    global _learned_checked_at
+
+    now = time.monotonic()
+    if not force and now - _learned_checked_at < LEARNED_CHECK_INTERVAL:
+        return
+    _learned_checked_at = now
+
+    signature = _learned_signature()
+    if _learned_synced(conn) == signature:
+        return
+
+    try:
+        items = []
+        if signature:
+            with open(LEARNED_FILE, encoding="utf-8") as f:
+                content = f.read().strip()
+            items = json.loads(content) if content else []
+    except (OSError, json.JSONDecodeError) as e:
+        # file sedang ditulis admin → jawaban lama tetap dipakai, cek lagi nanti
+        print("⚠️ learned_answers.json sync skipped:", e)
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if _learned_synced(conn) == signature:
+            conn.execute("COMMIT")
+            return
+
+        rows = _import_learned(conn, items)
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('learned_signature', ?)",
+            (signature,),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    print(f"📚 Learned answers synced from JSON ({rows} rows)")
+
+def _learned_synced(conn: sqlite3.Connection) -> str | None:
+    row = conn.execute(
+        "SELECT value FROM meta WHERE key = 'learned_signature'"
+    ).fetchone()
+    return row[0] if row else None
+
+def _import_learned(conn: sqlite3.Connection, items: list) -> int:
+    """
+    Ganti baris origin 'json' dengan isi file. Urutan file dipertahankan:
+    duplikat → entry PERTAMA yang menang (sama dengan perilaku lookup
+    lama); entry admin menimpa jawaban auto-learn untuk pertanyaan sama.
+    """
+    now = datetime.now().isoformat()
+    seen = set()
+
+    conn.execute("DELETE FROM learned WHERE origin = 'json'")
+
+    for item in items:
+        q = item.get("question", "")
+        nq = normalize(q)
+        if not nq or not item.get("answer") or nq in seen:
+            continue
+        seen.add(nq)
+
+        conn.execute(
+            "INSERT OR REPLACE INTO learned "
+            "(question, question_norm, answer, products, created_at, origin) "
+            "VALUES (?, ?, ?, ?, ?, 'json')",
+            (
+                q, nq, item["answer"],
+                json.dumps(item.get("products", []), ensure_ascii=False),
+                item.get("created_at", now),
+            ),
+        )
+
+    return len(seen)
+
+def _migrate_json(conn: sqlite3.Connection) -> int:
+    """
+    Impor pending_questions.json (sekali, saat membuat store).
+    learned_answers.json disinkronkan terus oleh _sync_learned.
+    """
+    now = datetime.now().isoformat()
+    rows = 0
+
+    for item in _load(PENDING_FILE):
+        q = item.get("question", "")
+        if not q:
+            continue
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO pending "
+            "(question, question_norm, source, created_at) VALUES (?, ?, ?, ?)",
+            (q, normalize(q), item.get("source"), item.get("created_at", now)),
+        )
+        rows += cur.rowcount
+
+    return rows
+
+def _insert_pending(conn, question: str, source, created_at: str) -> bool:
+    cur = conn.execute(
+        "INSERT OR IGNORE INTO pending "
+        "(question, question_norm, source, created_at) VALUES (?, ?, ?, ?)",
+        (question, normalize(question), source, created_at),
+    )
+    return cur.rowcount > 0
 
 # ======================
 # FAILURE DETECTOR
@@ -72,29 +288,23 @@ def is_failed_answer(log: dict) -> bool:
 # PUBLIC API
 # ======================
 def get_learned_answer(question: str, user_id=None):
-    q = normalize(question)
-    learned = _load(LEARNED_FILE)
+    conn = _connect()
+    _sync_learned(conn)
 
-    for item in learned:
-        if normalize(item["question"]) == q:
-            return item["answer"]
+    # lookup via UNIQUE index question_norm (bukan scan seluruh file)
+    row = conn.execute(
+        "SELECT answer FROM learned WHERE question_norm = ?",
+        (normalize(question),),
+    ).fetchone()
 
-    return None
+    return row[0] if row else None
 
 def save_pending(question: str, source="runtime"):
-    pending = _load(PENDING_FILE)
-    nq = normalize(question)
-
-    if any(normalize(p["question"]) == nq for p in pending):
+    if not question or not normalize(question):
         return
 
-    pending.append({
-        "question": question,
-        "source": source,
-        "created_at": datetime.now().isoformat()
-    })
-
-    _save(PENDING_FILE, pending)
+    # UNIQUE(question_norm) → duplikat diabaikan, tanpa read-modify-write
+    _insert_pending(_connect(), question, source, datetime.now().isoformat())
 
 def save_learned(question: str, answer: str, related_products=None):
 
@@ -107,70 +317,92 @@ def save_learned(question: str, answer: str, related_products=None):
     if related_products is None:
         related_products = []
 
-    learned = _load(LEARNED_FILE)
-
-    learned.append({
-        "question": question,
-        "answer": answer,
-        "products": related_products,
-        "created_at": datetime.now().isoformat()
-    })
-
-    _save(LEARNED_FILE, learned)
+    conn = _connect()
+    nq = normalize(question)
 
-    # hapus dari pending
-    pending = _load(PENDING_FILE)
-    pending = [p for p in pending if p["question"] != question]
-    _save(PENDING_FILE, pending)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            "INSERT OR IGNORE INTO learned "
+            "(question, question_norm, answer, products, created_at, origin) "
+            "VALUES (?, ?, ?, ?, ?, 'runtime')",
+            (
+                question, nq, answer,
+                json.dumps(related_products, ensure_ascii=False),
+                datetime.now().isoformat(),
+            ),
+        )
+
+        # hapus dari pending
+        conn.execute("DELETE FROM pending WHERE question_norm = ?", (nq,))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def list_pending() -> list:
+    """
+    Semua pertanyaan pending (urutan masuk), format sama dengan JSON lama.
+    """
+    rows = _connect().execute(
+        "SELECT question, source, created_at FROM pending ORDER BY id"
+    ).fetchall()
+
+    return [
+        {"question": q, "source": source, "created_at": created_at}
+        for q, source, created_at in rows
+    ]
+
+
+def list_learned() -> list:
+    rows = _connect().execute(
+        "SELECT question, answer, products, created_at FROM learned ORDER BY id"
+    ).fetchall()
+
+    return [
+        {
+            "question": q,
+            "answer": answer,
+            "products": json.loads(products),
+            "created_at": created_at,
+        }
+        for q, answer, products, created_at in rows
+    ]
 
 
 def sync_failed_from_chat_logs():
     if not os.path.exists(CHAT_LOG_FILE):
         return 0
 
-    pending = _load(PENDING_FILE)
-    pending_norm = {normalize(p["question"]) for p in pending}
+    conn = _connect()
     added = 0
 
-    with open(CHAT_LOG_FILE, encoding="utf-8") as f:
-        for line in f:
-            try:
-                log = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-
-            q = log.get("question", "").strip()
-            if not q:
-                continue
-
-            if not is_failed_answer(log):
-                continue
-
-            nq = normalize(q)
-            if nq in pending_norm:
-                continue
-
-            pending.append({
-                "question": q,
-                "source": "chat_logs",
-                "created_at": log.get("time", datetime.now().isoformat())
-            })
-            pending_norm.add(nq)
-            added += 1
-
-    _save(PENDING_FILE, pending)
-    return added
-
-def normalize(text: str) -> str:
-    if not text:
-        return ""
-
-    text = text.lower().strip()
-
-    # hapus tanda baca
-    text = re.sub(r"[^\w\s]", "", text)
-
-    # rapikan spasi
-    text = re.sub(r"\s+", " ", text)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        with open(CHAT_LOG_FILE, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    log = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+                q = log.get("question", "").strip()
+                if not q or not normalize(q):
+                    continue
+
+                if not is_failed_answer(log):
+                    continue
+
+                if _insert_pending(
+                    conn, q, "chat_logs",
+                    log.get("time", datetime.now().isoformat())
+                ):
+                    added += 1
+
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
 
-    return text
\ No newline at end of file
+    return added
@@ -1,8 +1,11 @@
-import json, os
+import os
 from datetime import datetime
 
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-LOG_FILE = os.path.join(BASE_DIR, "data/chat_logs.jsonl")
+from config import DATA_DIR
+from core.log_sink import log_sink
+
+LOG_FILE = os.path.join(DATA_DIR, "chat_logs.jsonl")
+
 
 def save_log(question, products, answer):
     log = {
@@ -11,5 +14,4 @@ def save_log(question, products, answer):
         "products": [p["kode"] for p in products],
         "answer": answer
     }
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(log, ensure_ascii=False) + "\n")
+    log_sink.write(LOG_FILE, log)
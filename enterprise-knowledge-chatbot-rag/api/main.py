@@ -2,15 +2,26 @@
 import json
 import os
 import datetime
-from pathlib import Path
 from typing import Optional
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 
-from api.chat_engine import handle_chat_engine
+from api.chat_engine import handle_chat_engine_async, handle_chat_engine_astream
+from api.search import catalog
 from api.ollama import MODEL
+from config import DATA_DIR, ROUTER_SEMANTIC_ENABLED
+from api import ollama_client
+from core.log_sink import log_sink
+from core.telemetry import (
+    telemetry, new_request_id, bind_request_id, reset_request_id, current_request_id,
+)
+from core.router import router
+from core.composer import warm_intent_classifier
+from core.conversation import conversation
+from core.llm_scheduler import llm_scheduler
 
 
 # =========================
@@ -26,19 +37,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# =========================
-# PATH
-# =========================
-ROOT_DIR = Path(__file__).resolve().parent.parent
-DATA_DIR = ROOT_DIR / "data/json"
-PRODUCT_FILE = DATA_DIR / "products.json"
-LOG_FILE = DATA_DIR / "logs" / "user_queries.jsonl"
+
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    # X-Request-ID dari client / proxy dipakai ulang, selain itu dibuat baru;
+    # engine, log & ringkasan telemetry memakai id yang sama
+    request_id = request.headers.get("x-request-id") or new_request_id()
+    token = bind_request_id(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        reset_request_id(token)
+
+    response.headers["X-Request-ID"] = request_id
+    return response
 
 # =========================
-# LOAD PRODUCTS
+# PATH
 # =========================
-with open(PRODUCT_FILE, encoding="utf-8") as f:
-    PRODUCTS = json.load(f)
+LOG_FILE = DATA_DIR / "json" / "logs" / "user_queries.jsonl"
 
 # =========================
 # SCHEMA
@@ -53,10 +70,10 @@ class ChatRequest(BaseModel):
 # LOGGING
 # =========================
 def log_interaction(req, answer, products):
-    os.makedirs(LOG_FILE.parent, exist_ok=True)
-
+    # di-antre ke writer thread, bukan ditulis di request path
     log = {
         "timestamp": datetime.datetime.utcnow().isoformat(),
+        "request_id": current_request_id(),
         "user_id": req.user_id,
         "platform": req.platform,
         "question": req.message,
@@ -64,22 +81,21 @@ def log_interaction(req, answer, products):
         "products": [p.get("kode") for p in products] if products else []
     }
 
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(log, ensure_ascii=False) + "\n")
+    log_sink.write(LOG_FILE, log)
 
 
 # =========================
 # ENDPOINT
 # =========================
 @app.post("/chat")
-def chat(req: ChatRequest):
+async def chat(req: ChatRequest):
     print("🔥 /chat HIT | MODEL:", MODEL)
 
-    answer, products = handle_chat_engine(
+    answer, products = await handle_chat_engine_async(
         message=req.message,
         user_id=req.user_id,
         platform=req.platform,
-        products_data=PRODUCTS
+        products_data=catalog.products()
     )
 
     log_interaction(req, answer, products)
@@ -90,6 +106,86 @@ def chat(req: ChatRequest):
     }
 
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """
+    Server-Sent Events:
+    - event: token → {"text": ...} setiap token LLM
+    - event: done  → {"answer": ..., "products": [...]} (sama dengan /chat)
+    - event: error → {"error": ...}
+    """
+    print("🔥 /chat/stream HIT | MODEL:", MODEL)
+
+    async def event_stream():
+        async for event in handle_chat_engine_astream(
+            message=req.message,
+            user_id=req.user_id,
+            platform=req.platform,
+            products_data=catalog.products()
+        ):
+            if event["type"] == "token":
+                yield _sse("token", {"text": event["text"]})
+
+            elif event["type"] == "done":
+                log_interaction(req, event["answer"], event["products"])
+                yield _sse("done", {
+                    "answer": event["answer"],
+                    "products": event["products"]
+                })
+
+            else:
+                yield _sse("error", {"error": event["error"]})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/router/stats")
+def router_stats():
+    return router.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(
+        telemetry.render_prometheus() + llm_scheduler.render_prometheus(),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+@app.get("/llm/stats")
+def llm_stats():
+    return llm_scheduler.stats()
+
+
+@app.get("/conversation/stats")
+def conversation_stats():
+    return conversation.stats()
+
+
+@app.on_event("startup")
+async def startup():
+    # centroid router / intent dibangun di background thread per worker;
+    # selama belum siap routing memakai keyword / default
+    if ROUTER_SEMANTIC_ENABLED:
+        router.classifier.warm()
+        warm_intent_classifier()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await ollama_client.aclose()
+    log_sink.close()
+
+
 @app.get("/")
 def health():
     return {"status": "ok"}
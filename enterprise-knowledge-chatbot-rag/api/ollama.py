@@ -1,17 +1,108 @@
 import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable
+
+import httpx
 import requests
 
+from api import ollama_client
+from core.llm_scheduler import llm_lane
+from core.telemetry import stage, telemetry
+
 # =========================
 # CONFIG
 # =========================
-OLLAMA_URL = "http://127.0.0.1:11434/api/generate"
-
 MODEL = os.getenv("MODEL", "gemma3:4b")
 
+TIMEOUT_ANSWER = (
+    "⚠️ AI membutuhkan waktu lebih lama dari biasanya. "
+    "Silakan coba kembali sebentar lagi."
+)
+UNAVAILABLE_ANSWER = "AI sedang tidak tersedia."
+EMPTY_ANSWER = "AI tidak memberikan jawaban."
+# Antrean LLM penuh (core.llm_scheduler) → ditolak seketika
+BUSY_ANSWER = (
+    "⚠️ AI sedang melayani banyak percakapan. "
+    "Silakan coba kembali sebentar lagi."
+)
+
 # =========================
-# MAIN FUNCTION
+# TOKEN STREAMING
+# =========================
+# Jika sink aktif (lihat stream_tokens), setiap panggilan generate
+# memakai mode stream dan meneruskan token ke sink begitu diterima.
+# Nilai return tetap teks lengkap → kontrak non-streaming tidak berubah.
+_token_sink: ContextVar[Callable[[str], None] | None] = ContextVar(
+    "ollama_token_sink", default=None
+)
+
+
+@contextmanager
+def stream_tokens(sink: Callable[[str], None]):
+    """
+    Aktifkan streaming token untuk semua panggilan LLM
+    di dalam blok ini (per thread / per task).
+    """
+    token = _token_sink.set(sink)
+    try:
+        yield
+    finally:
+        _token_sink.reset(token)
+
+
+def _generate(payload: dict, read_timeout: float | None = None) -> dict:
+    """
+    Panggil /api/generate.
+    Tanpa sink → satu request biasa.
+    Dengan sink → stream, token diteruskan, hasil digabung seperti respons biasa.
+    """
+    sink = _token_sink.get()
+    with stage("llm"):
+        if sink is None:
+            data = ollama_client.generate(payload, read_timeout)
+        else:
+            parts, data = [], {}
+            for chunk in ollama_client.stream("generate", payload, read_timeout):
+                token = chunk.get("response", "")
+                if token:
+                    parts.append(token)
+                    sink(token)
+                data = chunk  # chunk terakhir (done) membawa statistik token
+
+            data = {**data, "response": "".join(parts)}
+
+    telemetry.record_llm(data)
+    return data
+
+
+async def _agenerate(payload: dict, read_timeout: float | None = None) -> dict:
+    """
+    Versi async dari _generate (tidak memblokir event loop).
+    """
+    sink = _token_sink.get()
+    with stage("llm"):
+        if sink is None:
+            data = await ollama_client.agenerate(payload, read_timeout)
+        else:
+            parts, data = [], {}
+            async for chunk in ollama_client.astream("generate", payload, read_timeout):
+                token = chunk.get("response", "")
+                if token:
+                    parts.append(token)
+                    sink(token)
+                data = chunk
+
+            data = {**data, "response": "".join(parts)}
+
+    telemetry.record_llm(data)
+    return data
+
+
 # =========================
-def ask_ollama(question: str, products: list, user_id=None) -> str:
+# PROMPT BUILDERS
+# =========================
+def _product_payload(question: str, products: list) -> dict:
 
     # =========================
     # BUILD CONTEXT
@@ -42,40 +133,94 @@ PERTANYAAN:
 {question}
 """
 
-    payload = {
+    return {
         "model": MODEL,
         "prompt": prompt,
         "temperature": 0.3,
         "stream": False
     }
 
+
+def _llm_payload(prompt: str) -> dict:
+    return {
+        "model": MODEL,
+        "prompt": prompt,
+        "stream": False
+    }
+
+
+def _llm_response(data: dict) -> str:
+    # Ollama /api/generate returns "response"
+    if "response" not in data:
+        raise RuntimeError(f"Unexpected Ollama response: {data}")
+
+    return data["response"]
+
+
+# =========================
+# MAIN FUNCTION
+# =========================
+def ask_ollama(question: str, products: list, user_id=None, fallback: str | None = None) -> str:
+    """
+    fallback: jawaban non-LLM jika scheduler menolak (antrean penuh).
+    """
+    payload = _product_payload(question, products)
+
     # =========================
     # CALL OLLAMA
     # =========================
     try:
-        r = requests.post(
-            OLLAMA_URL,
-            json=payload,
-            timeout=180  # ⬅️ penting untuk VM
-        )
-        r.raise_for_status()
+        with llm_lane("product"):
+            data = _generate(payload)  # timeout 180s (VM)
 
-        answer = r.json().get("response", "").strip()
+        answer = data.get("response", "").strip()
 
         if not answer:
-            return "AI tidak memberikan jawaban."
+            return EMPTY_ANSWER
 
         return answer
 
+    except ollama_client.OllamaBusyError as e:
+        print("OLLAMA BUSY:", e)
+        return fallback or BUSY_ANSWER
+
     except requests.exceptions.ReadTimeout:
-        return (
-            "⚠️ AI membutuhkan waktu lebih lama dari biasanya. "
-            "Silakan coba kembali sebentar lagi."
-        )
+        return TIMEOUT_ANSWER
 
     except Exception as e:
         print("OLLAMA ERROR:", e)
-        return "AI sedang tidak tersedia."
+        return UNAVAILABLE_ANSWER
+
+
+async def ask_ollama_async(
+    question: str, products: list, user_id=None, fallback: str | None = None
+) -> str:
+    """
+    Versi async dari ask_ollama (jawaban & fallback identik).
+    """
+    payload = _product_payload(question, products)
+
+    try:
+        with llm_lane("product"):
+            data = await _agenerate(payload)
+
+        answer = data.get("response", "").strip()
+
+        if not answer:
+            return EMPTY_ANSWER
+
+        return answer
+
+    except ollama_client.OllamaBusyError as e:
+        print("OLLAMA BUSY:", e)
+        return fallback or BUSY_ANSWER
+
+    except httpx.ReadTimeout:
+        return TIMEOUT_ANSWER
+
+    except Exception as e:
+        print("OLLAMA ERROR:", e)
+        return UNAVAILABLE_ANSWER
 
 
 def call_llm(prompt: str) -> str:
@@ -84,24 +229,14 @@ def call_llm(prompt: str) -> str:
     Safe for RAG textual responses.
     """
 
-    payload = {
-        "model": MODEL,
-        "prompt": prompt,
-        "stream": False
-    }
+    data = _generate(_llm_payload(prompt), read_timeout=60)
+    return _llm_response(data)
 
-    r = requests.post(
-        OLLAMA_URL,   # pastikan ini /api/generate
-        json=payload,
-        timeout=60
-    )
-    r.raise_for_status()
 
-    data = r.json()
-
-    # Ollama /api/generate returns "response"
-    if "response" not in data:
-        raise RuntimeError(f"Unexpected Ollama response: {data}")
-
-    return data["response"]
+async def call_llm_async(prompt: str) -> str:
+    """
+    Versi async dari call_llm.
+    """
 
+    data = await _agenerate(_llm_payload(prompt), read_timeout=60)
+    return _llm_response(data)
@@ -0,0 +1,490 @@
+# api/ollama_client.py
+"""
+Shared Ollama HTTP client.
+
+Semua panggilan ke Ollama (generate, chat, embeddings) WAJIB lewat modul ini:
+- Satu requests.Session per proses → connection pooling & keep-alive
+- Timeout per endpoint (tidak ada request tanpa batas waktu)
+- Retry terbatas + exponential backoff untuk error sementara
+- Generate / chat lewat core.llm_scheduler (slot = OLLAMA_NUM_PARALLEL,
+  lane prioritas, admission control); embedding lewat _EmbedLimiter
+  (satu kuota OLLAMA_MAX_CONCURRENCY untuk thread sync & task asyncio)
+
+Versi async (apost / astream / agenerate / aembeddings) memakai
+httpx.AsyncClient dengan aturan timeout, retry, dan limit yang sama,
+untuk request path FastAPI / Telegram yang tidak boleh memblokir event loop.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Iterator
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    OLLAMA_BASE_URL,
+    EMBED_MODEL,
+    OLLAMA_CONNECT_TIMEOUT,
+    OLLAMA_READ_TIMEOUTS,
+    OLLAMA_DEFAULT_READ_TIMEOUT,
+    OLLAMA_MAX_RETRIES,
+    OLLAMA_RETRY_BACKOFF,
+    OLLAMA_POOL_SIZE,
+    OLLAMA_MAX_CONCURRENCY,
+    OLLAMA_QUEUE_TIMEOUT,
+)
+from core.llm_scheduler import LLMBusyError, llm_scheduler
+
+# Status HTTP yang aman untuk diulang
+RETRY_STATUS = {429, 502, 503, 504}
+
+# Endpoint yang memakai slot generate Ollama → core.llm_scheduler
+SCHEDULED_ENDPOINTS = {"generate", "chat"}
+
+
+class OllamaBusyError(requests.exceptions.RequestException):
+    """
+    Slot concurrency penuh terlalu lama / ditolak scheduler.
+    Turunan RequestException agar penanganan error lama tetap berlaku.
+    """
+
+
+# =========================
+# SESSION (LAZY, THREAD-SAFE)
+# =========================
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+
+# =========================
+# EMBEDDING LIMITER (SYNC + ASYNC)
+# =========================
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class _EmbedLimiter:
+    """
+    Semaphore yang dibagi thread sync (Telegram, ingestion) & task
+    asyncio di proses yang sama → total request embedding ke Ollama
+    tetap maks OLLAMA_MAX_CONCURRENCY (pola core.llm_scheduler: waiter
+    FIFO, slot yang lepas diserahkan langsung ke waiter berikutnya).
+    """
+
+    def __init__(self, slots: int):
+        self._lock = threading.Lock()
+        self._free = slots
+        self._waiters: deque = deque()
+
+    def _admit(self, notify) -> list | None:
+        """
+        None → slot langsung didapat; waiter [notify, granted] → tunggu.
+        """
+        with self._lock:
+            if self._free > 0:
+                self._free -= 1
+                return None
+            waiter = [notify, False]
+            self._waiters.append(waiter)
+            return waiter
+
+    def _abandon(self, waiter: list) -> bool:
+        """
+        Waiter berhenti menunggu. True jika slot ternyata sudah diberikan.
+        """
+        with self._lock:
+            if waiter[1]:
+                return True
+            self._waiters.remove(waiter)
+            return False
+
+    def acquire(self, timeout: float) -> bool:
+        event = threading.Event()
+        waiter = self._admit(event.set)
+        if waiter is None or event.wait(timeout):
+            return True
+        return self._abandon(waiter)
+
+    async def aacquire(self, timeout: float) -> bool:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = self._admit(lambda: loop.call_soon_threadsafe(_wake, future))
+        if waiter is None:
+            return True
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return self._abandon(waiter)
+        except asyncio.CancelledError:
+            # client disconnect: slot yang sempat diberikan dikembalikan
+            if self._abandon(waiter):
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            waiter = self._waiters.popleft() if self._waiters else None
+            if waiter is None:
+                self._free += 1
+            else:
+                waiter[1] = True
+
+        if waiter is not None:
+            waiter[0]()
+
+
+_limiter = _EmbedLimiter(OLLAMA_MAX_CONCURRENCY)
+
+
+def get_session() -> requests.Session:
+    """
+    Session bersama untuk seluruh proses.
+    Dibuat sekali saat pertama dipakai.
+    """
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=OLLAMA_POOL_SIZE,
+                    max_retries=0,  # retry ditangani di post()
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+
+    return _session
+
+
+def _timeout(endpoint: str, read_timeout: float | None):
+    read = read_timeout or OLLAMA_READ_TIMEOUTS.get(
+        endpoint, OLLAMA_DEFAULT_READ_TIMEOUT
+    )
+    return (OLLAMA_CONNECT_TIMEOUT, read)
+
+
+def _backoff(attempt: int):
+    time.sleep(OLLAMA_RETRY_BACKOFF * (2 ** attempt))
+
+
+def _acquire_slot(endpoint: str):
+    """
+    Ticket scheduler (generate / chat) atau None (limiter embedding).
+    """
+    if endpoint in SCHEDULED_ENDPOINTS:
+        try:
+            return llm_scheduler.acquire()
+        except LLMBusyError as e:
+            raise OllamaBusyError(str(e)) from None
+
+    if not _limiter.acquire(OLLAMA_QUEUE_TIMEOUT):
+        raise OllamaBusyError(
+            f"Ollama busy: no free slot after {OLLAMA_QUEUE_TIMEOUT}s"
+        )
+    return None
+
+
+def _release_slot(ticket):
+    if ticket is None:
+        _limiter.release()
+    else:
+        llm_scheduler.release(ticket)
+
+
+# =========================
+# CORE REQUEST
+# =========================
+def post(
+    endpoint: str,
+    payload: dict,
+    read_timeout: float | None = None,
+) -> dict:
+    """
+    POST ke {OLLAMA_BASE_URL}/api/{endpoint} dan kembalikan JSON.
+
+    - ReadTimeout TIDAK di-retry (generate yang lambat jangan diulang)
+    - ConnectionError & RETRY_STATUS di-retry maks OLLAMA_MAX_RETRIES kali
+    - Exception requests diteruskan ke pemanggil
+    """
+    url = f"{OLLAMA_BASE_URL}/api/{endpoint}"
+    timeout = _timeout(endpoint, read_timeout)
+
+    for attempt in range(OLLAMA_MAX_RETRIES + 1):
+        last_attempt = attempt == OLLAMA_MAX_RETRIES
+
+        ticket = _acquire_slot(endpoint)
+        try:
+            r = get_session().post(url, json=payload, timeout=timeout)
+        except requests.exceptions.ConnectionError:
+            if last_attempt:
+                raise
+            _backoff(attempt)
+            continue
+        finally:
+            _release_slot(ticket)
+
+        if r.status_code in RETRY_STATUS and not last_attempt:
+            r.close()
+            _backoff(attempt)
+            continue
+
+        r.raise_for_status()
+        return r.json()
+
+    # tidak tercapai: attempt terakhir selalu return / raise
+    raise RuntimeError("Ollama request failed")
+
+
+# =========================
+# STREAMING REQUEST
+# =========================
+def stream(
+    endpoint: str,
+    payload: dict,
+    read_timeout: float | None = None,
+) -> Iterator[dict]:
+    """
+    POST dengan "stream": true dan yield setiap objek NDJSON dari Ollama.
+
+    - Retry hanya sebelum byte pertama diterima (gagal koneksi / RETRY_STATUS)
+    - Slot concurrency ditahan sampai stream selesai atau ditutup
+    - read_timeout berlaku per chunk, bukan untuk seluruh generasi
+    """
+    url = f"{OLLAMA_BASE_URL}/api/{endpoint}"
+    timeout = _timeout(endpoint, read_timeout)
+    payload = {**payload, "stream": True}
+
+    ticket = _acquire_slot(endpoint)
+    try:
+        for attempt in range(OLLAMA_MAX_RETRIES + 1):
+            last_attempt = attempt == OLLAMA_MAX_RETRIES
+
+            try:
+                r = get_session().post(
+                    url, json=payload, timeout=timeout, stream=True
+                )
+            except requests.exceptions.ConnectionError:
+                if last_attempt:
+                    raise
+                _backoff(attempt)
+                continue
+
+            if r.status_code in RETRY_STATUS and not last_attempt:
+                r.close()
+                _backoff(attempt)
+                continue
+
+            break
+
+        with r:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(f"Ollama stream error: {chunk['error']}")
+                yield chunk
+                if chunk.get("done"):
+                    break
+    finally:
+        _release_slot(ticket)
+
+
+# =========================
+# ENDPOINT HELPERS
+# =========================
+def generate(payload: dict, read_timeout: float | None = None) -> dict:
+    return post("generate", payload, read_timeout)
+
+
+def chat(payload: dict, read_timeout: float | None = None) -> dict:
+    return post("chat", payload, read_timeout)
+
+
+def embeddings(text: str, model: str = EMBED_MODEL) -> list[float]:
+    data = post("embeddings", {"model": model, "prompt": text})
+    return data["embedding"]
+
+
+def embed_batch(texts: list[str], model: str = EMBED_MODEL) -> list[list[float]]:
+    """
+    Banyak teks dalam satu request (/api/embed, Ollama >= 0.2).
+    Catatan: /api/embed mengembalikan vektor yang sudah L2-normalized.
+    """
+    data = post("embed", {"model": model, "input": texts})
+    return data["embeddings"]
+
+
+# =========================
+# ASYNC CLIENT (PER EVENT LOOP)
+# =========================
+# httpx.AsyncClient terikat ke event loop, jadi dibuat ulang jika loop
+# berganti (mis. script / test). Limiter embedding = _limiter (sync).
+_async_client: httpx.AsyncClient | None = None
+_async_loop: asyncio.AbstractEventLoop | None = None
+
+
+def get_async_client() -> httpx.AsyncClient:
+    global _async_client, _async_loop
+
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_loop is not loop:
+        _async_client = httpx.AsyncClient(
+            base_url=OLLAMA_BASE_URL,
+            limits=httpx.Limits(
+                max_connections=OLLAMA_POOL_SIZE,
+                max_keepalive_connections=OLLAMA_POOL_SIZE,
+            ),
+        )
+        _async_loop = loop
+
+    return _async_client
+
+
+async def aclose():
+    """
+    Tutup AsyncClient (dipanggil saat shutdown FastAPI / bot).
+    """
+    global _async_client, _async_loop
+
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+        _async_loop = None
+
+
+def _async_timeout(endpoint: str, read_timeout: float | None) -> httpx.Timeout:
+    connect, read = _timeout(endpoint, read_timeout)
+    return httpx.Timeout(read, connect=connect)
+
+
+async def _acquire_async_slot(endpoint: str):
+    """
+    Versi async dari _acquire_slot (slot scheduler dibagi dengan thread sync).
+    """
+    if endpoint in SCHEDULED_ENDPOINTS:
+        try:
+            return await llm_scheduler.aacquire()
+        except LLMBusyError as e:
+            raise OllamaBusyError(str(e)) from None
+
+    if not await _limiter.aacquire(OLLAMA_QUEUE_TIMEOUT):
+        raise OllamaBusyError(
+            f"Ollama busy: no free slot after {OLLAMA_QUEUE_TIMEOUT}s"
+        )
+    return None
+
+
+
+async def apost(
+    endpoint: str,
+    payload: dict,
+    read_timeout: float | None = None,
+) -> dict:
+    """
+    Versi async dari post(). Aturan retry identik:
+    httpx.ConnectError & RETRY_STATUS di-retry, ReadTimeout tidak.
+    """
+    client = get_async_client()
+    timeout = _async_timeout(endpoint, read_timeout)
+
+    for attempt in range(OLLAMA_MAX_RETRIES + 1):
+        last_attempt = attempt == OLLAMA_MAX_RETRIES
+
+        ticket = await _acquire_async_slot(endpoint)
+        try:
+            r = await client.post(f"/api/{endpoint}", json=payload, timeout=timeout)
+        except httpx.ConnectError:
+            if last_attempt:
+                raise
+            await asyncio.sleep(OLLAMA_RETRY_BACKOFF * (2 ** attempt))
+            continue
+        finally:
+            _release_slot(ticket)
+
+        if r.status_code in RETRY_STATUS and not last_attempt:
+            await asyncio.sleep(OLLAMA_RETRY_BACKOFF * (2 ** attempt))
+            continue
+
+        r.raise_for_status()
+        return r.json()
+
+    raise RuntimeError("Ollama request failed")
+
+
+async def astream(
+    endpoint: str,
+    payload: dict,
+    read_timeout: float | None = None,
+) -> AsyncIterator[dict]:
+    """
+    Versi async dari stream(): yield objek NDJSON saat diterima.
+    """
+    client = get_async_client()
+    timeout = _async_timeout(endpoint, read_timeout)
+    payload = {**payload, "stream": True}
+
+    ticket = await _acquire_async_slot(endpoint)
+    try:
+        for attempt in range(OLLAMA_MAX_RETRIES + 1):
+            last_attempt = attempt == OLLAMA_MAX_RETRIES
+
+            request = client.build_request(
+                "POST", f"/api/{endpoint}", json=payload, timeout=timeout
+            )
+            try:
+                r = await client.send(request, stream=True)
+            except httpx.ConnectError:
+                if last_attempt:
+                    raise
+                await asyncio.sleep(OLLAMA_RETRY_BACKOFF * (2 ** attempt))
+                continue
+
+            if r.status_code in RETRY_STATUS and not last_attempt:
+                await r.aclose()
+                await asyncio.sleep(OLLAMA_RETRY_BACKOFF * (2 ** attempt))
+                continue
+
+            break
+
+        try:
+            r.raise_for_status()
+            async for line in r.aiter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(f"Ollama stream error: {chunk['error']}")
+                yield chunk
+                if chunk.get("done"):
+                    break
+        finally:
+            await r.aclose()
+    finally:
+        _release_slot(ticket)
+
+
+async def agenerate(payload: dict, read_timeout: float | None = None) -> dict:
+    return await apost("generate", payload, read_timeout)
+
+
+async def achat(payload: dict, read_timeout: float | None = None) -> dict:
+    return await apost("chat", payload, read_timeout)
+
+
+async def aembeddings(text: str, model: str = EMBED_MODEL) -> list[float]:
+    data = await apost("embeddings", {"model": model, "prompt": text})
+    return data["embedding"]
@@ -2,15 +2,25 @@
 import re
 from typing import List
 
-from api.search import search_products
-from api.ollama import ask_ollama
+from api.search import catalog, search_products, products_by_code
+from api.ollama import ask_ollama, ask_ollama_async
 from api.learning import save_pending
+from core.conversation import conversation
 
 
 # =========================
 # PRODUCT MEMORY (FOLLOW-UP)
 # =========================
-LAST_PRODUCTS = {}
+# Produk terakhir per user → core.conversation (kode saja, LRU + TTL)
+def remember_products(user_id: str, products: list):
+    conversation.set_codes(user_id, [p.get("kode") for p in products])
+
+
+def last_products(user_id: str, products_data: list | None = None) -> list:
+    codes = conversation.get_codes(user_id)
+    if not codes:
+        return []
+    return products_by_code(codes, products_data or catalog.products())
 
 
 # =========================
@@ -91,15 +101,35 @@ def answer_general_function(products: List[dict]) -> str:
     return result
 
 
+# =========================
+# PRODUCT SUMMARY (LLM BUSY)
+# =========================
+def answer_product_summary(product: dict) -> str:
+    """
+    Jawaban non-LLM dari data katalog saat antrean LLM penuh.
+    Prefix ⚠️ → tidak disimpan di answer cache.
+    """
+    info = (product.get("fungsi") or product.get("deskripsi") or "").strip()
+
+    answer = (
+        "⚠️ AI sedang sibuk, berikut data produk dari katalog:\n\n"
+        f"{product.get('nama')} ({product.get('kode')})\n"
+        f"Harga: Rp {product.get('harga', '-')}"
+    )
+    if info:
+        answer += f"\nFungsi: {info}"
+    return answer
+
+
 # =========================
 # SINGLE PRODUCT LLM
 # =========================
-def ask_product_llm(question: str, product: dict) -> str:
+def _product_llm_prompt(question: str, product: dict) -> str:
     info = product.get("fungsi") or product.get("deskripsi") or ""
     if not info.strip():
         info = "Informasi produk belum tersedia di database resmi."
 
-    prompt = f"""
+    return f"""
 Anda adalah asisten produk resmi CNI Indonesia.
 
 DATA PRODUK:
@@ -114,33 +144,53 @@ PERTANYAAN:
 {question}
 """
 
-    return ask_ollama(prompt, [product])
+
+def ask_product_llm(question: str, product: dict) -> str:
+    return ask_ollama(
+        _product_llm_prompt(question, product), [product],
+        fallback=answer_product_summary(product)
+    )
+
+
+async def ask_product_llm_async(question: str, product: dict) -> str:
+    return await ask_ollama_async(
+        _product_llm_prompt(question, product), [product],
+        fallback=answer_product_summary(product)
+    )
 
 
 # =========================
-# MAIN PRODUCT HANDLER
+# PRODUCT FLOW (DETERMINISTIC PART)
 # =========================
-def handle_product_flow(
+def _plan_product_flow(
     message: str,
     user_id: str,
     products_data: list
 ):
+    """
+    Bagian deterministik product flow (tanpa I/O LLM).
+
+    Return (answer, products, llm_product):
+    - answer terisi      → jawaban final
+    - llm_product terisi → jawaban perlu LLM untuk produk tersebut
+    - keduanya None      → bukan pertanyaan produk
+    """
     q = message.lower().strip()
 
     products = search_products(message, products_data)
 
     # FOLLOW-UP TANPA NAMA PRODUK
-    if not products and user_id in LAST_PRODUCTS and q in [
+    if not products and q in [
         "fungsi", "manfaat", "kegunaan",
         "harga", "berapa", "stok"
     ]:
-        products = LAST_PRODUCTS[user_id]
+        products = last_products(user_id, products_data)
 
     if not products:
         save_pending(message, user_id)
-        return None, []
+        return None, [], None
 
-    LAST_PRODUCTS[user_id] = products
+    remember_products(user_id, products)
 
     # ATRIBUT DARI DESKRIPSI
     if len(products) == 1:
@@ -151,25 +201,61 @@ def handle_product_flow(
                 return (
                     f"{products[0]['nama']} ({products[0]['kode']}) "
                     f"mengandung {attr} sebesar {val}."
-                ), products
+                ), products, None
 
     # HARGA
     if "harga" in q or "berapa" in q:
-        return answer_price(products), products
+        return answer_price(products), products, None
 
     # FUNGSI
     if any(k in q for k in ["fungsi", "manfaat", "kegunaan"]):
         if len(products) > 1:
-            return answer_general_function(products), products
-        return ask_product_llm(message, products[0]), products
+            return answer_general_function(products), products, None
+        return None, products, products[0]
 
     # SINGLE PRODUCT DEFAULT
     if len(products) == 1:
-        return ask_product_llm(message, products[0]), products
+        return None, products, products[0]
 
     # MULTI PRODUCT
     return (
         "Beberapa produk ditemukan:\n"
         + "\n".join(f"- {p['nama']} ({p['kode']})" for p in products)
         + "\n\nSilakan sebutkan produk yang dimaksud."
-    ), products
+    ), products, None
+
+
+# =========================
+# MAIN PRODUCT HANDLER
+# =========================
+def handle_product_flow(
+    message: str,
+    user_id: str,
+    products_data: list
+):
+    answer, products, llm_product = _plan_product_flow(
+        message, user_id, products_data
+    )
+
+    if llm_product is not None:
+        return ask_product_llm(message, llm_product), products
+
+    return answer, products
+
+
+async def handle_product_flow_async(
+    message: str,
+    user_id: str,
+    products_data: list
+):
+    """
+    Versi async dari handle_product_flow (LLM tidak memblokir event loop).
+    """
+    answer, products, llm_product = _plan_product_flow(
+        message, user_id, products_data
+    )
+
+    if llm_product is not None:
+        return await ask_product_llm_async(message, llm_product), products
+
+    return answer, products
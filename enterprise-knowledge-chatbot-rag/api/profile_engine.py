@@ -1,7 +1,7 @@
 # api/profile_engine.py
 from typing import Tuple
 
-from knowledge.profile.retriever import ProfileRetriever
+from core.retriever import get_retriever
 from core.composer import compose_profile_answer
 
 
@@ -10,14 +10,39 @@ from core.composer import compose_profile_answer
 # =========================
 def handle_profile_flow(
     query: str,
-    top_k: int = 5
+    top_k: int = 5,
+    contexts: list | None = None
 ) -> Tuple[str | None, list]:
     """
     Return (answer, contexts)
+    contexts terisi → hasil fan-out retrieval, tanpa search ulang
     """
 
-    retriever = ProfileRetriever(top_k=top_k)
-    contexts = retriever.retrieve(query)
+    if contexts is None:
+        retriever = get_retriever("profile", top_k=top_k)
+        contexts = retriever.retrieve(query)
+
+    if not contexts:
+        return None, []
+
+    answer = compose_profile_answer(query, contexts)
+    return answer, contexts
+
+
+
+async def handle_profile_flow_async(
+    query: str,
+    top_k: int = 5,
+    contexts: list | None = None
+) -> Tuple[str | None, list]:
+    """
+    Versi async dari handle_profile_flow.
+    Embedding query di-await, composer profile murni CPU (tanpa LLM).
+    """
+
+    if contexts is None:
+        retriever = get_retriever("profile", top_k=top_k)
+        contexts = await retriever.aretrieve(query)
 
     if not contexts:
         return None, []
@@ -1,7 +1,13 @@
 import os
 import json
 import re
-from rapidfuzz import fuzz
+import threading
+import time
+from rapidfuzz import fuzz, process
+
+from config import PRODUCT_JSON, VECTORSTORE_RELOAD_INTERVAL
+from core.bm25 import BM25Index
+from core.telemetry import timed
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_FILE = os.path.join(BASE_DIR, "..", "data", "products.json")
@@ -11,37 +17,219 @@ STOPWORDS = {
     "untuk", "berapa", "produk", "cni", "apakah", "dan"
 }
 
+# Skor minimum fuzzy (sama dengan scan lama)
+MIN_SCORE = 50
+
+# Jumlah kandidat BM25 yang di-rescore dengan rapidfuzz
+CANDIDATES = 50
+
+# Toleransi typo: token query di luar vocabulary dicocokkan ke vocabulary
+TYPO_MIN_SCORE = 80
+TYPO_MIN_LEN = 3
+TYPO_CACHE_SIZE = 10_000
+
 def normalize(text: str) -> str:
     text = text.lower()
     text = re.sub(r"[^a-z0-9\s]", " ", text)  # hapus ? ! .
     words = [w for w in text.split() if w not in STOPWORDS]
     return " ".join(words)
 
+
+# =========================
+# PRODUCT INDEX
+# =========================
+class ProductIndex:
+    """
+    Index pencarian produk, dibangun SEKALI per versi katalog.
+
+    1. Exact map kode / nama / alias → produk (O(1))
+    2. Inverted index + BM25 → kandidat (hanya posting token query)
+    3. rapidfuzz token_set_ratio hanya untuk kandidat (bukan seluruh katalog)
+    """
+
+    def __init__(self, products: list):
+        self.products = products
+
+        # corpus lowercase dihitung sekali (dulu: setiap query × setiap produk)
+        self.corpus = [
+            " ".join([
+                p.get("nama", ""),
+                p.get("kode", ""),
+                p.get("deskripsi", ""),
+                p.get("fungsi", "")
+            ]).lower()
+            for p in products
+        ]
+
+        self.bm25 = BM25Index([normalize(c).split() for c in self.corpus])
+        self.vocabulary = self.bm25.vocabulary
+        self._typo_cache: dict[str, list[str]] = {}
+
+        # kode asli → produk (state percakapan menyimpan kode saja)
+        self.by_code = {p["kode"]: p for p in products if p.get("kode")}
+
+        # kode, nama, alias (jika ada di products.json) → posisi produk
+        self.exact: dict[str, int] = {}
+        for i, p in enumerate(products):
+            keys = [p.get("kode", ""), p.get("nama", "")]
+            aliases = p.get("alias") or p.get("aliases") or []
+            if isinstance(aliases, dict):
+                # skema products.json: {"nama": [...], "kode": [...]}
+                keys += list(aliases.get("nama") or []) + list(aliases.get("kode") or [])
+            elif isinstance(aliases, str):
+                keys.append(aliases)
+            else:
+                keys += list(aliases)
+
+            for key in keys:
+                key = normalize(str(key))
+                if key:
+                    self.exact.setdefault(key, i)
+
+    def _expand_typos(self, tokens: list[str]) -> list[str]:
+        expanded = list(tokens)
+
+        for token in tokens:
+            if token in self.bm25.postings or len(token) < TYPO_MIN_LEN:
+                continue
+
+            similar = self._typo_cache.get(token)
+            if similar is None:
+                similar = [
+                    match for match, _, _ in process.extract(
+                        token, self.vocabulary,
+                        scorer=fuzz.ratio,
+                        score_cutoff=TYPO_MIN_SCORE,
+                        limit=3
+                    )
+                ]
+                if len(self._typo_cache) >= TYPO_CACHE_SIZE:
+                    self._typo_cache.clear()
+                self._typo_cache[token] = similar
+
+            expanded += similar
+
+        return expanded
+
+    def search(self, query: str, limit: int = 3) -> list:
+        q = normalize(query)
+        if not q:
+            return []
+
+        tokens = q.split()
+        results: list[int] = []
+
+        # 1️⃣ EXACT: seluruh query / salah satu token = kode / nama / alias
+        for key in [q, *tokens]:
+            i = self.exact.get(key)
+            if i is not None and i not in results:
+                results.append(i)
+
+        # 2️⃣ KANDIDAT BM25 (+ token typo)
+        candidates = self.bm25.top_n(self._expand_typos(tokens), CANDIDATES)
+
+        # 3️⃣ FUZZY RESCORE (skor sama dengan scan lama), seri → BM25
+        if candidates:
+            bm25 = dict(candidates)
+            scored = process.extract(
+                q, {i: self.corpus[i] for i in bm25},
+                scorer=fuzz.token_set_ratio,
+                score_cutoff=MIN_SCORE,
+                limit=None
+            )
+            scored.sort(key=lambda x: (-x[1], -bm25[x[2]], x[2]))
+
+            for _, _, i in scored:
+                if i not in results:
+                    results.append(i)
+
+        return [self.products[i] for i in results[:limit]]
+
+
+# Index untuk list produk terakhir (list yang sama dipakai tiap request)
+_index: ProductIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_product_index(products: list) -> ProductIndex:
+    global _index
+
+    index = _index
+    if index is None or index.products is not products:
+        with _index_lock:
+            index = _index
+            if index is None or index.products is not products:
+                started = time.perf_counter()
+                index = ProductIndex(products)
+                _index = index
+                print(
+                    f"🔎 Product index built ({len(products)} products, "
+                    f"{(time.perf_counter() - started) * 1000:.0f} ms)"
+                )
+
+    return index
+
+
+@timed("search_products")
 def search_products(query: str, products: list, limit: int = 3):
-    q = normalize(query)
-    scored = []
+    return get_product_index(products).search(query, limit)
+
+
+def products_by_code(codes, products: list) -> list:
+    """
+    Kode → dict produk dari katalog saat ini (kode yang sudah hilang dilewati).
+    """
+    by_code = get_product_index(products).by_code
+    return [by_code[c] for c in codes if c in by_code]
+
+
+# =========================
+# PRODUCT CATALOG (HOT RELOAD)
+# =========================
+class ProductCatalog:
+    """
+    products.json yang di-load sekali dan di-reload saat file berubah
+    (dicek tiap check_interval detik). List baru → index dibangun ulang.
+    """
+
+    def __init__(self, path=PRODUCT_JSON, check_interval: float = VECTORSTORE_RELOAD_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._products: list = []
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def products(self) -> list:
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return self._products
 
-    for p in products:
-        corpus = " ".join([
-            p.get("nama", ""),
-            p.get("kode", ""),
-            p.get("deskripsi", ""),
-            p.get("fungsi", "")
-        ]).lower()
+        with self._lock:
+            stat = os.stat(self.path)
+            version = (stat.st_mtime_ns, stat.st_size)
 
-        score = fuzz.token_set_ratio(q, corpus)
+            if version != self._version:
+                try:
+                    with open(self.path, encoding="utf-8") as f:
+                        products = json.load(f)
+                except json.JSONDecodeError as e:
+                    # file sedang ditulis → pakai katalog lama, cek lagi nanti
+                    if self._version is None:
+                        raise
+                    print("⚠️ products.json reload failed:", e)
+                    products = None
 
-        if score >= 50:
-            scored.append((score, p))
+                if products is not None:
+                    self._products = products
+                    self._version = version
+                    get_product_index(products)  # build sekarang, bukan di request pertama
 
-    # sort berdasarkan skor
-    scored.sort(key=lambda x: x[0], reverse=True)
+            self._checked_at = time.monotonic()
+            return self._products
 
-    # fallback: jika kosong → ambil produk teratas
-    #if not scored and products:
-    #    return products[:1]
 
-    return [p for _, p in scored[:limit]]
+catalog = ProductCatalog()
 
 
 def load_products() -> list:
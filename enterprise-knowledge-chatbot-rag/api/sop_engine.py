@@ -1,10 +1,11 @@
 # api/sop_engine.py
+import asyncio
 from typing import Tuple
 
 from rag.retriever import search_sop
 from rag.sop_llm import ask_sop_llm
 
-from knowledge.profile.retriever import ProfileRetriever
+from core.retriever import get_retriever
 from core.composer import compose_profile_answer
 
 from api.learning import save_pending
@@ -16,8 +17,7 @@ from rag.call_llm import call_llm
 # PROFILE (fallback SOP)
 # =========================
 def _search_profile(query: str, top_k: int = 5):
-    retriever = ProfileRetriever(top_k=top_k)
-    return retriever.retrieve(query)
+    return get_retriever("profile", top_k=top_k).retrieve(query)
 
 
 def _ask_profile_llm(query: str, contexts: list) -> str:
@@ -47,21 +47,41 @@ def _ask_general(question: str) -> str:
 # =========================
 # MAIN SOP HANDLER
 # =========================
-def handle_sop_flow(query: str) -> Tuple[str | None, list]:
+def handle_sop_flow(
+    query: str,
+    profile_contexts: list | None = None,
+    sop_contexts: list | None = None
+) -> Tuple[str | None, list]:
     """
     Return (answer, contexts)
     contexts dikembalikan kosong jika bukan SOP
+    sop_contexts / profile_contexts terisi → hasil fan-out, tanpa embed & search ulang
     """
 
     # 1️⃣ SOP SEARCH
-    contexts = search_sop(query, top_k=5)
+    contexts = sop_contexts if sop_contexts is not None else search_sop(query, top_k=5)
     if contexts:
         return ask_sop_llm(query, contexts), contexts
 
     # 2️⃣ PROFILE FALLBACK
-    profile_contexts = _search_profile(query, top_k=5)
+    if profile_contexts is None:
+        profile_contexts = _search_profile(query, top_k=5)
     if profile_contexts:
         return _ask_profile_llm(query, profile_contexts), []
 
     # 3️⃣ SOP GENERAL
-    return None, []
\ No newline at end of file
+    return None, []
+
+
+async def handle_sop_flow_async(
+    query: str,
+    profile_contexts: list | None = None,
+    sop_contexts: list | None = None
+) -> Tuple[str | None, list]:
+    """
+    Versi async dari handle_sop_flow.
+    search_sop / ask_sop_llm (rag.*) masih sinkron,
+    jadi dijalankan di thread agar event loop tetap bebas.
+    """
+
+    return await asyncio.to_thread(handle_sop_flow, query, profile_contexts, sop_contexts)
@@ -1,6 +1,5 @@
 import os
-import json
-from pathlib import Path
+import time
 
 from telegram.ext import ApplicationBuilder, MessageHandler, filters
 from telegram import Update
@@ -8,7 +7,8 @@ from telegram.ext import ContextTypes
 from telegram import error
 
 
-from api.chat_engine import handle_chat_engine
+from api.chat_engine import handle_chat_engine_astream
+from api.search import catalog
 from dotenv import load_dotenv
 
 # =========================
@@ -18,13 +18,28 @@ load_dotenv()
 BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 
 # =========================
-# LOAD PRODUCTS (WAJIB)
+# STREAMING CONFIG
 # =========================
-ROOT_DIR = Path(__file__).resolve().parent.parent
-PRODUCT_FILE = ROOT_DIR / "data/json/products.json"
+# Telegram membatasi edit pesan (~1x per detik per chat)
+EDIT_INTERVAL = 1.0
+MAX_MESSAGE_LEN = 4000  # Telegram limit ~4096 char
 
-with open(PRODUCT_FILE, encoding="utf-8") as f:
-    PRODUCTS = json.load(f)
+
+async def _show(update: Update, sent, text: str):
+    """
+    Kirim pesan pertama, lalu edit pesan yang sama untuk update berikutnya.
+    """
+    text = text[:MAX_MESSAGE_LEN]
+
+    if sent is None:
+        return await update.message.reply_text(text)
+
+    try:
+        await sent.edit_text(text)
+    except error.BadRequest:
+        # "Message is not modified" → aman diabaikan
+        pass
+    return sent
 
 
 # =========================
@@ -34,26 +49,47 @@ async def chat_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = update.message.text
     user_id = update.effective_user.id
 
-    answer, _ = handle_chat_engine(
+    events = handle_chat_engine_astream(
         message=text,
         user_id=str(user_id),
         platform="telegram",
-        products_data=PRODUCTS
+        products_data=catalog.products()
     )
 
-    # Telegram limit ~4096 char
-    if len(answer) > 4000:
-        answer = answer[:4000]
+    sent = None
+    partial = ""
+    answer = "AI sedang tidak tersedia."
+    last_edit = 0.0
+
     try:
-        await update.message.reply_text(answer)
-    except NetworkError as e:
+        # pipeline async → tidak memblokir update Telegram lain
+        async for event in events:
+            if event["type"] == "token":
+                partial += event["text"]
+                now = time.monotonic()
+                if partial.strip() and now - last_edit >= EDIT_INTERVAL:
+                    sent = await _show(update, sent, partial)
+                    last_edit = now
+
+            elif event["type"] == "done":
+                answer = event["answer"]
+
+        # jawaban final (bisa berisi prefix yang tidak ikut di-stream)
+        await _show(update, sent, answer)
+
+    except error.NetworkError as e:
         print("⚠️ TELEGRAM NETWORK ERROR:", e)
 
 # =========================
 # RUN BOT
 # =========================
 def run_bot():
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    app = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(True)  # chat_handler async → proses paralel
+        .build()
+    )
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, chat_handler))
     print("🤖 Telegram Bot Running...")
     app.run_polling()
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # ==================================================
@@ -8,13 +9,17 @@ BASE_DIR = Path(__file__).resolve().parent
 # ==================================================
 # DATA ROOT
 # ==================================================
-DATA_DIR = BASE_DIR / "data"
+# DATA_DIR / RUNTIME_LOG_DIR bisa dialihkan lewat env (sandbox
+# scripts.load_test --spawn) → data, cache & log asli tidak tersentuh
+DATA_DIR = Path(os.getenv("DATA_DIR", BASE_DIR / "data"))
+RUNTIME_LOG_DIR = Path(os.getenv("RUNTIME_LOG_DIR", BASE_DIR / "logs"))
 
 RAW_DIR = DATA_DIR / "raw"
 PROCESSED_DIR = DATA_DIR / "processed"
 DATA_RAW_PDF_DIR = DATA_DIR / "raw" / "pdf"
 VECTORSTORE_DIR = DATA_DIR / "vectorstore"
 LOG_DIR = DATA_DIR / "logs"
+CACHE_DIR = DATA_DIR / "cache"
 
 # ==================================================
 # RAW DATA FILES
@@ -25,8 +30,71 @@ PRODUCT_JSON = DATA_DIR / "json" / "products.json"
 # VECTOR STORE PATHS
 # ==================================================
 SOP_VECTOR_DIR = VECTORSTORE_DIR / "sop"
-PRODUCT_VECTOR_DIR = VECTORSTORE_DIR / "products"
+PRODUCT_VECTOR_DIR = VECTORSTORE_DIR / "product"
 PROFILE_VECTOR_DIR = VECTORSTORE_DIR / "profile"
+NEWS_VECTOR_DIR = VECTORSTORE_DIR / "news"
+
+# Domain → folder vector store (dipakai oleh core.vectorstore.registry)
+VECTOR_DIRS = {
+    "sop": SOP_VECTOR_DIR,
+    "profile": PROFILE_VECTOR_DIR,
+    "product": PRODUCT_VECTOR_DIR,
+    "news": NEWS_VECTOR_DIR,
+}
+
+# Interval (detik) cek perubahan file index di disk untuk hot-reload
+VECTORSTORE_RELOAD_INTERVAL = 5
+
+# Tipe index FAISS per domain (dipakai pipeline saat build):
+# - "flat"  → brute force, exact (cocok untuk korpus kecil)
+# - "hnsw"  → graph ANN, tanpa training, memori ~ flat + graph
+# - "ivfpq" → inverted list + product quantization, memori kecil,
+#             perlu training (sampel); fallback ke flat jika korpus kecil
+INDEX_TYPES = {
+    "sop": "flat",
+    "profile": "flat",
+    "product": "flat",
+    "news": "hnsw",
+}
+
+# Parameter build
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+IVFPQ_NLIST = None  # None → ~4·sqrt(N)
+IVFPQ_M = 64        # sub-quantizer (harus membagi dimensi; M kecil → recall turun drastis)
+IVFPQ_NBITS = 8
+IVF_TRAIN_SAMPLE = 50_000
+
+# Parameter search (diterapkan saat index di-load, bisa di-tune per domain)
+ANN_SEARCH_PARAMS = {
+    "default": {"efSearch": 64, "nprobe": 16},
+    "news": {"efSearch": 64, "nprobe": 16},
+}
+
+# Hybrid retrieval (BM25 + FAISS, reciprocal-rank fusion) per domain
+HYBRID_DOMAINS = {"sop", "profile", "product"}
+HYBRID_RRF_K = 60
+HYBRID_CANDIDATES = 20  # kandidat per retriever sebelum fusion
+# Query pendek yang semua katanya ada di korpus (mis. "eskalasi", "retur")
+# dijawab BM25 saja, tanpa embedding call
+HYBRID_LEXICAL_MAX_TOKENS = 2
+
+# Fan-out: query di-embed sekali, domain di bawah dicari paralel,
+# router memilih dari keyword + score (core.router.route_scored)
+FANOUT_DOMAINS = ("sop", "profile", "product")
+FANOUT_MIN_SCORE = 0.60  # cosine minimum domain non-keyword untuk dipilih
+
+# Rerank: over-retrieve RERANK_CANDIDATES chunk → rerank → top_k ke konteks
+# - "blend"         → cosine FAISS + BM25 antar kandidat (tanpa model, < 1 ms)
+# - "cross-encoder" → sentence-transformers CrossEncoder di CPU (opsional)
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "1") != "0"
+RERANK_BACKEND = os.getenv("RERANK_BACKEND", "blend")
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+RERANK_CANDIDATES = 50
+RERANK_BLEND_ALPHA = 0.7  # bobot cosine (sisanya BM25)
+RERANK_BATCH_SIZE = 16
+RERANK_BUDGET_MS = 150    # kandidat di luar budget tetap urutan retrieval
+RERANK_CACHE_ITEMS = 20_000
 
 # ==================================================
 # LOG & MEMORY FILES
@@ -38,7 +106,151 @@ LEARNED_FILE = LOG_DIR / "learned_answers.json"
 # ==================================================
 # LLM CONFIG
 # ==================================================
-OLLAMA_URL = "http://localhost:11434/api/chat"
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+OLLAMA_URL = f"{OLLAMA_BASE_URL}/api/chat"
 MODEL = "gemma3:4b"
 EMBED_MODEL = "nomic-embed-text"
-OLLAMA_EMBED_URL = "http://localhost:11434/api/embeddings"
+OLLAMA_EMBED_URL = f"{OLLAMA_BASE_URL}/api/embeddings"
+
+# ==================================================
+# OLLAMA HTTP CLIENT
+# ==================================================
+# Timeout per endpoint: (connect, read) dalam detik.
+# Read timeout generate tetap panjang karena VM CPU-only.
+OLLAMA_CONNECT_TIMEOUT = 5
+OLLAMA_READ_TIMEOUTS = {
+    "generate": 180,
+    "chat": 120,
+    "embeddings": 60,
+    "embed": 120,  # batch embedding (banyak teks per request)
+}
+OLLAMA_DEFAULT_READ_TIMEOUT = 60
+
+# Retry hanya untuk gagal koneksi & status sementara (429/502/503/504)
+OLLAMA_MAX_RETRIES = 2
+OLLAMA_RETRY_BACKOFF = 0.5
+
+# Connection pool (keep-alive) & batas request paralel ke Ollama
+# (embedding, per proses: thread sync + task async berbagi kuota ini;
+# generate / chat lewat LLM SCHEDULER di bawah)
+OLLAMA_POOL_SIZE = 16
+OLLAMA_MAX_CONCURRENCY = 4
+OLLAMA_QUEUE_TIMEOUT = 30
+
+# ==================================================
+# LLM SCHEDULER (GENERATE / CHAT)
+# ==================================================
+# Slot = request yang benar-benar diproses paralel oleh Ollama
+# (env OLLAMA_NUM_PARALLEL server Ollama). Lebih dari itu hanya antre
+# di dalam Ollama → timeout. gunicorn.conf.py membagi slot per worker:
+# LLM_SLOTS = max(1, OLLAMA_NUM_PARALLEL // API_WORKERS).
+# Batas: tiap worker minimal 1 slot → API_WORKERS > OLLAMA_NUM_PARALLEL
+# berarti total slot = API_WORKERS (oversubscribe, gunicorn memberi
+# peringatan); sisa bagi (mis. 6 // 4) tidak terpakai.
+OLLAMA_NUM_PARALLEL = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+LLM_SLOTS = int(os.getenv("LLM_SLOTS", OLLAMA_NUM_PARALLEL))
+
+# Urutan = prioritas; panggilan LLM tanpa lane → lane terakhir
+LLM_LANES = ("product", "sop", "general")
+
+# Detik maksimum antre per lane. Estimasi antre di atas batas →
+# ditolak seketika, pemanggil memakai jawaban non-LLM
+LLM_LANE_MAX_WAIT = {"product": 20, "sop": 15, "general": 5}
+LLM_LANE_MAX_QUEUE = 64     # waiter per lane
+LLM_SERVICE_TIME = 8.0      # detik, estimasi awal durasi satu generate (EWMA)
+
+# ==================================================
+# BATCH EMBEDDING (INGESTION)
+# ==================================================
+EMBED_BATCH_SIZE = 32
+EMBED_MAX_WORKERS = 4
+
+# ==================================================
+# EMBEDDING CACHE (INGESTION + QUERY)
+# ==================================================
+# Tier 1: LRU in-process, tier 2: SQLite di disk (dibagi antar proses)
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "1") != "0"
+EMBED_CACHE_FILE = CACHE_DIR / "embeddings.sqlite3"
+EMBED_CACHE_MEMORY_ITEMS = 4096
+EMBED_CACHE_DISK_ITEMS = 200_000
+
+# ==================================================
+# SEMANTIC ANSWER CACHE (CHAT ENGINE)
+# ==================================================
+# Jawaban dipakai ulang jika pertanyaan mirip (cosine) DAN domain sama
+# DAN kata kunci (nama produk dsb.) cukup overlap DAN korpus belum berubah
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") != "0"
+ANSWER_CACHE_THRESHOLD = 0.95
+ANSWER_CACHE_MIN_OVERLAP = 0.5
+ANSWER_CACHE_TTL = 3600  # detik
+ANSWER_CACHE_MAX_ITEMS = 1000
+
+# ==================================================
+# CONTEXT ASSEMBLY (PROMPT RAG)
+# ==================================================
+# Budget token konteks per model LLM; estimasi token = karakter / CHARS_PER_TOKEN
+# (prompt lebih kecil → prefill Ollama di VM CPU lebih cepat)
+CONTEXT_TOKEN_BUDGET = {
+    "default": 600,
+    "gemma3:4b": 600,
+}
+CONTEXT_CHARS_PER_TOKEN = 3.5
+# Chunk dianggap duplikat jika >= 80% shingle 3-kata-nya ada di chunk lain
+CONTEXT_DEDUP_THRESHOLD = 0.8
+
+# ==================================================
+# QUERY ROUTER (KEYWORD → CENTROID)
+# ==================================================
+# Keyword exact dulu; tanpa keyword → cosine query vs centroid domain
+# (contoh berlabel + pertanyaan di chat_logs.jsonl)
+ROUTER_SEMANTIC_ENABLED = os.getenv("ROUTER_SEMANTIC_ENABLED", "1") != "0"
+ROUTER_LOG_FILE = DATA_DIR / "chat_logs.jsonl"
+ROUTER_LOG_EXAMPLES = 2000  # baris terakhir log yang dipakai sebagai contoh
+ROUTER_MIN_SCORE = 0.55     # cosine minimum ke centroid pemenang
+ROUTER_MARGIN = 0.03        # selisih minimum dengan centroid kedua
+ROUTER_CACHE_ITEMS = 10_000
+ROUTER_RETRY_INTERVAL = 60  # detik sebelum build centroid dicoba lagi
+
+# ==================================================
+# DEPLOYMENT (GUNICORN MULTI-WORKER)
+# ==================================================
+# gunicorn -c gunicorn.conf.py api.main:app
+# Index, metadata & katalog di-load sekali di master (preload) lalu
+# dibagi copy-on-write ke semua worker (lihat core.prefork)
+API_BIND = os.getenv("API_BIND", "0.0.0.0:8000")
+API_WORKERS = int(os.getenv("API_WORKERS", os.cpu_count() or 1))
+API_TIMEOUT = 200  # detik; > read timeout generate Ollama terpanjang
+
+# ==================================================
+# CONVERSATION STATE (FOLLOW-UP PRODUK)
+# ==================================================
+# Produk terakhir per user (kode saja) untuk follow-up "harganya?"
+# - "memory" → LRU + TTL per proses
+# - "sqlite" → file lokal, dibagi semua worker gunicorn / bot
+CONVERSATION_BACKEND = os.getenv("CONVERSATION_BACKEND", "memory")
+CONVERSATION_DB_FILE = CACHE_DIR / "conversations.sqlite3"
+CONVERSATION_MAX_USERS = 50_000
+CONVERSATION_TTL = 1800  # detik sejak interaksi terakhir
+
+# ==================================================
+# LOG SINK (JSONL, BACKGROUND WRITER)
+# ==================================================
+# Log interaksi / confidence / chat ditulis thread terpisah, bukan di request
+LOG_QUEUE_SIZE = 10_000          # penuh → record di-drop (dihitung di stats)
+LOG_BATCH_SIZE = 500             # record per write()
+LOG_FLUSH_INTERVAL = 1.0         # detik maksimum record menunggu di queue
+LOG_ROTATE_BYTES = 50 * 1024 * 1024
+LOG_ROTATE_SECONDS = 24 * 3600
+LOG_COMPRESS = True              # file hasil rotasi di-gzip
+
+# ==================================================
+# TELEMETRY (LATENCY PER STAGE)
+# ==================================================
+# Histogram per stage pipeline → GET /metrics (format Prometheus)
+TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "1") != "0"
+TELEMETRY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 180.0,
+)
+TELEMETRY_RESERVOIR = 2048       # sampel terakhir per stage untuk p50 / p95 / p99
+TELEMETRY_LOG_REQUESTS = True    # satu baris ringkasan stage per request
@@ -0,0 +1,181 @@
+# core/ann.py
+"""
+Factory index FAISS per domain: flat / HNSW / IVF-PQ.
+
+- create_index()    → index kosong (sudah di-train untuk IVF-PQ)
+- configure()       → set efSearch / nprobe saat index di-load
+- rebuild_without() → hapus id dari index yang tidak mendukung remove_ids (HNSW)
+- as_cosine()       → konversi index flat lama (L2 / belum normalized) ke cosine
+
+Semua index pipeline dibungkus faiss.IndexIDMap (lihat ingestion.incremental),
+fungsi di sini menerima index inti maupun yang sudah dibungkus.
+"""
+
+import math
+
+import faiss
+import numpy as np
+
+from config import (
+    INDEX_TYPES,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    IVFPQ_NLIST,
+    IVFPQ_M,
+    IVFPQ_NBITS,
+    IVF_TRAIN_SAMPLE,
+    ANN_SEARCH_PARAMS,
+)
+
+INDEX_KINDS = ("flat", "hnsw", "ivfpq")
+
+
+def index_type_for(domain: str) -> str:
+    return INDEX_TYPES.get(domain, "flat")
+
+
+def _inner(index):
+    """
+    Index inti di balik IndexIDMap / IndexIDMap2.
+    """
+    index = faiss.downcast_index(index)
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def index_kind(index) -> str:
+    inner = _inner(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(inner, faiss.IndexIVF):
+        return "ivfpq"
+    return "flat"
+
+
+def _ivf_nlist(n: int) -> int:
+    return IVFPQ_NLIST or max(1, int(4 * math.sqrt(n)))
+
+
+def create_index(kind: str, vectors: np.ndarray, metric=faiss.METRIC_INNER_PRODUCT):
+    """
+    Buat index inti kosong untuk vektor [n, dim].
+    IVF-PQ di-train dengan sampel vectors; korpus terlalu kecil → flat.
+    """
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown index type: {kind} (pilihan: {INDEX_KINDS})")
+
+    n, dim = vectors.shape
+
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, metric)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        return index
+
+    if kind == "ivfpq":
+        nlist = _ivf_nlist(n)
+        # k-means butuh ~39 titik per centroid, PQ 8-bit butuh >= 256 titik
+        if n < max(39 * nlist, 2 ** IVFPQ_NBITS) or dim % IVFPQ_M:
+            print(f"⚠️ IVF-PQ tidak cocok (n={n}, dim={dim}) → fallback flat")
+        else:
+            quantizer = (
+                faiss.IndexFlatIP(dim) if metric == faiss.METRIC_INNER_PRODUCT
+                else faiss.IndexFlatL2(dim)
+            )
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, IVFPQ_M, IVFPQ_NBITS, metric)
+
+            sample = vectors
+            if n > IVF_TRAIN_SAMPLE:
+                rng = np.random.default_rng(0)
+                sample = vectors[rng.choice(n, IVF_TRAIN_SAMPLE, replace=False)]
+
+            index.train(np.ascontiguousarray(sample, dtype="float32"))
+            return index
+
+    if metric == faiss.METRIC_INNER_PRODUCT:
+        return faiss.IndexFlatIP(dim)
+    return faiss.IndexFlatL2(dim)
+
+
+def configure(index, domain: str):
+    """
+    Terapkan parameter search (efSearch / nprobe) untuk domain.
+    """
+    params = {**ANN_SEARCH_PARAMS["default"], **ANN_SEARCH_PARAMS.get(domain, {})}
+    set_search_params(index, **params)
+
+
+def set_search_params(index, efSearch: int | None = None, nprobe: int | None = None):
+    inner = _inner(index)
+
+    if isinstance(inner, faiss.IndexHNSW) and efSearch:
+        inner.hnsw.efSearch = efSearch
+
+    if isinstance(inner, faiss.IndexIVF) and nprobe:
+        inner.nprobe = min(nprobe, inner.nlist)
+
+
+def reconstruct_all(index) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (vektor, id) semua entry IndexIDMap. Lossy untuk IVF-PQ.
+    """
+    inner = _inner(index)
+    vectors = inner.reconstruct_n(0, inner.ntotal)
+    ids = faiss.vector_to_array(faiss.downcast_index(index).id_map)
+    return vectors, ids
+
+
+def rebuild_without(index, remove: np.ndarray, metric=None):
+    """
+    Fallback remove_ids untuk index tanpa dukungan hapus (HNSW):
+    ambil vektor yang tersisa lalu build ulang index dengan tipe sama.
+    """
+    vectors, ids = reconstruct_all(index)
+    keep = ~np.isin(ids, remove)
+    metric = index.metric_type if metric is None else metric
+
+    fresh = faiss.IndexIDMap(create_index(index_kind(index), vectors[keep], metric))
+    if keep.any():
+        fresh.add_with_ids(vectors[keep], ids[keep])
+    return fresh
+
+
+def sample_is_normalized(index, sample: int = 256, tol: float = 1e-3) -> bool | None:
+    """
+    Cek norma sebagian vektor index (store lama tanpa manifest).
+    None jika vektor tidak bisa direkonstruksi secara exact (IVF-PQ).
+    """
+    if index_kind(index) == "ivfpq":
+        return None
+
+    inner = _inner(index)
+    n = min(sample, inner.ntotal)
+    if n == 0:
+        return True
+
+    norms = np.linalg.norm(inner.reconstruct_n(0, n), axis=1)
+    return bool(np.all(np.abs(norms - 1.0) < tol))
+
+
+def as_cosine(index):
+    """
+    Salinan in-memory index flat sebagai IndexFlatIP atas vektor normalized
+    (id IndexIDMap dipertahankan). Index ANN harus di-rebuild oleh pipeline.
+    """
+    if index_kind(index) != "flat":
+        raise ValueError(f"Index {index_kind(index)} tidak bisa dikonversi, rebuild dengan --full")
+
+    inner = _inner(index)
+    vectors = np.ascontiguousarray(inner.reconstruct_n(0, inner.ntotal), dtype="float32")
+    faiss.normalize_L2(vectors)
+
+    flat = faiss.IndexFlatIP(inner.d)
+    outer = faiss.downcast_index(index)
+
+    if isinstance(outer, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        converted = faiss.IndexIDMap(flat)
+        converted.add_with_ids(vectors, faiss.vector_to_array(outer.id_map))
+        return converted
+
+    flat.add(vectors)
+    return flat
@@ -0,0 +1,216 @@
+# core/answer_cache.py
+"""
+Semantic Answer Cache
+=====================
+
+Cache jawaban final chat engine berdasarkan kemiripan pertanyaan.
+Berada di samping get_learned_answer (exact match), bukan menggantikannya.
+
+Sebuah entry dipakai ulang hanya jika SEMUA syarat terpenuhi:
+- cosine(query_vec, entry_vec) >= ANSWER_CACHE_THRESHOLD
+- domain tag sama (hasil route_query)
+- overlap kata kunci >= ANSWER_CACHE_MIN_OVERLAP
+  → "harga ginseng coffee" tidak menjawab "harga sunchlorella"
+  walau embedding-nya mirip
+- versi korpus sama (products.json + semua vector index)
+- belum melewati TTL
+
+Eviction: LRU (ANSWER_CACHE_MAX_ITEMS) + TTL.
+Korpus berubah (pipeline rebuild / products.json diganti) → cache dikosongkan.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from config import (
+    PRODUCT_JSON,
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_THRESHOLD,
+    ANSWER_CACHE_MIN_OVERLAP,
+    ANSWER_CACHE_TTL,
+    ANSWER_CACHE_MAX_ITEMS,
+)
+from core.vectorstore import registry
+
+
+# versi korpus terakhir → stat file maksimal sekali per interval reload registry
+_corpus = {"checked_at": float("-inf"), "version": None}
+
+
+def corpus_version() -> tuple:
+    """
+    Versi korpus = mtime/size products.json + versi file tiap vector store.
+    Di-memo selama registry.reload_interval (index juga baru di-reload
+    registry setelah interval itu), bukan stat semua file tiap get / put.
+    """
+    now = time.monotonic()
+    if now - _corpus["checked_at"] < registry.reload_interval:
+        return _corpus["version"]
+
+    try:
+        stat = PRODUCT_JSON.stat()
+        products = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        products = None
+
+    _corpus["version"] = (products, tuple(sorted(registry.disk_versions().items())))
+    _corpus["checked_at"] = now
+    return _corpus["version"]
+
+
+def _overlap(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        min_overlap: float = ANSWER_CACHE_MIN_OVERLAP,
+        ttl: float = ANSWER_CACHE_TTL,
+        max_items: int = ANSWER_CACHE_MAX_ITEMS,
+        enabled: bool = ANSWER_CACHE_ENABLED,
+        version_fn=corpus_version,
+    ):
+        self.threshold = threshold
+        self.min_overlap = min_overlap
+        self.ttl = ttl
+        self.max_items = max_items
+        self.enabled = enabled
+        self.version_fn = version_fn
+
+        self._entries: OrderedDict[int, dict] = OrderedDict()
+        self._next_id = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+        # matriks vektor (dibangun ulang lazy saat entry berubah)
+        self._matrix = None
+        self._matrix_ids: list[int] = []
+
+        self.hits = 0
+        self.misses = 0
+
+    # -------------------------
+    # INTERNAL
+    # -------------------------
+    def _check_version(self):
+        version = self.version_fn()
+        if version != self._version:
+            if self._entries:
+                print("♻️ Answer cache invalidated (corpus changed)")
+            self._entries.clear()
+            self._matrix = None
+            self._version = version
+
+    def _expire(self, now: float):
+        expired = [k for k, e in self._entries.items() if now - e["created"] > self.ttl]
+        for k in expired:
+            del self._entries[k]
+        if expired:
+            self._matrix = None
+
+    def _vectors(self):
+        if self._matrix is None:
+            self._matrix_ids = list(self._entries)
+            self._matrix = (
+                np.stack([self._entries[k]["vec"] for k in self._matrix_ids])
+                if self._matrix_ids else None
+            )
+        return self._matrix, self._matrix_ids
+
+    # -------------------------
+    # PUBLIC API
+    # -------------------------
+    def get(self, query_vec: np.ndarray, domain: str, keywords) -> tuple | None:
+        """
+        Cari jawaban untuk pertanyaan yang mirip.
+        Return (answer, products) atau None.
+        """
+        if not self.enabled:
+            return None
+
+        keywords = frozenset(keywords)
+
+        with self._lock:
+            self._check_version()
+            self._expire(time.time())
+
+            matrix, ids = self._vectors()
+            if matrix is None:
+                self.misses += 1
+                return None
+
+            # vektor ter-normalisasi → dot product = cosine
+            scores = matrix @ np.asarray(query_vec, dtype="float32")
+
+            for i in np.argsort(-scores):
+                if scores[i] < self.threshold:
+                    break
+
+                entry = self._entries[ids[i]]
+                if entry["domain"] != domain:
+                    continue
+                if _overlap(entry["keywords"], keywords) < self.min_overlap:
+                    continue
+
+                self._entries.move_to_end(ids[i])
+                self.hits += 1
+                print(f"⚡ ANSWER CACHE HIT ({scores[i]:.3f}): {entry['question']}")
+                return entry["answer"], entry["products"]
+
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        question: str,
+        query_vec: np.ndarray,
+        domain: str,
+        keywords,
+        answer: str,
+        products: list,
+    ):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._check_version()
+
+            self._entries[self._next_id] = {
+                "question": question,
+                "vec": np.asarray(query_vec, dtype="float32"),
+                "domain": domain,
+                "keywords": frozenset(keywords),
+                "answer": answer,
+                "products": products,
+                "created": time.time(),
+            }
+            self._next_id += 1
+
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+            self._matrix = None
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "items": len(self._entries),
+        }
+
+
+answer_cache = AnswerCache()
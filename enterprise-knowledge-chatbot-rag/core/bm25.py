@@ -0,0 +1,289 @@
+# core/bm25.py
+"""
+BM25 (Okapi) di atas inverted index (CSR).
+
+- Dibangun sekali dari list dokumen yang sudah di-tokenize, atau dibuka
+  dari file hasil save() (ingestion) → array di-mmap, tanpa tokenize
+  ulang korpus saat load
+- Query hanya menyentuh posting list token yang muncul di query
+  → biaya ~O(jumlah posting token query), bukan O(korpus × panjang teks)
+
+FORMAT DI DISK (prefix bm25.)
+- bm25.vocab.bin      → token terurut (utf-8) disambung tanpa separator
+- bm25.vocab.npy      → int64[V + 1] byte offset token di vocab.bin
+- bm25.offsets.npy    → int64[V + 1] posting token r = [offsets[r], offsets[r + 1])
+- bm25.docs.npy       → int32[nnz] doc id (posisi record)
+- bm25.tfs.npy        → float32[nnz] term frequency
+- bm25.doclen.npy     → float32[n_docs] jumlah token per dokumen
+"""
+
+import mmap
+import os
+import re
+from collections import Counter
+from collections.abc import Mapping
+from pathlib import Path
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Kata fungsi Bahasa Indonesia yang tidak membawa makna pencarian
+STOPWORDS = {
+    "apa", "apakah", "itu", "ini", "yang", "dan", "atau", "di", "ke", "dari",
+    "untuk", "dengan", "pada", "adalah", "bagaimana", "cara", "saya", "kami",
+    "anda", "bisa", "ada", "tidak", "jika", "akan", "dalam", "oleh", "juga",
+}
+
+# Naikkan jika tokenize() / STOPWORDS / format file berubah → file BM25
+# lama diabaikan dan index dibangun ulang saat load (lihat core.vectorstore)
+BM25_VERSION = 1
+
+VOCAB_FILE = "bm25.vocab.bin"
+VOCAB_OFFSETS_FILE = "bm25.vocab.npy"
+OFFSETS_FILE = "bm25.offsets.npy"
+DOCS_FILE = "bm25.docs.npy"
+TFS_FILE = "bm25.tfs.npy"
+DOC_LEN_FILE = "bm25.doclen.npy"
+
+
+def tokenize(text: str, drop_stopwords: bool = True) -> list[str]:
+    tokens = _TOKEN_RE.findall(text.lower())
+    if drop_stopwords:
+        tokens = [t for t in tokens if t not in STOPWORDS]
+    return tokens
+
+
+# =========================
+# VOCABULARY (MMAP)
+# =========================
+class _VocabFile:
+    """
+    token → baris, binary search di atas vocab.bin (mmap).
+    Interface sama dengan dict yang dipakai index in-memory.
+    """
+
+    def __init__(self, blob, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def _token(self, i: int) -> bytes:
+        return self._blob[int(self._offsets[i]):int(self._offsets[i + 1])]
+
+    def get(self, token: str, default=None):
+        key = token.encode("utf-8")
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._token(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self._token(lo) == key:
+            return lo
+        return default
+
+    def __contains__(self, token) -> bool:
+        return self.get(token) is not None
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._token(i).decode("utf-8")
+
+
+class _Postings(Mapping):
+    """
+    token → (doc ids int32, tf float32), view di atas array CSR.
+    """
+
+    def __init__(self, index: "BM25Index"):
+        self._index = index
+
+    def __getitem__(self, token):
+        row = self._index._rows.get(token)
+        if row is None:
+            raise KeyError(token)
+        return self._index._posting(row)
+
+    def __contains__(self, token) -> bool:
+        return token in self._index._rows
+
+    def __iter__(self):
+        return iter(self._index._rows)
+
+    def __len__(self) -> int:
+        return len(self._index._rows)
+
+
+# =========================
+# INDEX
+# =========================
+class BM25Index:
+    def __init__(self, docs: list[list[str]], k1: float = 1.5, b: float = 0.75):
+        postings: dict[str, tuple[list, list]] = {}
+        for doc_id, tokens in enumerate(docs):
+            for token, tf in Counter(tokens).items():
+                ids, tfs = postings.setdefault(token, ([], []))
+                ids.append(doc_id)
+                tfs.append(tf)
+
+        vocab = sorted(postings)
+        offsets = np.zeros(len(vocab) + 1, dtype="int64")
+        np.cumsum([len(postings[t][0]) for t in vocab], out=offsets[1:])
+
+        self._setup(
+            rows={token: r for r, token in enumerate(vocab)},
+            offsets=offsets,
+            doc_ids=np.fromiter(
+                (i for t in vocab for i in postings[t][0]), dtype="int32", count=int(offsets[-1])
+            ),
+            tfs=np.fromiter(
+                (tf for t in vocab for tf in postings[t][1]), dtype="float32", count=int(offsets[-1])
+            ),
+            doc_len=np.asarray([len(d) for d in docs], dtype="float32"),
+            k1=k1,
+            b=b,
+        )
+
+    def _setup(self, rows, offsets, doc_ids, tfs, doc_len, k1: float, b: float):
+        self.k1 = k1
+        self.b = b
+        self.n_docs = len(doc_len)
+
+        self._rows = rows
+        self._offsets = offsets
+        self._doc_ids = doc_ids
+        self._tfs = tfs
+        self.doc_len = doc_len
+        self.avgdl = float(doc_len.mean()) if self.n_docs else 0.0
+
+        # bagian normalisasi panjang dokumen (konstan per dokumen)
+        self._norm = self.k1 * (1 - self.b + self.b * self.doc_len / (self.avgdl or 1.0))
+
+        # idf per baris token dari document frequency
+        df = np.diff(offsets).astype("float64")
+        self._idf = np.log1p((self.n_docs - df + 0.5) / (df + 0.5))
+
+        self.postings = _Postings(self)
+
+    def _posting(self, row: int) -> tuple[np.ndarray, np.ndarray]:
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        return self._doc_ids[start:end], self._tfs[start:end]
+
+    def idf(self, token: str) -> float:
+        row = self._rows.get(token)
+        return float(self._idf[row]) if row is not None else 0.0
+
+    @property
+    def vocabulary(self) -> list[str]:
+        return list(self._rows)
+
+    # -------------------------
+    # PERSISTENCE
+    # -------------------------
+    def save(self, directory: Path):
+        """
+        Tulis array CSR ke directory (atomic per file via os.replace).
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        vocab = [token.encode("utf-8") for token in self._rows]
+        vocab_offsets = np.zeros(len(vocab) + 1, dtype="int64")
+        np.cumsum([len(token) for token in vocab], out=vocab_offsets[1:])
+
+        arrays = {
+            VOCAB_OFFSETS_FILE: vocab_offsets,
+            OFFSETS_FILE: np.asarray(self._offsets, dtype="int64"),
+            DOCS_FILE: np.asarray(self._doc_ids, dtype="int32"),
+            TFS_FILE: np.asarray(self._tfs, dtype="float32"),
+            DOC_LEN_FILE: np.asarray(self.doc_len, dtype="float32"),
+        }
+        for name, array in arrays.items():
+            tmp = directory / (name + ".tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp, directory / name)
+
+        tmp = directory / (VOCAB_FILE + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(b"".join(vocab))
+        os.replace(tmp, directory / VOCAB_FILE)
+
+    @classmethod
+    def load(cls, directory: Path, k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        """
+        Buka index hasil save(): semua array di-mmap (read-only).
+        """
+        directory = Path(directory)
+
+        with open(directory / VOCAB_FILE, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            # mmap file kosong tidak diizinkan; mmap tetap valid setelah close
+            blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+        vocab_offsets = np.load(directory / VOCAB_OFFSETS_FILE, mmap_mode="r")
+        offsets = np.load(directory / OFFSETS_FILE, mmap_mode="r")
+        if int(vocab_offsets[-1]) != size or len(vocab_offsets) != len(offsets):
+            raise ValueError(f"File BM25 tidak konsisten di {directory}")
+
+        index = cls.__new__(cls)
+        index._setup(
+            rows=_VocabFile(blob, vocab_offsets),
+            offsets=offsets,
+            doc_ids=np.load(directory / DOCS_FILE, mmap_mode="r"),
+            tfs=np.load(directory / TFS_FILE, mmap_mode="r"),
+            doc_len=np.load(directory / DOC_LEN_FILE, mmap_mode="r"),
+            k1=k1,
+            b=b,
+        )
+        return index
+
+    # -------------------------
+    # QUERY
+    # -------------------------
+    def _accumulate(self, query_tokens: list[str]) -> np.ndarray | None:
+        acc = None
+
+        for token in set(query_tokens):
+            row = self._rows.get(token)
+            if row is None:
+                continue
+
+            if acc is None:
+                acc = np.zeros(self.n_docs, dtype="float32")
+
+            # doc id unik per posting → fancy-index += aman (tanpa np.add.at)
+            ids, tfs = self._posting(row)
+            acc[ids] += self._idf[row] * tfs * (self.k1 + 1) / (tfs + self._norm[ids])
+
+        return acc
+
+    def scores(self, query_tokens: list[str]) -> dict[int, float]:
+        """
+        Skor BM25 untuk dokumen yang mengandung minimal satu token query.
+        """
+        acc = self._accumulate(query_tokens)
+        if acc is None:
+            return {}
+
+        hit = np.flatnonzero(acc)
+        return dict(zip(hit.tolist(), acc[hit].tolist()))
+
+    def top_n(self, query_tokens: list[str], n: int) -> list[tuple[int, float]]:
+        """
+        n dokumen dengan skor tertinggi: [(doc_id, score)], urut menurun.
+        """
+        acc = self._accumulate(query_tokens)
+        if acc is None or n <= 0:
+            return []
+
+        hit = np.flatnonzero(acc)
+        if len(hit) > n:
+            hit = hit[np.argpartition(-acc[hit], n - 1)[:n]]
+
+        order = np.lexsort((hit, -acc[hit]))
+        return [(int(hit[i]), float(acc[hit[i]])) for i in order]
@@ -1,34 +1,67 @@
 import re
 from api.ollama import ask_ollama
-from api.ollama import call_llm  
+from config import ROUTER_SEMANTIC_ENABLED
+from core.embeddings import embed
+from core.router import keyword_pattern
+from core.semantic_router import CentroidClassifier, INTENT_EXAMPLES
+from api.ollama import call_llm, call_llm_async
+from api.ollama_client import OllamaBusyError
+
+# Antrean LLM penuh → konteks hasil retrieval ditampilkan apa adanya
+BUSY_CONTEXT_PREFIX = "⚠️ AI sedang sibuk, berikut informasi terkait dari katalog:\n\n"
 
 # =========================
 # INTENT DETECTION
 # =========================
-def detect_intent(query: str) -> str:
-    """
-    Mendeteksi intent utama dari pertanyaan user secara rule-based.
-    Dibuat ringan dan deterministik agar cepat dan stabil.
-    """
-    q = query.lower().strip()
+# Pemetaan intent ke kata kunci yang sering digunakan user
+INTENT_MAP = {
+    # Keluhan atau komplain pelanggan
+    "complaint": ["keluhan", "komplain", "pengaduan"],
 
-    # Pemetaan intent ke kata kunci yang sering digunakan user
-    INTENT_MAP = {
-        # Keluhan atau komplain pelanggan
-        "complaint": ["keluhan", "komplain", "pengaduan"],
+    # Visi, misi, atau tujuan perusahaan
+    "vision": ["visi", "misi", "tujuan perusahaan"],
 
-        # Visi, misi, atau tujuan perusahaan
-        "vision": ["visi", "misi", "tujuan perusahaan"],
+    # Informasi umum tentang profil perusahaan
+    "profile": ["profil", "tentang perusahaan", "sejarah"],
+}
+
+# keyword per kata (bukan substring), lihat core.router.keyword_pattern
+_INTENT_PATTERNS = {
+    intent: keyword_pattern(keywords) for intent, keywords in INTENT_MAP.items()
+}
 
-        # Informasi umum tentang profil perusahaan
-        "profile": ["profil", "tentang perusahaan", "sejarah"],
-    }
+# fallback tanpa keyword: centroid embedding contoh intent
+# (dibangun di background, lihat warm_intent_classifier)
+_intent_classifier = CentroidClassifier("intent", INTENT_EXAMPLES)
+
+
+def warm_intent_classifier(wait: bool = False) -> bool:
+    return _intent_classifier.warm(wait)
+
+
+def detect_intent(query: str, query_vec=None) -> str:
+    """
+    Mendeteksi intent utama dari pertanyaan user.
+    Keyword dulu (ringan & deterministik), lalu centroid embedding
+    jika tidak ada keyword yang cocok.
+    """
+    q = query.lower().strip()
 
     # Cek intent berdasarkan kemunculan keyword
-    for intent, keywords in INTENT_MAP.items():
-        if any(k in q for k in keywords):
+    for intent, pattern in _INTENT_PATTERNS.items():
+        if pattern.search(q):
             return intent
 
+    if ROUTER_SEMANTIC_ENABLED and _intent_classifier.ready():
+        try:
+            decision = _intent_classifier.classify(
+                embed(query) if query_vec is None else query_vec
+            )
+            if decision:
+                return decision[0]
+        except Exception as e:
+            print("⚠️ Semantic intent skipped:", e)
+
     # Jika tidak ada intent yang cocok, gunakan general
     return "general"
 
@@ -304,7 +337,30 @@ class CSComposer:
         Execute RAG answer using raw textual context.
         """
 
-        prompt = f"""
+        try:
+            return call_llm(self._product_prompt(query, context))
+        except OllamaBusyError as e:
+            print("OLLAMA BUSY:", e)
+            return BUSY_CONTEXT_PREFIX + context
+
+    async def compose_product_answer_async(
+        self,
+        query: str,
+        context: str
+    ) -> str:
+        """
+        Versi async dari compose_product_answer.
+        """
+
+        try:
+            return await call_llm_async(self._product_prompt(query, context))
+        except OllamaBusyError as e:
+            print("OLLAMA BUSY:", e)
+            return BUSY_CONTEXT_PREFIX + context
+
+    @staticmethod
+    def _product_prompt(query: str, context: str) -> str:
+        return f"""
     Gunakan informasi berikut untuk menjawab pertanyaan customer.
 
     INFORMASI:
@@ -315,5 +371,3 @@ class CSComposer:
 
     Jawab secara profesional dan jelas.
     """.strip()
-
-        return call_llm(prompt)
@@ -1,17 +1,15 @@
 from datetime import datetime
-import json
-from pathlib import Path
+
+from config import RUNTIME_LOG_DIR
+from core.log_sink import log_sink
 
 
 # =========================
 # CONFIDENCE LOGGING
 # =========================
 
-# Resolve project root safely
-PROJECT_ROOT = Path(__file__).resolve().parents[1]
-
-# logs/ di dalam project
-CONF_LOG = PROJECT_ROOT / "logs" / "confidence_log.jsonl"
+# logs/ di dalam project (lihat config.RUNTIME_LOG_DIR)
+CONF_LOG = RUNTIME_LOG_DIR / "confidence_log.jsonl"
 
 # Pastikan folder ada
 CONF_LOG.parent.mkdir(parents=True, exist_ok=True)
@@ -46,5 +44,4 @@ def log_confidence_event(
         "domain": domain
     }
 
-    with open(CONF_LOG, "a", encoding="utf-8") as f:
-        f.write(json.dumps(event, ensure_ascii=False) + "\n")
+    log_sink.write(CONF_LOG, event)
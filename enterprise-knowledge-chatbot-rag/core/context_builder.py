@@ -1,27 +1,72 @@
 # core/context_builder.py
+from config import (
+    MODEL,
+    CONTEXT_TOKEN_BUDGET,
+    CONTEXT_CHARS_PER_TOKEN,
+    CONTEXT_DEDUP_THRESHOLD,
+)
+from core.text_cleaning import dedupe, estimate_tokens
+
+
+def doc_text(doc) -> str:
+    if hasattr(doc, "page_content"):
+        text = doc.page_content
+    elif isinstance(doc, dict):
+        text = (
+            doc.get("content")
+            or doc.get("text")
+            or doc.get("deskripsi")
+            or ""
+        )
+    else:
+        text = str(doc)
+
+    return text.strip() if text else ""
+
 
 class ContextBuilder:
     """
     Build context string from retrieved documents for RAG
+
+    - docs diasumsikan urut relevansi (retriever / reranker)
+    - chunk hampir identik (overlap chunker) hanya diambil sekali
+    - chunk dipack greedy sampai budget token model LLM;
+      chunk yang tidak muat dilewati, chunk lebih pendek setelahnya
+      masih bisa masuk
+    Boilerplate sudah dibuang saat ingestion (core.text_cleaning).
     """
 
-    def build(self, docs) -> str:
-        contexts = []
-
-        for doc in docs:
-            if hasattr(doc, "page_content"):
-                text = doc.page_content
-            elif isinstance(doc, dict):
-                text = (
-                    doc.get("content")
-                    or doc.get("text")
-                    or doc.get("deskripsi")
-                    or ""
-                )
-            else:
-                text = str(doc)
-
-            if text and text.strip():
-                contexts.append(text.strip())
-
-        return "\n\n".join(contexts)
+    def __init__(self, model: str = MODEL, max_tokens: int | None = None):
+        self.max_tokens = max_tokens or CONTEXT_TOKEN_BUDGET.get(
+            model, CONTEXT_TOKEN_BUDGET["default"]
+        )
+
+    def select(self, docs, max_tokens: int | None = None) -> list[str]:
+        budget = max_tokens or self.max_tokens
+
+        texts = [t for t in (doc_text(doc) for doc in docs) if t]
+        texts = [texts[i] for i in dedupe(texts, CONTEXT_DEDUP_THRESHOLD)]
+
+        selected = []
+        remaining = budget
+
+        for text in texts:
+            # +1 untuk separator antar chunk
+            cost = estimate_tokens(text, CONTEXT_CHARS_PER_TOKEN) + 1
+
+            if cost <= remaining:
+                selected.append(text)
+                remaining -= cost
+            elif not selected:
+                # chunk terbaik lebih besar dari budget → potong di batas kata
+                cut = text[:int(remaining * CONTEXT_CHARS_PER_TOKEN)]
+                selected.append(cut.rsplit(" ", 1)[0] if " " in cut else cut)
+                remaining = 0
+
+            if remaining <= 1:
+                break
+
+        return selected
+
+    def build(self, docs, max_tokens: int | None = None) -> str:
+        return "\n\n".join(self.select(docs, max_tokens))
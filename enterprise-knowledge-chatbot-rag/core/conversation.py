@@ -0,0 +1,249 @@
+# core/conversation.py
+"""
+State percakapan per user: kode produk terakhir (untuk follow-up
+"harganya?", "manfaat" tanpa nama produk).
+
+- Disimpan KODE produk (bukan dict produk) → kecil & tidak menahan
+  katalog lama setelah products.json di-reload
+- LRU + TTL idle: user yang tidak aktif > ttl detik dilupakan,
+  jumlah user dibatasi max_users → memori konstan berapapun uptime
+- Backend:
+  "memory" → OrderedDict per proses (default)
+  "sqlite" → satu file lokal, dipakai bersama oleh semua worker
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from config import (
+    CONVERSATION_BACKEND,
+    CONVERSATION_DB_FILE,
+    CONVERSATION_MAX_USERS,
+    CONVERSATION_TTL,
+)
+
+
+# =========================
+# BACKEND: MEMORY
+# =========================
+class MemoryBackend:
+    name = "memory"
+
+    def __init__(self, max_users: int, ttl: float):
+        self.max_users = max_users
+        self.ttl = ttl
+        # user_id → (codes, expires_at); urutan = urutan kedaluwarsa
+        self._items: OrderedDict[str, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.expired = 0
+
+    def _sweep(self, now: float):
+        # TTL di-refresh tiap akses → entry paling depan selalu paling dulu expire
+        while self._items:
+            _, expires_at = next(iter(self._items.values()))
+            if expires_at > now:
+                break
+            self._items.popitem(last=False)
+            self.expired += 1
+
+    def get(self, user_id: str) -> tuple | None:
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            item = self._items.get(user_id)
+            if item is None:
+                return None
+
+            self._items[user_id] = (item[0], now + self.ttl)
+            self._items.move_to_end(user_id)
+            return item[0]
+
+    def set(self, user_id: str, codes: tuple):
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            self._items[user_id] = (codes, now + self.ttl)
+            self._items.move_to_end(user_id)
+            while len(self._items) > self.max_users:
+                self._items.popitem(last=False)
+                self.evicted += 1
+
+    def delete(self, user_id: str):
+        with self._lock:
+            self._items.pop(user_id, None)
+
+    def size(self) -> int:
+        with self._lock:
+            self._sweep(time.monotonic())
+            return len(self._items)
+
+
+# =========================
+# BACKEND: SQLITE
+# =========================
+class SQLiteBackend:
+    name = "sqlite"
+
+    # trim (expired + kelebihan user) tiap N write, bukan tiap write
+    TRIM_EVERY = 500
+
+    def __init__(self, path: Path, max_users: int, ttl: float):
+        self.path = Path(path)
+        self.max_users = max_users
+        self.ttl = ttl
+        self._db: sqlite3.Connection | None = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        # koneksi per proses: worker hasil fork membuka koneksi sendiri
+        if self._db is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=5)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                " user_id TEXT PRIMARY KEY,"
+                " codes TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_conversations_expires"
+                " ON conversations(expires_at)"
+            )
+            db.commit()
+            self._db, self._pid = db, os.getpid()
+        return self._db
+
+    def _trim(self, db: sqlite3.Connection, now: float):
+        self._writes = 0
+        self.expired += db.execute(
+            "DELETE FROM conversations WHERE expires_at <= ?", (now,)
+        ).rowcount
+
+        (count,) = db.execute("SELECT COUNT(*) FROM conversations").fetchone()
+        excess = count - self.max_users
+        if excess > 0:
+            self.evicted += db.execute(
+                "DELETE FROM conversations WHERE user_id IN ("
+                " SELECT user_id FROM conversations ORDER BY expires_at LIMIT ?)",
+                (excess,),
+            ).rowcount
+
+    def get(self, user_id: str) -> tuple | None:
+        # wall clock (bukan monotonic): nilai dibaca proses lain
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            row = db.execute(
+                "SELECT codes FROM conversations WHERE user_id = ? AND expires_at > ?",
+                (user_id, now),
+            ).fetchone()
+            if row is None:
+                return None
+
+            db.execute(
+                "UPDATE conversations SET expires_at = ? WHERE user_id = ?",
+                (now + self.ttl, user_id),
+            )
+            db.commit()
+            return tuple(json.loads(row[0]))
+
+    def set(self, user_id: str, codes: tuple):
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            db.execute(
+                "INSERT OR REPLACE INTO conversations (user_id, codes, expires_at)"
+                " VALUES (?, ?, ?)",
+                (user_id, json.dumps(list(codes)), now + self.ttl),
+            )
+            self._writes += 1
+            if self._writes >= self.TRIM_EVERY:
+                self._trim(db, now)
+            db.commit()
+
+    def delete(self, user_id: str):
+        with self._lock:
+            db = self._conn()
+            db.execute("DELETE FROM conversations WHERE user_id = ?", (user_id,))
+            db.commit()
+
+    def size(self) -> int:
+        with self._lock:
+            (count,) = self._conn().execute(
+                "SELECT COUNT(*) FROM conversations WHERE expires_at > ?", (time.time(),)
+            ).fetchone()
+            return count
+
+
+# =========================
+# STORE
+# =========================
+class ConversationStore:
+    def __init__(
+        self,
+        backend: str = CONVERSATION_BACKEND,
+        max_users: int = CONVERSATION_MAX_USERS,
+        ttl: float = CONVERSATION_TTL,
+        path: Path = CONVERSATION_DB_FILE,
+    ):
+        if backend == "sqlite":
+            self.backend = SQLiteBackend(path, max_users, ttl)
+        else:
+            self.backend = MemoryBackend(max_users, ttl)
+
+        self.hits = 0
+        self.misses = 0
+
+    def get_codes(self, user_id: str) -> tuple | None:
+        try:
+            codes = self.backend.get(user_id)
+        except sqlite3.Error as e:
+            # state follow-up tidak boleh menggagalkan request
+            print("⚠️ Conversation store read failed:", e)
+            codes = None
+
+        if codes:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return codes or None
+
+    def set_codes(self, user_id: str, codes):
+        codes = tuple(c for c in codes if c)
+        if not codes:
+            return
+
+        try:
+            self.backend.set(user_id, codes)
+        except sqlite3.Error as e:
+            print("⚠️ Conversation store write failed:", e)
+
+    def forget(self, user_id: str):
+        self.backend.delete(user_id)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend.name,
+            "users": self.backend.size(),
+            "max_users": self.backend.max_users,
+            "ttl": self.backend.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.backend.expired,
+            "evicted": self.backend.evicted,
+        }
+
+
+conversation = ConversationStore()
@@ -0,0 +1,291 @@
+# core/embedding_cache.py
+"""
+Embedding Cache
+===============
+
+Cache vektor embedding dua tingkat, dipakai bersama oleh
+query path (core.embeddings) dan ingestion (BatchEmbedder).
+
+- Tier 1: LRU in-process (OrderedDict) → hit tanpa I/O
+- Tier 2: SQLite di disk (WAL) → bertahan antar restart & antar proses
+- Key: sha1(model + teks ter-normalisasi spasi)
+- Eviction berbasis jumlah item di kedua tier (yang paling lama tidak dipakai);
+  last_used hit disk ditulis batch (bersama put / tiap N hit), bukan
+  UPDATE + commit per lookup
+- get_memory() → lookup tier 1 saja, aman dipanggil dari event loop;
+  tier 2 (I/O SQLite + lock) dipanggil lewat thread (core.embeddings)
+- Counter hit / miss untuk monitoring (stats())
+
+Vektor disimpan L2-normalized float32 sehingga hasil /api/embed (batch)
+dan /api/embeddings (per teks) bisa saling dipakai.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from config import (
+    EMBED_CACHE_ENABLED,
+    EMBED_CACHE_FILE,
+    EMBED_CACHE_MEMORY_ITEMS,
+    EMBED_CACHE_DISK_ITEMS,
+)
+
+# Cek ukuran tabel tiap N penulisan (COUNT(*) tidak perlu tiap put)
+_EVICT_CHECK_EVERY = 256
+
+# Flush last_used hit disk tiap N key (atau saat put berikutnya)
+_TOUCH_FLUSH_EVERY = 256
+
+
+def cache_key(model: str, text: str) -> str:
+    normalized = " ".join(text.split())
+    return hashlib.sha1(f"{model}\x00{normalized}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        path: Path | None = EMBED_CACHE_FILE,
+        memory_items: int = EMBED_CACHE_MEMORY_ITEMS,
+        disk_items: int = EMBED_CACHE_DISK_ITEMS,
+        enabled: bool = EMBED_CACHE_ENABLED,
+    ):
+        self.path = Path(path) if path else None
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+        self.enabled = enabled
+
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        # _lock → koneksi SQLite (tier 2); _memory_lock → LRU (tier 1),
+        # terpisah agar hit memori tidak menunggu I/O disk thread lain
+        self._lock = threading.Lock()
+        self._memory_lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._db_failed = False
+        self._puts_since_check = 0
+        self._touched: dict[str, float] = {}
+
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+    # -------------------------
+    # DISK TIER (LAZY)
+    # -------------------------
+    def _conn(self) -> sqlite3.Connection | None:
+        """
+        Koneksi SQLite dibuka saat pertama dipakai.
+        Gagal buka (read-only FS, dll) → cache jalan memory-only.
+        """
+        if self._db is not None or self._db_failed or self.path is None:
+            return self._db
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=5)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY,"
+                " model TEXT NOT NULL,"
+                " vec BLOB NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used"
+                " ON embeddings(last_used)"
+            )
+            db.commit()
+            self._db = db
+        except sqlite3.Error as e:
+            print("⚠️ Embedding cache disk disabled:", e)
+            self._db_failed = True
+
+        return self._db
+
+    def _evict_disk(self, db: sqlite3.Connection):
+        self._puts_since_check = 0
+        (count,) = db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.disk_items
+        if excess <= 0:
+            return
+
+        # buang sedikit lebih banyak agar tidak evict di setiap put
+        excess += self.disk_items // 10
+        db.execute(
+            "DELETE FROM embeddings WHERE key IN ("
+            " SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+
+    def _flush_touched(self, db: sqlite3.Connection):
+        """
+        Tulis last_used yang tertunda (di dalam _lock, sebelum commit).
+        """
+        if not self._touched:
+            return
+        db.executemany(
+            "UPDATE embeddings SET last_used = ? WHERE key = ?",
+            [(ts, key) for key, ts in self._touched.items()],
+        )
+        self._touched.clear()
+
+    # -------------------------
+    # MEMORY TIER
+    # -------------------------
+    def _remember(self, key: str, vec: np.ndarray):
+        with self._memory_lock:
+            self._memory[key] = vec
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    # -------------------------
+    # PUBLIC API
+    # -------------------------
+    def get_memory(self, model: str, text: str) -> np.ndarray | None:
+        """
+        Lookup tier memori saja (tanpa I/O). Miss tidak dihitung:
+        pemanggil lanjut ke get() yang menghitung hit disk / miss.
+        """
+        if not self.enabled:
+            return None
+
+        key = cache_key(model, text)
+        with self._memory_lock:
+            vec = self._memory.get(key)
+            if vec is not None:
+                self._memory.move_to_end(key)
+                self.hits_memory += 1
+        return vec
+
+    def get_many(self, model: str, texts: list[str]) -> dict[int, np.ndarray]:
+        """
+        Lookup banyak teks sekaligus.
+        Return {posisi: vektor} hanya untuk teks yang ada di cache.
+        """
+        if not self.enabled or not texts:
+            return {}
+
+        keys = [cache_key(model, t) for t in texts]
+        found: dict[int, np.ndarray] = {}
+        missing: dict[str, list[int]] = {}
+
+        with self._memory_lock:
+            for i, key in enumerate(keys):
+                vec = self._memory.get(key)
+                if vec is not None:
+                    self._memory.move_to_end(key)
+                    found[i] = vec
+                    self.hits_memory += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+
+        if not missing:
+            return found
+
+        rows = []
+        with self._lock:
+            db = self._conn()
+            if db is not None:
+                try:
+                    pending = list(missing)
+                    # batas parameter SQLite (999 di versi lama)
+                    for start in range(0, len(pending), 500):
+                        part = pending[start:start + 500]
+                        rows += db.execute(
+                            "SELECT key, vec FROM embeddings WHERE key IN "
+                            f"({','.join('?' * len(part))})",
+                            part,
+                        ).fetchall()
+
+                    now = time.time()
+                    for key, _ in rows:
+                        self._touched[key] = now
+                    if len(self._touched) >= _TOUCH_FLUSH_EVERY:
+                        self._flush_touched(db)
+                        db.commit()
+                except sqlite3.Error as e:
+                    print("⚠️ Embedding cache read failed:", e)
+
+            for key, blob in rows:
+                vec = np.frombuffer(blob, dtype="float32")
+                self._remember(key, vec)
+                for i in missing.pop(key):
+                    found[i] = vec
+                    self.hits_disk += 1
+
+            self.misses += sum(len(v) for v in missing.values())
+
+        return found
+
+    def get(self, model: str, text: str) -> np.ndarray | None:
+        return self.get_many(model, [text]).get(0)
+
+    def put_many(self, model: str, texts: list[str], vectors):
+        if not self.enabled or not texts:
+            return
+
+        entries = []
+        for text, vec in zip(texts, vectors):
+            vec = np.asarray(vec, dtype="float32")
+            vec.setflags(write=False)  # dibagi antar pemanggil
+            entries.append((cache_key(model, text), vec))
+
+        for key, vec in entries:
+            self._remember(key, vec)
+
+        with self._lock:
+            db = self._conn()
+            if db is None:
+                return
+
+            try:
+                now = time.time()
+                db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, model, vec, last_used)"
+                    " VALUES (?, ?, ?, ?)",
+                    [(key, model, vec.tobytes(), now) for key, vec in entries],
+                )
+                self._flush_touched(db)
+                self._puts_since_check += len(entries)
+                if self._puts_since_check >= _EVICT_CHECK_EVERY:
+                    self._evict_disk(db)
+                db.commit()
+            except sqlite3.Error as e:
+                print("⚠️ Embedding cache write failed:", e)
+
+    def put(self, model: str, text: str, vec):
+        self.put_many(model, [text], [vec])
+
+    def stats(self) -> dict:
+        lookups = self.hits_memory + self.hits_disk + self.misses
+        hits = self.hits_memory + self.hits_disk
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_items": len(self._memory),
+        }
+
+    def clear(self):
+        with self._memory_lock:
+            self._memory.clear()
+
+        with self._lock:
+            self._touched.clear()
+            db = self._conn()
+            if db is not None:
+                db.execute("DELETE FROM embeddings")
+                db.commit()
+
+
+cache = EmbeddingCache()
@@ -1,6 +1,10 @@
 # core/embeddings.py
+import asyncio
+
 import numpy as np
-from api.embedding import embed_text  # SESUAI IMPLEMENTASI KAMU
+from api.embedding import embed_text, embed_text_async  # SESUAI IMPLEMENTASI KAMU
+from config import EMBED_MODEL
+from core.embedding_cache import cache as embedding_cache
 
 def embed(text: str) -> np.ndarray:
     """
@@ -10,10 +14,38 @@ def embed(text: str) -> np.ndarray:
       - indexing
       - retrieval
     - Menghindari embedding mismatch
+
+    Vektor selalu L2-normalized & di-cache per (model, teks):
+    pertanyaan berulang / retrieve berulang dalam satu request
+    tidak memanggil Ollama lagi.
+    """
+
+    vec = embedding_cache.get(EMBED_MODEL, text)
+    if vec is not None:
+        return vec
+
+    vec = normalize(np.array(embed_text(text)).astype("float32"))
+    embedding_cache.put(EMBED_MODEL, text, vec)
+    return vec
+
+
+async def embed_async(text: str) -> np.ndarray:
     """
+    Versi async dari embed() — model, format vektor & cache identik.
+    Hit memori langsung di event loop; tier disk (SQLite + lock cache
+    yang dipakai juga oleh thread sync / ingestion) lewat thread.
+    """
+
+    vec = embedding_cache.get_memory(EMBED_MODEL, text)
+    if vec is not None:
+        return vec
+
+    vec = await asyncio.to_thread(embedding_cache.get, EMBED_MODEL, text)
+    if vec is not None:
+        return vec
 
-    vec = embed_text(text)
-    vec = np.array(vec).astype("float32")
+    vec = normalize(np.array(await embed_text_async(text)).astype("float32"))
+    await asyncio.to_thread(embedding_cache.put, EMBED_MODEL, text, vec)
     return vec
 
 
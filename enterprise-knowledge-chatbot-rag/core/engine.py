@@ -12,10 +12,10 @@ Engine ini berfungsi sebagai:
 melainkan mengorkestrasi flow berdasarkan domain.
 """
 
-from core.router import route_query
+from core.router import route_scored
 
-from knowledge.sop.retriever import SOPRetriever
-from knowledge.profile.retriever import ProfileRetriever
+from core.embeddings import embed
+from core.fanout import retrieve_all, contexts
 
 from core.composer import (
     compose_sop_answer,
@@ -32,40 +32,27 @@ def answer_query(query: str) -> str:
     Main logic untuk menjawab pertanyaan user berdasarkan domain.
 
     Alur:
-    - Router menentukan domain (sop / profile / product / general)
-    - Retriever mengambil knowledge sesuai domain
+    - Fan-out: query di-embed sekali, SOP / profile / product dicari paralel
+    - Router memilih domain dari keyword + score hasil retrieval
+      (SOP kosong → profile jika cukup mirip → general, tanpa search ulang)
     - Composer merangkai jawaban akhir
     """
 
-    domain = route_query(query)
+    query_vec = embed(query)
+    results = retrieve_all(query, top_k=5, query_vec=query_vec)
+    domain = route_scored(query, results, query_vec=query_vec)
 
     # =========================
     # SOP DOMAIN
     # =========================
     if domain == "sop":
-        retriever = SOPRetriever(top_k=5)
-        results = retriever.retrieve(query)
-
-        # 🔁 Smart fallback:
-        # Jika SOP tidak ketemu, coba Profile sebelum ke General
-        if not results:
-            profile_retriever = ProfileRetriever(top_k=5)
-            profile_results = profile_retriever.retrieve(query)
-
-            if profile_results:
-                return compose_profile_answer(query, profile_results)
-
-            return compose_general_answer(query)
-
-        return compose_sop_answer(query, results)
+        return compose_sop_answer(query, contexts(results, "sop"))
 
     # =========================
     # PROFILE DOMAIN
     # =========================
     if domain == "profile":
-        retriever = ProfileRetriever(top_k=5)
-        results = retriever.retrieve(query)
-        return compose_profile_answer(query, results)
+        return compose_profile_answer(query, contexts(results, "profile"))
 
     # =========================
     # PRODUCT DOMAIN
@@ -0,0 +1,113 @@
+# core/fanout.py
+"""
+Fan-out retrieval multi-domain.
+
+Dulu: SOP → (kosong) → profile → (kosong) → general, masing-masing
+embed + search berurutan. Sekarang:
+
+- query di-embed SEKALI
+- semua domain di FANOUT_DOMAINS dicari paralel (FAISS & BM25
+  melepas GIL / thread terpisah), dengan embedding yang sama
+- hasil ber-score → satu keputusan router (core.router.route_scored)
+
+Worst case rantai fallback = satu embed + satu putaran search paralel.
+"""
+
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import FANOUT_DOMAINS
+from core.embeddings import embed, embed_async
+from core.retriever import get_retriever
+from core.telemetry import stage
+
+_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="fanout")
+
+
+def _top_k(top_k: int | dict, domain: str) -> int:
+    return top_k.get(domain, 5) if isinstance(top_k, dict) else top_k
+
+
+def _safe_retrieve(domain: str, k: int, query: str, query_vec):
+    try:
+        with stage(f"retrieve_{domain}"):
+            return get_retriever(domain, top_k=k).retrieve(query, with_score=True, query_vec=query_vec)
+    except Exception as e:
+        # satu domain gagal (index rusak / belum ada) tidak menggagalkan yang lain
+        print(f"⚠️ Fan-out retrieval failed ({domain}):", e)
+        return []
+
+
+def retrieve_all(
+    query: str,
+    top_k: int | dict = 5,
+    domains: tuple = FANOUT_DOMAINS,
+    timings: dict | None = None,
+    query_vec=None,
+) -> dict[str, list]:
+    """
+    {domain: [(doc, score)]} untuk semua domain, embed sekali.
+    top_k: int untuk semua domain, atau {domain: k}.
+    query_vec: embedding yang sudah ada (dipakai juga oleh router).
+    """
+    started = time.perf_counter()
+    if query_vec is None:
+        query_vec = embed(query)
+    embedded = time.perf_counter()
+
+    futures = {
+        # copy_context → request id & trace telemetry ikut ke thread pool
+        domain: _pool.submit(
+            contextvars.copy_context().run,
+            _safe_retrieve, domain, _top_k(top_k, domain), query, query_vec,
+        )
+        for domain in domains
+    }
+    results = {domain: future.result() for domain, future in futures.items()}
+
+    if timings is not None:
+        timings["embed"] = embedded - started
+        timings["fanout"] = time.perf_counter() - embedded
+
+    return results
+
+
+async def aretrieve_all(
+    query: str,
+    top_k: int | dict = 5,
+    domains: tuple = FANOUT_DOMAINS,
+    timings: dict | None = None,
+    query_vec=None,
+) -> dict[str, list]:
+    """
+    Versi async: embedding di-await, search tiap domain di thread pool
+    (event loop tidak tertahan BM25 / FAISS).
+    """
+    started = time.perf_counter()
+    if query_vec is None:
+        query_vec = await embed_async(query)
+    embedded = time.perf_counter()
+
+    loop = asyncio.get_running_loop()
+    hits = await asyncio.gather(*(
+        loop.run_in_executor(
+            _pool, contextvars.copy_context().run,
+            _safe_retrieve, domain, _top_k(top_k, domain), query, query_vec,
+        )
+        for domain in domains
+    ))
+
+    if timings is not None:
+        timings["embed"] = embedded - started
+        timings["fanout"] = time.perf_counter() - embedded
+
+    return dict(zip(domains, hits))
+
+
+def contexts(results: dict, domain: str) -> list:
+    """
+    Doc saja (tanpa score) untuk composer / handler domain.
+    """
+    return [doc for doc, _ in results.get(domain, [])]
@@ -0,0 +1,300 @@
+# core/llm_scheduler.py
+"""
+Scheduler request LLM (generate / chat) ke Ollama.
+
+Ollama hanya memproses OLLAMA_NUM_PARALLEL request sekaligus; sisanya
+antre di dalam Ollama tanpa terlihat sampai timeout 60 s / 180 s habis
+→ "AI sedang tidak tersedia". Antrean dipindah ke sini:
+
+- LLM_SLOTS slot per proses, dibagi thread sync & task asyncio
+- Lane prioritas (urutan LLM_LANES): slot yang lepas diberikan ke
+  waiter lane teratas dulu (produk → SOP → obrolan umum; jawaban
+  profil tanpa LLM)
+- Admission control: estimasi antre = (waiter di depan + 1) / slot ×
+  durasi slot rata-rata (EWMA). Estimasi > LLM_LANE_MAX_WAIT[lane] atau
+  antrean lane penuh → LLMBusyError SEKETIKA, pemanggil jatuh ke
+  jawaban non-LLM (bukan menunggu lalu timeout)
+- Metrics per lane: waktu antre (stage telemetry llm_queue_<lane>),
+  admitted / queued / rejected / timeout, antrean & in-flight
+  (stats(), render_prometheus() → GET /metrics)
+
+Lane dipilih lewat llm_lane("product") (contextvar → ikut ke
+asyncio.to_thread / copy_context); tanpa lane → lane terakhir.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from config import (
+    LLM_SLOTS,
+    LLM_LANES,
+    LLM_LANE_MAX_WAIT,
+    LLM_LANE_MAX_QUEUE,
+    LLM_SERVICE_TIME,
+)
+from core.telemetry import telemetry
+
+EWMA_ALPHA = 0.2  # bobot durasi slot terbaru pada estimasi antre
+
+_lane: ContextVar[str | None] = ContextVar("llm_lane", default=None)
+
+
+class LLMBusyError(RuntimeError):
+    """
+    Request LLM ditolak admission control / habis waktu antre.
+    """
+
+
+@contextmanager
+def llm_lane(lane: str):
+    """
+    Semua panggilan LLM di dalam blok ini memakai lane tersebut.
+    """
+    token = _lane.set(lane)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+class _Waiter:
+    __slots__ = ("lane", "notify", "granted")
+
+    def __init__(self, lane: str, notify):
+        self.lane = lane
+        self.notify = notify
+        self.granted = False
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        slots: int = LLM_SLOTS,
+        lanes: tuple = LLM_LANES,
+        max_wait: dict = LLM_LANE_MAX_WAIT,
+        max_queue: int = LLM_LANE_MAX_QUEUE,
+        service_time: float = LLM_SERVICE_TIME,
+    ):
+        self.slots = max(1, slots)
+        self.lanes = tuple(lanes)
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.service_time = service_time  # detik per slot (EWMA)
+
+        self._lock = threading.Lock()
+        self._free = self.slots
+        self._queues = {lane: deque() for lane in self.lanes}
+        self._in_flight = {lane: 0 for lane in self.lanes}
+        self._counts = {
+            lane: {"admitted": 0, "queued": 0, "rejected": 0, "timeout": 0}
+            for lane in self.lanes
+        }
+
+    def lane(self, lane: str | None = None) -> str:
+        lane = lane or _lane.get()
+        return lane if lane in self._queues else self.lanes[-1]
+
+    # -------------------------
+    # ADMISSION
+    # -------------------------
+    def _estimate(self, lane: str) -> float:
+        if self._free > 0:
+            return 0.0
+
+        # dilayani lebih dulu: waiter lane yang sama & lane lebih prioritas
+        ahead = 0
+        for name in self.lanes:
+            ahead += len(self._queues[name])
+            if name == lane:
+                break
+        return (ahead + 1) / self.slots * self.service_time
+
+    def estimated_wait(self, lane: str | None = None) -> float:
+        with self._lock:
+            return self._estimate(self.lane(lane))
+
+    def _admit(self, lane: str, notify) -> _Waiter | None:
+        """
+        None → slot langsung didapat; _Waiter → tunggu notify().
+        """
+        with self._lock:
+            if self._free > 0:
+                self._free -= 1
+                self._in_flight[lane] += 1
+                self._counts[lane]["admitted"] += 1
+                return None
+
+            estimate = self._estimate(lane)
+            if (
+                len(self._queues[lane]) < self.max_queue
+                and estimate <= self.max_wait[lane]
+            ):
+                waiter = _Waiter(lane, notify)
+                self._queues[lane].append(waiter)
+                self._counts[lane]["queued"] += 1
+                return waiter
+
+            self._counts[lane]["rejected"] += 1
+
+        raise LLMBusyError(
+            f"LLM busy: lane {lane} estimated wait {estimate:.1f}s "
+            f"> {self.max_wait[lane]}s"
+        )
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """
+        Waiter berhenti menunggu. True jika slot ternyata sudah diberikan.
+        """
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._queues[waiter.lane].remove(waiter)
+            self._counts[waiter.lane]["timeout"] += 1
+            return False
+
+    def _timeout_error(self, lane: str) -> LLMBusyError:
+        return LLMBusyError(f"LLM busy: lane {lane} no free slot after {self.max_wait[lane]}s")
+
+    # -------------------------
+    # ACQUIRE / RELEASE
+    # -------------------------
+    def acquire(self, lane: str | None = None) -> tuple:
+        """
+        Blokir sampai slot didapat; return ticket untuk release().
+        """
+        lane = self.lane(lane)
+        enqueued = time.perf_counter()
+
+        event = threading.Event()
+        waiter = self._admit(lane, event.set)
+        if waiter is not None and not event.wait(self.max_wait[lane]):
+            if not self._abandon(waiter):
+                raise self._timeout_error(lane)
+
+        return self._started(lane, enqueued)
+
+    async def aacquire(self, lane: str | None = None) -> tuple:
+        """
+        Versi async dari acquire() (slot yang sama dengan thread sync).
+        """
+        lane = self.lane(lane)
+        enqueued = time.perf_counter()
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = self._admit(lane, lambda: loop.call_soon_threadsafe(_wake, future))
+
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(future), self.max_wait[lane])
+            except asyncio.TimeoutError:
+                if not self._abandon(waiter):
+                    raise self._timeout_error(lane) from None
+            except asyncio.CancelledError:
+                # client disconnect: slot yang sempat diberikan dikembalikan
+                if self._abandon(waiter):
+                    self.release((lane, None))
+                raise
+
+        return self._started(lane, enqueued)
+
+    def _started(self, lane: str, enqueued: float) -> tuple:
+        started = time.perf_counter()
+        telemetry.observe(f"llm_queue_{lane}", started - enqueued)
+        return lane, started
+
+    def release(self, ticket: tuple):
+        lane, started = ticket
+
+        with self._lock:
+            if started is not None:
+                held = time.perf_counter() - started
+                self.service_time += EWMA_ALPHA * (held - self.service_time)
+            self._in_flight[lane] -= 1
+
+            waiter = None
+            for name in self.lanes:
+                if self._queues[name]:
+                    waiter = self._queues[name].popleft()
+                    break
+
+            if waiter is None:
+                self._free += 1
+            else:
+                waiter.granted = True
+                self._in_flight[waiter.lane] += 1
+                self._counts[waiter.lane]["admitted"] += 1
+
+        if waiter is not None:
+            waiter.notify()
+
+    @contextmanager
+    def slot(self, lane: str | None = None):
+        ticket = self.acquire(lane)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    @asynccontextmanager
+    async def aslot(self, lane: str | None = None):
+        ticket = await self.aacquire(lane)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    # -------------------------
+    # EXPORT
+    # -------------------------
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "slots": self.slots,
+                "free": self._free,
+                "service_time_s": round(self.service_time, 3),
+                "lanes": {
+                    lane: {
+                        "waiting": len(self._queues[lane]),
+                        "in_flight": self._in_flight[lane],
+                        "estimated_wait_s": round(self._estimate(lane), 3),
+                        "max_wait_s": self.max_wait[lane],
+                        **self._counts[lane],
+                    }
+                    for lane in self.lanes
+                },
+            }
+
+    def render_prometheus(self) -> str:
+        stats = self.stats()
+        lines = [
+            "# TYPE llm_scheduler_slots gauge",
+            f"llm_scheduler_slots {stats['slots']}",
+            "# TYPE llm_scheduler_free_slots gauge",
+            f"llm_scheduler_free_slots {stats['free']}",
+            "# TYPE llm_scheduler_service_seconds gauge",
+            f"llm_scheduler_service_seconds {stats['service_time_s']}",
+        ]
+
+        for name, key in (("llm_lane_waiting", "waiting"), ("llm_lane_in_flight", "in_flight")):
+            lines.append(f"# TYPE {name} gauge")
+            lines += [f'{name}{{lane="{lane}"}} {s[key]}' for lane, s in stats["lanes"].items()]
+
+        lines.append("# TYPE llm_lane_requests_total counter")
+        for lane, s in stats["lanes"].items():
+            for result in ("admitted", "queued", "rejected", "timeout"):
+                lines.append(f'llm_lane_requests_total{{lane="{lane}",result="{result}"}} {s[result]}')
+
+        return "\n".join(lines) + "\n"
+
+
+llm_scheduler = LLMScheduler()
@@ -0,0 +1,232 @@
+# core/log_sink.py
+"""
+Sink log JSONL non-blocking.
+
+Request path hanya memasukkan record ke queue (tanpa open / write / fsync):
+- queue terbatas (LOG_QUEUE_SIZE); penuh → record di-drop & dihitung
+- satu writer thread per proses: kumpulkan batch, satu write() per file
+- file dibuka O_APPEND per batch → beberapa worker / bot aman menulis
+  ke file yang sama (batch dari proses berbeda tidak saling menyisip)
+- rotasi ukuran / umur file di bawah flock (satu proses yang merotasi),
+  hasil rotasi di-gzip
+- flush() / close() saat shutdown (FastAPI, atexit) → tidak ada yang hilang
+"""
+
+import atexit
+import fcntl
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from config import (
+    LOG_QUEUE_SIZE,
+    LOG_BATCH_SIZE,
+    LOG_FLUSH_INTERVAL,
+    LOG_ROTATE_BYTES,
+    LOG_ROTATE_SECONDS,
+    LOG_COMPRESS,
+)
+
+_STOP = object()
+
+
+class LogSink:
+    def __init__(
+        self,
+        queue_size: int = LOG_QUEUE_SIZE,
+        batch_size: int = LOG_BATCH_SIZE,
+        flush_interval: float = LOG_FLUSH_INTERVAL,
+        rotate_bytes: int = LOG_ROTATE_BYTES,
+        rotate_seconds: float = LOG_ROTATE_SECONDS,
+        compress: bool = LOG_COMPRESS,
+    ):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.compress = compress
+
+        self._queue: queue.Queue | None = None
+        self._thread: threading.Thread | None = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        self.errors = 0
+
+    # -------------------------
+    # WRITER THREAD (LAZY, PER PROSES)
+    # -------------------------
+    def _ensure_started(self) -> queue.Queue:
+        # worker hasil fork tidak mewarisi thread → mulai ulang per pid
+        if self._pid != os.getpid():
+            with self._start_lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=self.queue_size)
+                    self._thread = threading.Thread(
+                        target=self._run, args=(self._queue,),
+                        name="log-sink", daemon=True,
+                    )
+                    self._thread.start()
+                    self._pid = os.getpid()
+        return self._queue
+
+    def _run(self, q: queue.Queue):
+        while True:
+            item = q.get()
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+
+            # kumpulkan batch sampai penuh / interval habis / queue kosong sesaat
+            while len(batch) < self.batch_size and item is not _STOP:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = q.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            self._write_batch(batch)
+            for _ in batch:
+                q.task_done()
+
+            if batch[-1] is _STOP:
+                return
+
+    def _write_batch(self, batch: list):
+        files: dict[Path, list[bytes]] = {}
+        for item in batch:
+            if item is _STOP:
+                continue
+            path, line = item
+            files.setdefault(path, []).append(line)
+
+        for path, lines in files.items():
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, b"".join(lines))
+                finally:
+                    os.close(fd)
+                self.written += len(lines)
+                self._maybe_rotate(path)
+            except OSError as e:
+                self.errors += 1
+                print(f"⚠️ Log write failed ({path.name}):", e)
+
+    # -------------------------
+    # ROTATION
+    # -------------------------
+    def _maybe_rotate(self, path: Path):
+        lock_path = path.with_name(path.name + ".lock")
+
+        try:
+            size = path.stat().st_size
+            # mtime lock file = waktu rotasi terakhir (dibagi antar proses)
+            rotated_at = lock_path.stat().st_mtime if lock_path.exists() else None
+        except FileNotFoundError:
+            return
+
+        if rotated_at is None:
+            lock_path.touch()
+            rotated_at = time.time()
+
+        if size < self.rotate_bytes and time.time() - rotated_at < self.rotate_seconds:
+            return
+
+        with open(lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # proses lain mungkin sudah merotasi selagi menunggu lock
+                size = path.stat().st_size if path.exists() else 0
+                rotated_at = lock_path.stat().st_mtime
+                if not size or (
+                    size < self.rotate_bytes
+                    and time.time() - rotated_at < self.rotate_seconds
+                ):
+                    return
+
+                stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+                target = path.with_name(f"{path.stem}.{stamp}.{os.getpid()}{path.suffix}")
+                os.replace(path, target)
+                os.utime(lock_path)
+                self.rotations += 1
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+        if self.compress:
+            self._compress(target)
+
+    def _compress(self, path: Path):
+        try:
+            with open(path, "rb") as src, gzip.open(f"{path}.gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            path.unlink()
+        except OSError as e:
+            self.errors += 1
+            print(f"⚠️ Log compress failed ({path.name}):", e)
+
+    # -------------------------
+    # PUBLIC API
+    # -------------------------
+    def write(self, path, record: dict):
+        """
+        Antre satu record JSONL untuk path (tidak pernah memblokir).
+        """
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            self._ensure_started().put_nowait((Path(path), line))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Tunggu semua record yang sudah di-antre tertulis.
+        """
+        if self._pid != os.getpid():
+            return True
+
+        q = self._queue
+        deadline = time.monotonic() + timeout
+        while q.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout: float = 5.0):
+        if self._pid != os.getpid():
+            return
+
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            print("⚠️ Log sink close: queue masih penuh")
+            return
+        self._thread.join(timeout)
+        self._pid = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._pid == os.getpid() else 0,
+            "written": self.written,
+            "dropped": self.dropped,
+            "rotations": self.rotations,
+            "errors": self.errors,
+        }
+
+
+log_sink = LogSink()
+atexit.register(log_sink.close)
@@ -0,0 +1,78 @@
+# core/prefork.py
+"""
+Mode multi-proses (gunicorn + UvicornWorker, preload_app = True).
+
+preload()    → SEKALI di master, sebelum fork:
+               index FAISS, metadata chunk, BM25, katalog produk
+               & product index dimuat di sini sebelum worker di-fork.
+               - vektor index flat / HNSW di-mmap (IO_FLAG_MMAP_IFC, lihat
+                 core.vectorstore._read_index) → page cache file dibagi
+                 semua worker. Index yang tidak bisa di-mmap (faiss lama,
+                 store lama yang dikonversi as_cosine) = salinan RAM
+                 master, dibagi copy-on-write.
+               - posting BM25 (file ingestion) & metadata chunk juga
+                 di-mmap. Objek Python (BM25 store lama yang dibangun
+                 saat load, katalog) dibagi copy-on-write; gc.freeze()
+                 memindahkannya ke generasi permanen sehingga GC worker
+                 tidak menyalin halamannya (refcount tetap menyalin
+                 sebagian halaman yang disentuh).
+               Setelah hot reload (IndexRegistry) tiap worker memuat store
+               baru SENDIRI: file yang di-mmap tetap berbagi page cache,
+               BM25 store lama / index hasil konversi = salinan per worker.
+after_fork() → di tiap worker: buang handle yang tidak boleh dipakai
+               lintas proses (koneksi SQLite, HTTP session / client).
+
+Tidak ada panggilan Ollama di master: embedding & reranker model tetap
+lazy per worker, centroid router dibangun tiap worker saat startup
+(background thread, lihat api.main).
+"""
+
+import gc
+import time
+
+from config import VECTOR_DIRS, HYBRID_DOMAINS
+
+# koneksi warisan master: tetap direferensikan (tidak di-close dari
+# worker, close di child bisa merusak lock file milik proses lain)
+_inherited: list = []
+
+
+def preload():
+    from api.search import catalog
+    from core.vectorstore import registry
+
+    started = time.perf_counter()
+    catalog.products()
+
+    for domain in VECTOR_DIRS:
+        try:
+            store = registry.get(domain)
+            if store is not None and domain in HYBRID_DOMAINS:
+                store.bm25()
+        except Exception as e:
+            # domain belum di-build → di-load lazy oleh worker seperti biasa
+            print(f"⚠️ Preload skipped ({domain}):", e)
+
+    gc.collect()
+    gc.freeze()
+
+    print(
+        f"🧊 Preload done: {gc.get_freeze_count()} objects frozen "
+        f"({(time.perf_counter() - started) * 1000:.0f} ms)"
+    )
+
+
+def after_fork():
+    from api import ollama_client
+    from core.embedding_cache import cache
+
+    if cache._db is not None:
+        _inherited.append(cache._db)
+        cache._db = None
+
+    if ollama_client._session is not None:
+        _inherited.append(ollama_client._session)
+        ollama_client._session = None
+
+    ollama_client._async_client = None
+    ollama_client._async_loop = None
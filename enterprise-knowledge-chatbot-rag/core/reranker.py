@@ -0,0 +1,202 @@
+# core/reranker.py
+"""
+Rerank kandidat retrieval sebelum masuk context builder.
+
+Retriever mengambil RERANK_CANDIDATES chunk (over-retrieve), reranker
+memilih top_k terbaik → chunk relevan tidak terpotong batas konteks,
+boilerplate tidak ikut ke prompt.
+
+Backend (RERANK_BACKEND):
+- "blend"         → alpha · cosine (FAISS) + (1 - alpha) · BM25 antar kandidat
+- "cross-encoder" → CrossEncoder (sentence-transformers) di CPU, skor per batch;
+                    library / model tidak tersedia → fallback ke blend
+
+Skor cross-encoder di-cache per (model, query, chunk).
+Latency budget: batch berikutnya tidak di-score jika budget habis,
+kandidat sisanya tetap memakai urutan retrieval.
+
+Output tetap [(doc, score)] dengan score = cosine dari retriever
+(bukan skor rerank), jadi threshold confidence tidak berubah.
+"""
+
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from config import (
+    RERANK_ENABLED,
+    RERANK_BACKEND,
+    RERANK_MODEL,
+    RERANK_BLEND_ALPHA,
+    RERANK_BATCH_SIZE,
+    RERANK_BUDGET_MS,
+    RERANK_CACHE_ITEMS,
+)
+from core.bm25 import BM25Index, tokenize
+from core.context_builder import doc_text
+
+
+def _doc_key(doc) -> str:
+    if isinstance(doc, dict) and doc.get("chunk_id"):
+        return doc["chunk_id"]
+    return hashlib.sha1(doc_text(doc).encode("utf-8")).hexdigest()
+
+
+class Reranker:
+    def __init__(
+        self,
+        enabled: bool = RERANK_ENABLED,
+        backend: str = RERANK_BACKEND,
+        model_name: str = RERANK_MODEL,
+        alpha: float = RERANK_BLEND_ALPHA,
+        batch_size: int = RERANK_BATCH_SIZE,
+        budget_ms: float = RERANK_BUDGET_MS,
+        cache_items: int = RERANK_CACHE_ITEMS,
+    ):
+        self.enabled = enabled
+        self.backend = backend
+        self.model_name = model_name
+        self.alpha = alpha
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self.cache_items = cache_items
+
+        self._model = None
+        self._model_lock = threading.Lock()
+
+        self._cache: OrderedDict[tuple, float] = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    # -------------------------
+    # CROSS-ENCODER (OPSIONAL)
+    # -------------------------
+    def _cross_encoder(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    try:
+                        from sentence_transformers import CrossEncoder
+
+                        started = time.perf_counter()
+                        self._model = CrossEncoder(self.model_name, device="cpu")
+                        print(
+                            f"🧮 Reranker loaded: {self.model_name} "
+                            f"({time.perf_counter() - started:.1f} s)"
+                        )
+                    except Exception as e:
+                        # tanpa model → blend selamanya (bukan retry per request)
+                        print("⚠️ Cross-encoder unavailable, fallback blend:", e)
+                        self.backend = "blend"
+        return self._model
+
+    def _cache_get(self, key: tuple) -> float | None:
+        with self._cache_lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _cache_put(self, key: tuple, score: float):
+        with self._cache_lock:
+            self._cache[key] = score
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_items:
+                self._cache.popitem(last=False)
+
+    def _cross_scores(self, query: str, docs: list, deadline: float) -> list[float | None]:
+        model = self._cross_encoder()
+        if model is None:
+            return self._blend_scores(query, docs, [None] * len(docs))
+
+        qkey = " ".join(query.lower().split())
+        keys = [(self.model_name, qkey, _doc_key(d)) for d in docs]
+        scores = [self._cache_get(k) for k in keys]
+
+        pending = [i for i, s in enumerate(scores) if s is None]
+        for start in range(0, len(pending), self.batch_size):
+            # budget habis → sisa kandidat tidak di-score (urutan retrieval)
+            if start and time.perf_counter() > deadline:
+                print(f"⏱️ Rerank budget habis: {len(pending) - start} kandidat tidak di-score")
+                break
+
+            batch = pending[start:start + self.batch_size]
+            predicted = model.predict(
+                [(query, doc_text(docs[i])) for i in batch],
+                batch_size=self.batch_size,
+                show_progress_bar=False,
+            )
+            for i, score in zip(batch, predicted):
+                scores[i] = float(score)
+                self._cache_put(keys[i], scores[i])
+
+        return scores
+
+    # -------------------------
+    # BLEND (COSINE + BM25)
+    # -------------------------
+    def _blend_scores(self, query: str, docs: list, dense: list) -> list[float]:
+        bm25 = BM25Index([tokenize(doc_text(d)) for d in docs])
+        lexical = np.zeros(len(docs), dtype="float32")
+        for i, score in bm25.scores(tokenize(query)).items():
+            lexical[i] = score
+        if lexical.max() > 0:
+            lexical /= lexical.max()
+
+        # chunk tanpa score dense → cosine terendah antar kandidat
+        known = [s for s in dense if s is not None]
+        floor = min(known) if known else 0.0
+        cosine = np.asarray([floor if s is None else s for s in dense], dtype="float32")
+
+        return (self.alpha * cosine + (1 - self.alpha) * lexical).tolist()
+
+    # -------------------------
+    # PUBLIC API
+    # -------------------------
+    def rerank(self, query: str, results: list, top_k: int, timings: dict | None = None) -> list:
+        """
+        results: [(doc, score)] urutan retrieval → top_k [(doc, score)] urutan rerank.
+        """
+        if not self.enabled or len(results) <= 1:
+            return results[:top_k]
+
+        started = time.perf_counter()
+        docs = [doc for doc, _ in results]
+
+        if self.backend == "cross-encoder":
+            scores = self._cross_scores(query, docs, started + self.budget_ms / 1000)
+        else:
+            scores = self._blend_scores(query, docs, [score for _, score in results])
+
+        # kandidat tanpa skor (di luar budget) di belakang, urutan retrieval tetap
+        order = sorted(
+            range(len(results)),
+            key=lambda i: (scores[i] is None, -(scores[i] or 0.0), i)
+        )
+
+        if timings is not None:
+            timings["rerank"] = time.perf_counter() - started
+
+        return [results[i] for i in order[:top_k]]
+
+    async def arerank(self, query: str, results: list, top_k: int, timings: dict | None = None) -> list:
+        """
+        Versi async: cross-encoder (CPU-bound) dijalankan di thread,
+        blend cukup inline.
+        """
+        if self.enabled and self.backend == "cross-encoder" and len(results) > 1:
+            return await asyncio.to_thread(self.rerank, query, results, top_k, timings)
+        return self.rerank(query, results, top_k, timings)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend,
+            "cached_scores": len(self._cache),
+        }
+
+
+reranker = Reranker()
@@ -0,0 +1,308 @@
+# core/retriever.py
+"""
+Vector Retriever
+================
+
+Retriever sebagai "view" murah di atas core.vectorstore.registry.
+
+- Tidak membaca file sendiri → index & metadata dibagi semua request
+- Aman dibuat berkali-kali, tapi pakai get_retriever() agar
+  instance juga dibagi (singleton per domain + top_k)
+
+HybridRetriever (domain di HYBRID_DOMAINS) menggabungkan BM25 + FAISS
+dengan reciprocal-rank fusion; kontrak retrieve() sama.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from config import (
+    HYBRID_DOMAINS,
+    HYBRID_RRF_K,
+    HYBRID_CANDIDATES,
+    HYBRID_LEXICAL_MAX_TOKENS,
+)
+from core.bm25 import tokenize
+from core.embeddings import embed, embed_async
+from core.vectorstore import registry as default_registry
+
+
+class VectorRetriever:
+    """
+    Retrieve top-k chunk untuk satu domain.
+
+    retrieve(query)                  → list[dict]
+    retrieve(query, with_score=True) → list[(dict, score)]
+
+    Score = cosine similarity untuk semua domain
+    (kontrak index, lihat core.vectorstore).
+    """
+
+    def __init__(self, domain: str, top_k: int = 5, registry=None):
+        self.domain = domain
+        self.top_k = top_k
+        self.registry = registry or default_registry
+
+    # -------------------------
+    # SEARCH (SHARED)
+    # -------------------------
+    def _dense(self, store, query_vec: np.ndarray, k: int) -> list[tuple[int, float]]:
+        """
+        FAISS search → [(posisi record, score)].
+        """
+        k = min(k, store.index.ntotal)
+        if k <= 0:
+            return []
+
+        scores, ids = store.search(query_vec, k)
+
+        hits = []
+        for score, label in zip(scores[0], ids[0]):
+            if label < 0:
+                continue
+
+            pos = store.position(label)
+            if pos >= 0:
+                hits.append((pos, float(score)))
+
+        return hits
+
+    def _docs(self, store, hits: list[tuple[int, float]], with_score: bool):
+        results = []
+        for pos, score in hits:
+            doc = dict(store.metadata[pos])
+            results.append((doc, score) if with_score else doc)
+        return results
+
+    # -------------------------
+    # PUBLIC API
+    # -------------------------
+    def retrieve(
+        self,
+        query: str,
+        with_score: bool = False,
+        timings: dict | None = None,
+        query_vec: np.ndarray | None = None,
+    ):
+        store = self.registry.get(self.domain)
+        if store is None or len(store) == 0:
+            return []
+
+        started = time.perf_counter()
+        if query_vec is None:
+            query_vec = embed(query)
+        embedded = time.perf_counter()
+        hits = self._dense(store, query_vec, self.top_k)
+
+        if timings is not None:
+            timings["embed"] = embedded - started
+            timings["dense"] = time.perf_counter() - embedded
+
+        return self._docs(store, hits, with_score)
+
+    async def aretrieve(
+        self,
+        query: str,
+        with_score: bool = False,
+        timings: dict | None = None,
+        query_vec: np.ndarray | None = None,
+    ):
+        """
+        Versi async: embedding query di-await,
+        FAISS search (CPU, sub-ms untuk index kecil) tetap inline.
+
+        query_vec → embedding sudah ada (fan-out multi-domain), tanpa embed call.
+        """
+        store = self.registry.get(self.domain)
+        if store is None or len(store) == 0:
+            return []
+
+        started = time.perf_counter()
+        if query_vec is None:
+            query_vec = await embed_async(query)
+        embedded = time.perf_counter()
+        hits = self._dense(store, query_vec, self.top_k)
+
+        if timings is not None:
+            timings["embed"] = embedded - started
+            timings["dense"] = time.perf_counter() - embedded
+
+        return self._docs(store, hits, with_score)
+
+
+# =========================
+# HYBRID (BM25 + DENSE, RRF)
+# =========================
+# Embedding (I/O ke Ollama) berjalan di thread ini
+# sementara BM25 dihitung di thread pemanggil
+_embed_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hybrid-embed")
+
+
+class HybridRetriever(VectorRetriever):
+    """
+    Retriever hybrid: BM25 (sparse) + FAISS (dense), digabung dengan
+    reciprocal-rank fusion: score_rrf = Σ 1 / (rrf_k + rank).
+
+    - BM25 & embedding query berjalan paralel
+    - Query pendek yang semua katanya ada di korpus ("eskalasi", "retur")
+      dijawab BM25 saja → tanpa embedding call (kecuali with_score=True)
+    - with_score=True → score tetap cosine dari FAISS (bukan skor RRF)
+      agar threshold confidence lama tetap berlaku; chunk yang hanya
+      ditemukan BM25 di-score terpisah (None jika index ANN melewatkannya)
+    - timings={} → diisi durasi per stage (detik): bm25, embed, dense, fuse
+    - query_vec  → embedding sudah dihitung pemanggil (fan-out), tidak embed ulang
+    """
+
+    def __init__(
+        self,
+        domain: str,
+        top_k: int = 5,
+        registry=None,
+        candidates: int = HYBRID_CANDIDATES,
+        rrf_k: int = HYBRID_RRF_K,
+    ):
+        super().__init__(domain, top_k, registry)
+        self.candidates = max(candidates, top_k)
+        self.rrf_k = rrf_k
+
+    def _sparse(self, store, tokens: list[str]) -> list[tuple[int, float]]:
+        return store.bm25().top_n(tokens, self.candidates)
+
+    def _is_lexical(self, store, tokens: list[str]) -> bool:
+        if not tokens or len(tokens) > HYBRID_LEXICAL_MAX_TOKENS:
+            return False
+        postings = store.bm25().postings
+        return all(t in postings for t in tokens)
+
+    def _fuse(self, sparse, dense) -> list[tuple[int, float | None]]:
+        fused: dict[int, float] = {}
+        for hits in (sparse, dense):
+            for rank, (pos, _) in enumerate(hits):
+                fused[pos] = fused.get(pos, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+
+        dense_score = dict(dense)
+        ranked = sorted(fused, key=lambda pos: (-fused[pos], pos))[:self.top_k]
+
+        return [(pos, dense_score.get(pos)) for pos in ranked]
+
+    def _finish(self, store, sparse, dense, with_score, timings, t, query_vec):
+        fused = self._fuse(sparse, dense)
+
+        missing = [pos for pos, score in fused if score is None]
+        if with_score and missing:
+            extra = store.score(query_vec, missing)
+            fused = [(pos, extra.get(pos) if score is None else score) for pos, score in fused]
+        if timings is not None:
+            timings["fuse"] = time.perf_counter() - t
+        return self._docs(store, fused, with_score)
+
+    def retrieve(
+        self,
+        query: str,
+        with_score: bool = False,
+        timings: dict | None = None,
+        query_vec: np.ndarray | None = None,
+    ):
+        store = self.registry.get(self.domain)
+        if store is None or len(store) == 0:
+            return []
+
+        timings = {} if timings is None else timings
+        tokens = tokenize(query)
+
+        # exact-term query → BM25 saja
+        if not with_score and self._is_lexical(store, tokens):
+            t = time.perf_counter()
+            sparse = self._sparse(store, tokens)
+            timings["bm25"] = time.perf_counter() - t
+            return self._docs(store, sparse[:self.top_k], with_score)
+
+        def timed_embed():
+            t = time.perf_counter()
+            vec = embed(query)
+            timings["embed"] = time.perf_counter() - t
+            return vec
+
+        future = _embed_pool.submit(timed_embed) if query_vec is None else None
+
+        t = time.perf_counter()
+        sparse = self._sparse(store, tokens)
+        timings["bm25"] = time.perf_counter() - t
+
+        if future is not None:
+            query_vec = future.result()
+
+        t = time.perf_counter()
+        dense = self._dense(store, query_vec, self.candidates)
+        timings["dense"] = time.perf_counter() - t
+
+        return self._finish(store, sparse, dense, with_score, timings, time.perf_counter(), query_vec)
+
+    async def aretrieve(
+        self,
+        query: str,
+        with_score: bool = False,
+        timings: dict | None = None,
+        query_vec: np.ndarray | None = None,
+    ):
+        store = self.registry.get(self.domain)
+        if store is None or len(store) == 0:
+            return []
+
+        timings = {} if timings is None else timings
+        tokens = tokenize(query)
+
+        if not with_score and self._is_lexical(store, tokens):
+            t = time.perf_counter()
+            sparse = self._sparse(store, tokens)
+            timings["bm25"] = time.perf_counter() - t
+            return self._docs(store, sparse[:self.top_k], with_score)
+
+        async def timed_embed():
+            t = time.perf_counter()
+            vec = await embed_async(query)
+            timings["embed"] = time.perf_counter() - t
+            return vec
+
+        # request embedding sudah jalan selama BM25 dihitung
+        task = asyncio.create_task(timed_embed()) if query_vec is None else None
+
+        t = time.perf_counter()
+        sparse = self._sparse(store, tokens)
+        timings["bm25"] = time.perf_counter() - t
+
+        if task is not None:
+            query_vec = await task
+
+        t = time.perf_counter()
+        dense = self._dense(store, query_vec, self.candidates)
+        timings["dense"] = time.perf_counter() - t
+
+        return self._finish(store, sparse, dense, with_score, timings, time.perf_counter(), query_vec)
+
+
+# =========================
+# SINGLETON FACTORY
+# =========================
+_retrievers: dict[tuple, VectorRetriever] = {}
+_retrievers_lock = threading.Lock()
+
+
+def get_retriever(domain: str, top_k: int = 5) -> VectorRetriever:
+    """
+    Retriever bersama per (domain, top_k).
+    Domain di HYBRID_DOMAINS → HybridRetriever (BM25 + FAISS).
+    """
+    key = (domain, top_k)
+    retriever = _retrievers.get(key)
+
+    if retriever is None:
+        cls = HybridRetriever if domain in HYBRID_DOMAINS else VectorRetriever
+        with _retrievers_lock:
+            retriever = _retrievers.setdefault(key, cls(domain, top_k))
+
+    return retriever
@@ -1,6 +1,19 @@
 # core/router.py
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
 from typing import Literal
 
+from config import (
+    FANOUT_MIN_SCORE,
+    ROUTER_SEMANTIC_ENABLED,
+    ROUTER_CACHE_ITEMS,
+    ROUTER_LOG_FILE,
+)
+from core.embeddings import embed
+from core.semantic_router import CentroidClassifier, DOMAIN_EXAMPLES
+
 # Domain yang dikenali oleh sistem
 Domain = Literal["sop", "profile", "product", "general"]
 
@@ -9,8 +22,8 @@ Domain = Literal["sop", "profile", "product", "general"]
 # ==================================================
 # Semua keyword di bawah ini:
 # - lowercase
-# - berbasis substring (bukan regex)
-# - dipakai untuk routing cepat & deterministik
+# - dicocokkan per kata (regex batas kata, lihat keyword_pattern)
+# - dipakai untuk routing cepat & deterministik (fast path)
 #
 # ⚠️ IMPORTANT:
 # Urutan pengecekan domain MATTERS.
@@ -42,63 +55,221 @@ PRODUCT_KEYWORDS = [
 ]
 
 
-def _contains_any(text: str, keywords: list[str]) -> bool:
+def keyword_pattern(keywords: list[str]) -> re.Pattern:
+    """
+    Keyword harus diawali batas kata ("cs" tidak lagi cocok di "discs").
+    Keyword pendek (<= 3 huruf) harus utuh; keyword lain boleh diikuti
+    akhiran ("keluhannya", "harganya").
+    """
+    parts = [
+        rf"\b{re.escape(k)}\b" if len(k) <= 3 else rf"\b{re.escape(k)}"
+        for k in keywords
+    ]
+    return re.compile("|".join(parts))
+
+
+# Urutan = prioritas (lihat route_query)
+_KEYWORD_ROUTES = [
+    ("sop", keyword_pattern(SOP_KEYWORDS)),
+    ("profile", keyword_pattern(PROFILE_KEYWORDS)),
+    ("product", keyword_pattern(PRODUCT_KEYWORDS)),
+]
+
+
+def _contains_any(text: str, pattern: re.Pattern) -> bool:
     """
     Helper kecil untuk menjaga keterbacaan.
     Mengembalikan True jika salah satu keyword
-    muncul sebagai substring di text.
+    muncul sebagai kata (bukan potongan kata lain) di text.
     """
-    return any(k in text for k in keywords)
+    return pattern.search(text) is not None
 
 
-def route_query(query: str) -> Domain:
+def keyword_route(query: str) -> Domain | None:
     """
-    Menentukan domain handler untuk sebuah query user.
-
-    Prinsip desain:
-    - Rule-based (bukan AI) → predictable & audit-friendly
-    - Cepat (string check saja)
-    - Deterministik (tidak bergantung konteks)
-    - Domain dipilih SEKALI di awal pipeline
+    Fast path: domain dari keyword exact, None jika tidak ada yang cocok.
 
     PRIORITY ORDER (PENTING):
     1. SOP      → prosedur & kebijakan (paling ketat)
+       SOP harus dicek dulu karena menyangkut kebijakan & compliance
+       dan tidak boleh ketimpa domain lain
     2. PROFILE  → info resmi perusahaan
+       dicek sebelum product agar "visi misi perusahaan" tidak salah masuk product
     3. PRODUCT  → info produk & harga
-    4. GENERAL  → fallback
+    """
+    q = query.lower().strip()
+
+    for domain, pattern in _KEYWORD_ROUTES:
+        if _contains_any(q, pattern):
+            return domain
+
+    return None
+
+
+def _log_label(record: dict) -> str | None:
+    # jawaban yang menampilkan produk → pertanyaan produk;
+    # selain itu hanya pertanyaan dengan keyword exact (label pasti)
+    if record.get("products"):
+        return "product"
+    return keyword_route(record.get("question", ""))
+
+
+# ==================================================
+# ROUTER (KEYWORD → CENTROID, CACHED)
+# ==================================================
+class QueryRouter:
+    """
+    1. Keyword fast path (exact, batas kata) → tanpa embedding
+    2. Centroid embedding domain (contoh berlabel + chat_logs.jsonl)
+    3. Tidak ada yang yakin → general
+
+    Keputusan di-cache per query (ter-normalisasi); metrics per route
+    (domain × sumber keputusan) tersedia lewat stats().
+    """
+
+    def __init__(
+        self,
+        semantic: bool = ROUTER_SEMANTIC_ENABLED,
+        cache_items: int = ROUTER_CACHE_ITEMS,
+    ):
+        self.semantic = semantic
+        self.cache_items = cache_items
+        self.classifier = CentroidClassifier(
+            "domain", DOMAIN_EXAMPLES,
+            log_path=str(ROUTER_LOG_FILE), log_label_fn=_log_label,
+        )
+
+        self._cache: OrderedDict[str, Domain] = OrderedDict()
+        self._cache_version = 0
+        self._lock = threading.Lock()
+
+        self._routes: Counter = Counter()
+        self._cache_hits = 0
+        self._semantic_calls = 0
+        self._semantic_seconds = 0.0
+
+    def _semantic_route(self, query: str, query_vec) -> Domain | None:
+        # centroid belum siap (build di background) → tanpa embed query
+        if not self.classifier.ready():
+            return None
+
+        started = time.perf_counter()
+        try:
+            if query_vec is None:
+                query_vec = embed(query)
+            decision = self.classifier.classify(query_vec)
+        except Exception as e:
+            print("⚠️ Semantic routing skipped:", e)
+            decision = None
+
+        with self._lock:
+            self._semantic_calls += 1
+            self._semantic_seconds += time.perf_counter() - started
+
+        return decision[0] if decision else None
+
+    def route(self, query: str, query_vec=None) -> Domain:
+        key = " ".join(query.lower().split())
+
+        with self._lock:
+            if self._cache_version != self.classifier.version:
+                # centroid baru → keputusan semantic lama tidak berlaku
+                self._cache.clear()
+                self._cache_version = self.classifier.version
+
+            domain = self._cache.get(key)
+            if domain is not None:
+                self._cache.move_to_end(key)
+                self._cache_hits += 1
+                return domain
+
+        domain, source = keyword_route(key), "keyword"
+
+        if domain is None and self.semantic:
+            domain, source = self._semantic_route(query, query_vec), "semantic"
+
+        if domain is None:
+            domain, source = "general", "default"
+
+        with self._lock:
+            self._routes[(domain, source)] += 1
+
+            # centroid belum ada (Ollama mati) → fallback general tidak di-cache
+            if source != "default" or self.classifier.centroids is not None or not self.semantic:
+                self._cache[key] = domain
+                while len(self._cache) > self.cache_items:
+                    self._cache.popitem(last=False)
+
+        return domain
+
+    def stats(self) -> dict:
+        with self._lock:
+            routes: dict[str, dict] = {}
+            for (domain, source), n in self._routes.items():
+                routes.setdefault(domain, {})[source] = n
+
+            return {
+                "routes": routes,
+                "cache_hits": self._cache_hits,
+                "cache_size": len(self._cache),
+                "semantic_calls": self._semantic_calls,
+                "semantic_avg_ms": round(
+                    self._semantic_seconds / self._semantic_calls * 1000, 2
+                ) if self._semantic_calls else 0.0,
+                "centroid_labels": self.classifier.labels,
+            }
+
+
+router = QueryRouter()
+
+
+def route_query(query: str, query_vec=None) -> Domain:
+    """
+    Menentukan domain handler untuk sebuah query user.
+
+    Prinsip desain:
+    - Keyword exact dulu → predictable & audit-friendly, tanpa embedding
+    - Centroid embedding hanya jika tidak ada keyword yang cocok
+      (query_vec dari pemanggil dipakai ulang; None → embed di sini)
+    - Domain dipilih SEKALI di awal pipeline, keputusan di-cache
 
     Contoh:
-    - "cara komplain"         → sop
-    - "visi dan misi cni"     → profile
-    - "harga produk A"        → product
+    - "cara komplain"         → sop (keyword)
+    - "visi dan misi cni"     → profile (keyword)
+    - "harga produk A"        → product (keyword)
+    - "barang saya rusak"     → sop (centroid)
     """
+    return router.route(query, query_vec)
 
-    q = query.lower().strip()
 
-    # ==================================================
-    # 1️⃣ SOP (HARUS PALING AWAL)
-    # ==================================================
-    # SOP harus dicek dulu karena:
-    # - menyangkut kebijakan & compliance
-    # - tidak boleh ketimpa domain lain
-    if _contains_any(q, SOP_KEYWORDS):
-        return "sop"
-
-    # ==================================================
-    # 2️⃣ PROFILE (IDENTITAS PERUSAHAAN)
-    # ==================================================
-    # Profile dicek sebelum product agar:
-    # "visi misi perusahaan" tidak salah masuk product
-    if _contains_any(q, PROFILE_KEYWORDS):
-        return "profile"
-
-    # ==================================================
-    # 3️⃣ PRODUCT (INFO PRODUK)
-    # ==================================================
-    if _contains_any(q, PRODUCT_KEYWORDS):
-        return "product"
+def _top_score(hits: list) -> float | None:
+    scores = [score for _, score in hits if score is not None]
+    return max(scores) if scores else None
+
+
+def route_scored(
+    query: str,
+    results: dict,
+    min_score: float = FANOUT_MIN_SCORE,
+    query_vec=None
+) -> Domain:
+    """
+    Keputusan router dari hasil fan-out retrieval ({domain: [(doc, score)]}).
+
+    1. Domain router (keyword / centroid) dipakai jika punya hasil
+       → prioritas SOP / PROFILE / PRODUCT tetap sama
+    2. Selain itu domain dengan cosine tertinggi >= min_score
+       (menggantikan fallback berurutan SOP → profile → general)
+    3. Tidak ada yang cukup mirip → general
+    """
+    domain = route_query(query, query_vec)
+    if domain != "general" and results.get(domain):
+        return domain
+
+    best, best_score = "general", min_score
+    for candidate, hits in results.items():
+        score = _top_score(hits)
+        if score is not None and score >= best_score:
+            best, best_score = candidate, score
 
-    # ==================================================
-    # 4️⃣ GENERAL (FALLBACK)
-    # ==================================================
-    return "general"
+    return best
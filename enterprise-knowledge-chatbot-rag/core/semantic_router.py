@@ -0,0 +1,244 @@
+# core/semantic_router.py
+"""
+Klasifikasi query berbasis centroid embedding.
+
+Dipakai oleh core.router (domain) dan core.composer (intent) SETELAH
+keyword fast path gagal:
+
+- Centroid per label = rata-rata embedding contoh berlabel (normalized)
+- Contoh = seed di bawah + pertanyaan dari chat_logs.jsonl
+  (jawaban dengan produk → "product", keyword exact → domain keyword)
+- Query dibandingkan ke semua centroid (satu dot product)
+  → label dengan cosine >= min_score DAN selisih >= margin dari runner-up
+
+Centroid dibangun sekali per proses di background thread (warm():
+startup FastAPI, atau otomatis saat pertama dipakai) — embedding contoh
+bisa ribuan teks, jadi TIDAK pernah di dalam request / event loop.
+Selama build berjalan / gagal (Ollama mati) classify() None → router
+memakai keyword / default; build dicoba lagi setelah interval.
+Embedding contoh lewat BatchEmbedder → embedding cache, run berikutnya
+tanpa Ollama.
+"""
+
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from config import (
+    ROUTER_MIN_SCORE,
+    ROUTER_MARGIN,
+    ROUTER_LOG_EXAMPLES,
+    ROUTER_RETRY_INTERVAL,
+)
+
+# Contoh berlabel per domain (router)
+DOMAIN_EXAMPLES = {
+    "sop": [
+        "bagaimana cara mengajukan komplain",
+        "prosedur pengembalian barang rusak",
+        "alur penanganan keluhan pelanggan",
+        "pesanan saya belum sampai harus lapor ke mana",
+        "cara minta refund",
+        "barang yang diterima salah, bagaimana solusinya",
+        "nomor layanan pelanggan yang bisa dihubungi",
+    ],
+    "profile": [
+        "apa visi dan misi perusahaan",
+        "ceritakan sejarah cni",
+        "kapan perusahaan ini didirikan",
+        "siapa pendiri cni",
+        "alamat kantor pusat perusahaan",
+        "perusahaan ini bergerak di bidang apa",
+    ],
+    "product": [
+        "berapa harga ginseng coffee",
+        "apa manfaat sunchlorella",
+        "kandungan suplemen ini apa saja",
+        "produk untuk daya tahan tubuh",
+        "apakah aman dikonsumsi ibu hamil",
+        "minuman kesehatan untuk stamina",
+        "aturan minum suplemen",
+    ],
+    "general": [
+        "halo selamat pagi",
+        "terima kasih banyak",
+        "apa kabar",
+        "kamu siapa",
+        "oke sip",
+    ],
+}
+
+# Contoh berlabel per intent (composer SOP)
+INTENT_EXAMPLES = {
+    "complaint": [
+        "saya mau komplain barang rusak",
+        "bagaimana cara menyampaikan keluhan",
+        "pesanan saya bermasalah",
+    ],
+    "vision": [
+        "apa visi misi perusahaan",
+        "tujuan perusahaan ke depan",
+    ],
+    "profile": [
+        "sejarah singkat perusahaan",
+        "profil perusahaan cni",
+        "kapan cni berdiri",
+    ],
+    "general": [
+        "informasi umum",
+        "halo",
+    ],
+}
+
+
+def load_log_examples(path: str, label_fn, limit: int = ROUTER_LOG_EXAMPLES) -> dict:
+    """
+    Contoh dari chat_logs.jsonl (baris terakhir, maks limit).
+    label_fn(record) → label atau None (tidak dipakai).
+    """
+    if not path or not os.path.exists(path):
+        return {}
+
+    with open(path, encoding="utf-8") as f:
+        lines = f.readlines()[-limit:]
+
+    examples: dict[str, list] = {}
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+
+        question = (record.get("question") or "").strip()
+        label = label_fn(record) if question else None
+        if label:
+            examples.setdefault(label, []).append(question)
+
+    return examples
+
+
+class CentroidClassifier:
+    def __init__(
+        self,
+        name: str,
+        examples: dict,
+        log_path: str | None = None,
+        log_label_fn=None,
+        min_score: float = ROUTER_MIN_SCORE,
+        margin: float = ROUTER_MARGIN,
+    ):
+        self.name = name
+        self.examples = examples
+        self.log_path = log_path
+        self.log_label_fn = log_label_fn
+        self.min_score = min_score
+        self.margin = margin
+
+        self.labels: list[str] = []
+        self.centroids: np.ndarray | None = None
+        self.version = 0  # naik tiap build → cache keputusan di-reset
+
+        self._lock = threading.Lock()
+        self._failed_at = float("-inf")
+        self._building: threading.Thread | None = None
+
+    def _all_examples(self) -> dict:
+        merged = {label: list(texts) for label, texts in self.examples.items()}
+
+        if self.log_label_fn:
+            logged = load_log_examples(self.log_path, self.log_label_fn)
+            for label, texts in logged.items():
+                merged.setdefault(label, []).extend(texts)
+
+        return merged
+
+    def build(self):
+        from ingestion.batch_embedder import BatchEmbedder
+
+        started = time.perf_counter()
+        examples = self._all_examples()
+
+        texts = [t for label in examples for t in examples[label]]
+        vectors = BatchEmbedder().embed(texts)
+
+        labels, centroids, i = [], [], 0
+        for label, items in examples.items():
+            block = vectors[i:i + len(items)]
+            i += len(items)
+            if not len(block):
+                continue
+
+            centroid = block.mean(axis=0)
+            labels.append(label)
+            centroids.append(centroid / (np.linalg.norm(centroid) or 1.0))
+
+        self.labels = labels
+        self.centroids = np.asarray(centroids, dtype="float32")
+        self.version += 1
+
+        print(
+            f"🧭 Centroids built: {self.name} ({len(texts)} examples, "
+            f"{len(labels)} labels, {(time.perf_counter() - started) * 1000:.0f} ms)"
+        )
+
+    def _build_background(self):
+        try:
+            self.build()
+        except Exception as e:
+            print(f"⚠️ Centroid build failed ({self.name}):", e)
+            self._failed_at = time.monotonic()
+
+    def warm(self, wait: bool = False) -> bool:
+        """
+        Mulai build di background thread (jika belum ada / belum berjalan).
+        wait=True → tunggu selesai (script / benchmark).
+        """
+        with self._lock:
+            if self.centroids is None and (self._building is None or not self._building.is_alive()):
+                self._building = threading.Thread(
+                    target=self._build_background, name=f"centroids-{self.name}", daemon=True
+                )
+                self._building.start()
+            building = self._building
+
+        if wait and building is not None:
+            building.join()
+        return self.centroids is not None
+
+    def ready(self) -> bool:
+        """
+        True jika centroid siap. Tidak pernah memblokir: belum siap →
+        build dipicu di background (maks sekali per ROUTER_RETRY_INTERVAL
+        setelah gagal), pemanggil lanjut tanpa centroid.
+        """
+        if self.centroids is not None:
+            return True
+        if time.monotonic() - self._failed_at >= ROUTER_RETRY_INTERVAL:
+            self.warm()
+        return False
+
+    def scores(self, query_vec: np.ndarray) -> dict[str, float]:
+        if not self.ready():
+            return {}
+
+        vec = np.asarray(query_vec, dtype="float32").ravel()
+        vec = vec / (np.linalg.norm(vec) or 1.0)
+        return dict(zip(self.labels, (self.centroids @ vec).tolist()))
+
+    def classify(self, query_vec: np.ndarray) -> tuple[str, float] | None:
+        """
+        (label, cosine) jika yakin, None jika tidak ada centroid yang menang jelas.
+        """
+        ranked = sorted(self.scores(query_vec).items(), key=lambda x: -x[1])
+        if not ranked:
+            return None
+
+        label, best = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else -1.0
+
+        if best < self.min_score or best - runner_up < self.margin:
+            return None
+        return label, best
@@ -0,0 +1,305 @@
+# core/telemetry.py
+"""
+Latency per stage pipeline chat.
+
+- stage("embed")        → context manager, durasi masuk histogram stage
+                          & trace request yang sedang berjalan
+- timed("search")       → decorator (fungsi sync maupun async)
+- request_scope()       → satu trace per request; request id di contextvar
+                          (ikut ke task asyncio / asyncio.to_thread /
+                          thread pool yang memakai copy_context)
+- record_llm(data)      → token & durasi dari respons Ollama
+                          (prompt_eval_count, prompt_eval_duration,
+                          eval_count, eval_duration)
+- render_prometheus()   → teks untuk GET /metrics
+
+Histogram = bucket kumulatif (Prometheus) + reservoir sampel terakhir
+untuk p50 / p95 / p99. Angka per proses: dengan beberapa worker
+gunicorn, tiap scrape melihat satu worker.
+"""
+
+import functools
+import inspect
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from config import (
+    TELEMETRY_ENABLED,
+    TELEMETRY_BUCKETS,
+    TELEMETRY_RESERVOIR,
+    TELEMETRY_LOG_REQUESTS,
+)
+
+_request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+_trace: ContextVar[dict | None] = ContextVar("telemetry_trace", default=None)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+# =========================
+# HISTOGRAM
+# =========================
+class Histogram:
+    def __init__(self, buckets=TELEMETRY_BUCKETS, reservoir: int = TELEMETRY_RESERVOIR):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # + bucket +Inf
+        self.samples: deque = deque(maxlen=reservoir)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.samples.append(value)
+        self.count += 1
+        self.sum += value
+
+    def quantiles(self, qs=QUANTILES) -> dict[float, float]:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: 0.0 for q in qs}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in qs}
+
+
+# =========================
+# REGISTRY
+# =========================
+class Telemetry:
+    def __init__(self, enabled: bool = TELEMETRY_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stages: dict[str, Histogram] = {}
+        self._llm: dict[str, Histogram] = {}
+        self._counters: dict[str, float] = {}
+
+    def observe(self, stage: str, seconds: float):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            hist = self._stages.get(stage)
+            if hist is None:
+                hist = self._stages[stage] = Histogram()
+            hist.observe(seconds)
+
+        trace = _trace.get()
+        if trace is not None:
+            trace[stage] = trace.get(stage, 0.0) + seconds
+
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            self._add(name, value)
+
+    def _add(self, name: str, value: float):
+        self._counters[name] = self._counters.get(name, 0) + value
+
+    def record_llm(self, data: dict):
+        """
+        Statistik dari respons Ollama (durasi dalam nanodetik).
+        """
+        if not self.enabled or not data:
+            return
+
+        prompt_tokens = data.get("prompt_eval_count") or 0
+        eval_tokens = data.get("eval_count") or 0
+
+        with self._lock:
+            self._add("ollama_requests_total", 1)
+            self._add("ollama_prompt_tokens_total", prompt_tokens)
+            self._add("ollama_eval_tokens_total", eval_tokens)
+
+            for key in ("prompt_eval_duration", "eval_duration", "load_duration"):
+                if data.get(key):
+                    hist = self._llm.get(key)
+                    if hist is None:
+                        hist = self._llm[key] = Histogram()
+                    hist.observe(data[key] / 1e9)
+
+        trace = _trace.get()
+        if trace is not None:
+            trace["prompt_tokens"] = trace.get("prompt_tokens", 0) + prompt_tokens
+            trace["eval_tokens"] = trace.get("eval_tokens", 0) + eval_tokens
+
+    # -------------------------
+    # EXPORT
+    # -------------------------
+    def snapshot(self) -> dict:
+        """
+        {stage: {count, mean_ms, p50_ms, p95_ms, p99_ms}} + counters (JSON).
+        """
+        with self._lock:
+            stages = {}
+            for stage, hist in sorted(self._stages.items()):
+                qs = hist.quantiles()
+                stages[stage] = {
+                    "count": hist.count,
+                    "mean_ms": round(hist.sum / hist.count * 1000, 2) if hist.count else 0.0,
+                    **{f"p{int(q * 100)}_ms": round(v * 1000, 2) for q, v in qs.items()},
+                }
+            return {"stages": stages, "counters": dict(self._counters)}
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            _histogram_lines(
+                lines, "rag_stage_seconds", "Latency per pipeline stage", "stage", self._stages
+            )
+
+            lines += [
+                "# HELP rag_stage_quantile_seconds p50/p95/p99 of recent samples per stage",
+                "# TYPE rag_stage_quantile_seconds gauge",
+            ]
+            for stage, hist in sorted(self._stages.items()):
+                for q, v in hist.quantiles().items():
+                    lines.append(
+                        f'rag_stage_quantile_seconds{{stage="{stage}",quantile="{q}"}} {v:.6f}'
+                    )
+
+            _histogram_lines(
+                lines, "ollama_duration_seconds", "Ollama-reported durations", "phase", self._llm
+            )
+
+            for name, value in sorted(self._counters.items()):
+                lines += [f"# TYPE {name} counter", f"{name} {value:g}"]
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._llm.clear()
+            self._counters.clear()
+
+
+def _histogram_lines(lines: list, name: str, help_text: str, label: str, hists: dict):
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+
+    for key, hist in sorted(hists.items()):
+        cumulative = 0
+        for bound, n in zip((*hist.buckets, "+Inf"), hist.counts):
+            cumulative += n
+            le = bound if bound == "+Inf" else f"{bound:g}"
+            lines.append(f'{name}_bucket{{{label}="{key}",le="{le}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{label}="{key}"}} {hist.sum:.6f}')
+        lines.append(f'{name}_count{{{label}="{key}"}} {hist.count}')
+
+
+telemetry = Telemetry()
+
+
+# =========================
+# TIMERS
+# =========================
+@contextmanager
+def stage(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        telemetry.observe(name, time.perf_counter() - started)
+
+
+def timed(name: str):
+    """
+    Decorator: seluruh durasi panggilan fungsi dicatat sebagai stage name.
+    """
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with stage(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+# =========================
+# REQUEST SCOPE
+# =========================
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def current_request_id() -> str | None:
+    return _request_id.get()
+
+
+def bind_request_id(request_id: str):
+    """
+    Set request id (mis. dari header X-Request-ID); return token untuk reset.
+    """
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token):
+    _request_id.reset(token)
+
+
+def traced(name: str = "request"):
+    """
+    Decorator request_scope untuk entry point engine (sync / async).
+    """
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with request_scope(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with request_scope(name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def request_scope(name: str = "request"):
+    """
+    Satu trace per request. Nested (engine dipanggil dari engine lain)
+    → ikut trace luar, tidak dihitung dua kali.
+    """
+    if _trace.get() is not None:
+        yield _request_id.get()
+        return
+
+    request_id = _request_id.get() or new_request_id()
+    id_token = _request_id.set(request_id)
+    trace_token = _trace.set({})
+    started = time.perf_counter()
+
+    try:
+        yield request_id
+    finally:
+        elapsed = time.perf_counter() - started
+        trace = _trace.get()
+        _trace.reset(trace_token)
+        _request_id.reset(id_token)
+
+        telemetry.observe(name, elapsed)
+        if TELEMETRY_LOG_REQUESTS and telemetry.enabled:
+            print(f"⏱️ [{request_id}] {name} {elapsed * 1000:.0f} ms | {_format_trace(trace)}")
+
+
+def _format_trace(trace: dict) -> str:
+    parts = []
+    for key, value in trace.items():
+        if key.endswith("_tokens"):
+            parts.append(f"{key} {value}")
+        else:
+            parts.append(f"{key} {value * 1000:.0f}")
+    return " · ".join(parts) or "-"
@@ -0,0 +1,128 @@
+# core/text_cleaning.py
+"""
+Pembersihan teks chunk (dipakai ingestion & context builder).
+
+- clean_text()  → rapikan baris kosong; untuk sumber web-scraped (produk)
+                  juga buang kalimat footer / header / navigasi web.
+                  Dijalankan SEKALI saat ingestion (teks bersih yang
+                  disimpan & di-embed)
+- dedupe()      → buang chunk yang hampir identik (overlap chunker,
+                  halaman berulang), berbasis shingle 3 kata; saat
+                  ingestion per file sumber, lintas dokumen per query
+                  (ContextBuilder)
+"""
+
+import math
+import re
+from collections import Counter
+
+# Versi aturan pembersihan: naikkan jika BOILERPLATE_MARKERS / aturan
+# dedupe ingestion berubah → pipeline melakukan full rebuild sekali
+# (lihat ingestion.incremental)
+CLEAN_VERSION = 3
+
+# Penanda footer / header / navigasi website produk (dulu difilter per
+# request di jalur RAG produk). Hanya kalimat yang memuat penanda yang
+# dibuang, bukan seluruh chunk; domain lain (profil, SOP) tidak difilter
+# karena "CNI Building" / "hak cipta" di sana adalah isi, bukan footer.
+BOILERPLATE_MARKERS = [
+    "empowering your tomorrow",
+    "contact us",
+    "hak cipta",
+    "copyright",
+    "cni building",
+    "home about",
+    "news articles",
+    "follow information",
+    "syarat & ketentuan",
+    "kebijakan & privasi",
+    "©",
+]
+
+_BOILERPLATE_RE = re.compile(
+    "|".join(
+        re.escape(m) if not m[0].isalnum() else rf"\b{re.escape(m)}\b"
+        for m in BOILERPLATE_MARKERS
+    ),
+    re.IGNORECASE,
+)
+
+# Teks PDF sering di-flatten jadi satu baris → pecah per kalimat / separator
+_SEGMENT_RE = re.compile(r"(?<=[.!?])\s+|\s+\|\s+")
+
+_WORD_RE = re.compile(r"\w+")
+
+
+# =========================
+# BOILERPLATE
+# =========================
+def clean_text(text: str, strip_boilerplate: bool = False) -> str:
+    """
+    Rapikan baris; strip_boilerplate → hapus kalimat / segmen yang
+    mengandung penanda boilerplate (sisa baris tetap dipertahankan).
+    """
+    kept = []
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+
+        if not strip_boilerplate:
+            kept.append(line)
+            continue
+
+        segments = _SEGMENT_RE.split(line)
+        segments = [s for s in segments if s.strip() and not _BOILERPLATE_RE.search(s)]
+
+        if segments:
+            kept.append(" ".join(segments))
+
+    return "\n".join(kept)
+
+
+# =========================
+# NEAR-DUPLICATE
+# =========================
+def shingles(text: str, size: int = 3) -> set:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def dedupe(texts: list[str], threshold: float) -> list[int]:
+    """
+    Index teks yang dipertahankan (urutan asli, yang pertama menang).
+
+    Duplikat = containment shingle |A ∩ B| / min(|A|, |B|) >= threshold,
+    jadi chunk yang isinya sudah tercakup chunk lain juga dibuang.
+    Kandidat dicari lewat inverted index shingle → O(total shingle).
+    """
+    kept: list[int] = []
+    sizes: dict[int, int] = {}
+    postings: dict[tuple, list[int]] = {}
+
+    for i, text in enumerate(texts):
+        sh = shingles(text)
+        if not sh:
+            continue
+
+        overlap = Counter()
+        for s in sh:
+            for j in postings.get(s, ()):
+                overlap[j] += 1
+
+        if any(n / min(len(sh), sizes[j]) >= threshold for j, n in overlap.items()):
+            continue
+
+        kept.append(i)
+        sizes[i] = len(sh)
+        for s in sh:
+            postings.setdefault(s, []).append(i)
+
+    return kept
+
+
+def estimate_tokens(text: str, chars_per_token: float) -> int:
+    return math.ceil(len(text) / chars_per_token)
@@ -0,0 +1,576 @@
+# core/vectorstore.py
+"""
+Vector Store Registry
+=====================
+
+Registry in-process untuk semua vector store domain
+(sop / profile / product / news).
+
+- Index FAISS + metadata tiap domain dibaca SEKALI (lazy, thread-safe)
+- Retriever hanya "view" tipis di atas registry → tidak ada I/O per request
+- Hot-reload otomatis saat file di disk berubah (dicek tiap
+  VECTORSTORE_RELOAD_INTERVAL detik, bukan tiap query)
+
+Snapshot VectorStore bersifat immutable: reload membuat objek baru dan
+menukar referensinya, jadi query yang sedang berjalan tetap aman.
+
+FORMAT DI DISK (per domain)
+- index.faiss          → dibuka dengan mmap (IO_FLAG_MMAP_IFC): vektor flat / HNSW
+                         dibaca dari page cache, tidak disalin ke heap proses;
+                         tipe yang tidak bisa di-mmap dibaca biasa
+- chunks.jsonl         → satu record chunk per baris (JSON compact)
+- chunks.offsets.npy   → int64[n + 1] byte offset tiap baris (di-mmap)
+- chunks.ids.npy       → int64[n] id vektor per baris (hanya untuk IndexIDMap)
+- bm25.*               → posting list BM25 (CSR, lihat core.bm25), dibangun saat
+                         ingestion & di-mmap saat load; store lama tanpa file ini
+                         (atau BM25_VERSION berbeda) → dibangun saat load /
+                         reload registry, bukan di query pertama
+- manifest.json        → kontrak index: metric, normalized, model, dim, build_time,
+                         bm25 (versi & jumlah dokumen)
+
+KONTRAK INDEX
+Semua store = vektor L2-normalized + inner product (cosine similarity),
+dibangun dengan EMBED_MODEL. Saat load, manifest dicek:
+- model / dim berbeda          → ditolak (query vector tidak sebanding)
+- L2 atas vektor normalized    → diterima, score dikonversi ke cosine
+- vektor belum normalized      → index flat dikonversi ke cosine di memori,
+                                 index ANN ditolak (rebuild dengan --full)
+Store lama tanpa manifest diperiksa dari index-nya langsung.
+VectorStore.search() adalah satu-satunya jalur query: normalize sekali,
+batch [n, dim], score selalu cosine.
+
+retrieve() hanya mem-parse record top-k by id, bukan seluruh korpus.
+Tanpa chunks.ids.npy, label FAISS = posisi baris (index lama / non-ID-map).
+metadata.json (format lama, JSON list) tetap bisa dibaca sebagai fallback.
+"""
+
+import json
+import mmap
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+from config import VECTOR_DIRS, VECTORSTORE_RELOAD_INTERVAL, EMBED_MODEL, HYBRID_DOMAINS
+from core.bm25 import BM25Index, BM25_VERSION, tokenize
+from core import ann
+
+INDEX_FILE = "index.faiss"
+CHUNKS_FILE = "chunks.jsonl"
+OFFSETS_FILE = "chunks.offsets.npy"
+IDS_FILE = "chunks.ids.npy"
+MANIFEST_FILE = "manifest.json"
+METADATA_FILE = "metadata.json"  # format lama
+
+
+# =========================
+# CHUNK METADATA (OFFSET-INDEXED)
+# =========================
+class ChunkStore:
+    """
+    Metadata chunk read-only di atas mmap.
+    store[i] mem-parse satu baris saja → RSS & startup ~O(1) terhadap korpus.
+    """
+
+    def __init__(self, chunks_path: Path, offsets_path: Path):
+        self._offsets = np.load(offsets_path, mmap_mode="r")
+        self._file = open(chunks_path, "rb")
+
+        size = os.fstat(self._file.fileno()).st_size
+        if int(self._offsets[-1]) != size:
+            self._file.close()
+            raise ValueError(
+                f"Offsets tidak cocok dengan {chunks_path.name} "
+                f"({int(self._offsets[-1])} != {size})"
+            )
+
+        # mmap file kosong tidak diizinkan
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> dict:
+        if i < 0 or i >= len(self):
+            raise IndexError(i)
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return json.loads(self._mm[start:end])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def write_chunks(directory: Path, records: list):
+    """
+    Tulis chunks.jsonl + chunks.offsets.npy (atomic per file via os.replace).
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    chunks_tmp = directory / (CHUNKS_FILE + ".tmp")
+    offsets_tmp = directory / (OFFSETS_FILE + ".tmp")
+
+    offsets = [0]
+    with open(chunks_tmp, "wb") as f:
+        for record in records:
+            line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+            f.write(line.encode("utf-8") + b"\n")
+            offsets.append(f.tell())
+
+    with open(offsets_tmp, "wb") as f:
+        np.save(f, np.asarray(offsets, dtype="int64"))
+
+    os.replace(offsets_tmp, directory / OFFSETS_FILE)
+    os.replace(chunks_tmp, directory / CHUNKS_FILE)
+
+
+# =========================
+# MANIFEST (KONTRAK INDEX)
+# =========================
+def _metric_name(index, normalized: bool) -> str:
+    if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        return "cosine" if normalized else "ip"
+    return "l2"
+
+
+def build_manifest(index, model: str, normalized: bool) -> dict:
+    return {
+        "metric": _metric_name(index, normalized),
+        "normalized": normalized,
+        "model": model,
+        "dim": index.d,
+        "count": index.ntotal,
+        "index_type": ann.index_kind(index),
+        "build_time": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def read_manifest(directory: Path) -> dict | None:
+    path = Path(directory) / MANIFEST_FILE
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_manifest(directory: Path, manifest: dict):
+    tmp = directory / (MANIFEST_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, directory / MANIFEST_FILE)
+
+
+def save_vectorstore(
+    directory: Path,
+    index,
+    records: list,
+    ids=None,
+    model: str = EMBED_MODEL,
+    normalized: bool = True,
+):
+    """
+    Simpan index FAISS + metadata chunk dalam format vector store.
+    Index ditulis terakhir: reload di API hanya terjadi saat set file lengkap.
+
+    ids        : id vektor per record (wajib untuk IndexIDMap, urutan = records).
+    model      : model embedding yang menghasilkan vektor index
+    normalized : vektor sudah L2-normalized (kontrak default)
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    if index.ntotal != len(records):
+        raise ValueError(
+            f"Jumlah vektor ({index.ntotal}) != jumlah chunk ({len(records)})"
+        )
+
+    write_chunks(directory, records)
+
+    bm25 = _build_bm25(records)
+    bm25.save(directory)
+
+    if ids is not None:
+        if len(ids) != len(records):
+            raise ValueError(f"Jumlah id ({len(ids)}) != jumlah chunk ({len(records)})")
+        ids_tmp = directory / (IDS_FILE + ".tmp")
+        with open(ids_tmp, "wb") as f:
+            np.save(f, np.asarray(ids, dtype="int64"))
+        os.replace(ids_tmp, directory / IDS_FILE)
+    else:
+        (directory / IDS_FILE).unlink(missing_ok=True)
+
+    manifest = build_manifest(index, model, normalized)
+    manifest["bm25"] = {"version": BM25_VERSION, "docs": bm25.n_docs}
+    _write_manifest(directory, manifest)
+
+    index_tmp = directory / (INDEX_FILE + ".tmp")
+    faiss.write_index(index, str(index_tmp))
+    os.replace(index_tmp, directory / INDEX_FILE)
+
+    # metadata.json lama tidak lagi dipakai → hapus agar tidak basi
+    (directory / METADATA_FILE).unlink(missing_ok=True)
+
+
+def swap_directory(building: Path, target: Path):
+    """
+    Ganti folder store lama dengan folder hasil build secara utuh.
+    Dua rename di filesystem yang sama: pembaca tidak pernah melihat
+    campuran file lama & baru.
+    """
+    building, target = Path(building), Path(target)
+    retired = target.with_name(target.name + ".old")
+
+    shutil.rmtree(retired, ignore_errors=True)
+    if target.exists():
+        os.replace(target, retired)
+    os.replace(building, target)
+    shutil.rmtree(retired, ignore_errors=True)
+
+
+def _read_index(path: Path):
+    """
+    Buka index dengan mmap; fallback ke read biasa
+    untuk tipe index / versi faiss yang tidak mendukung mmap.
+
+    IO_FLAG_MMAP_IFC (faiss >= 1.7.4) → data vektor flat / HNSW dipetakan
+    langsung dari file. IO_FLAG_MMAP lama hanya berlaku untuk inverted
+    list on-disk; index flat / HNSW tetap disalin penuh ke RAM.
+    """
+    try:
+        return faiss.read_index(str(path), faiss.IO_FLAG_MMAP_IFC)
+    except (RuntimeError, AttributeError):
+        return faiss.read_index(str(path))
+
+
+def _resolve_contract(domain: str, index, manifest: dict | None):
+    """
+    Cocokkan index dengan kontrak query (cosine, EMBED_MODEL).
+    Return (index, metric) dengan metric "cosine" atau "l2" (normalized);
+    kombinasi yang tidak bisa dibandingkan → ValueError.
+    """
+    if manifest is None:
+        # store lama: metric dari index, normalisasi dari sampel vektor
+        normalized = ann.sample_is_normalized(index)
+        manifest = {
+            "metric": _metric_name(index, bool(normalized)),
+            "normalized": normalized,
+            "model": None,
+            "dim": index.d,
+        }
+        print(f"⚠️ {domain}: tanpa {MANIFEST_FILE}, model embedding tidak diketahui")
+
+    if manifest["dim"] != index.d:
+        raise ValueError(f"{domain}: dim manifest {manifest['dim']} != index {index.d}")
+
+    model = manifest.get("model")
+    if model is not None and model != EMBED_MODEL:
+        raise ValueError(
+            f"{domain}: index dibangun dengan {model}, query memakai {EMBED_MODEL} "
+            f"(rebuild pipeline dengan --full)"
+        )
+
+    if manifest["normalized"]:
+        # L2² atas vektor unit = 2 - 2·cos → ranking sama, score dikonversi
+        return index, "cosine" if manifest["metric"] == "cosine" else "l2"
+
+    print(f"⚠️ {domain}: vektor index belum normalized → dikonversi ke cosine")
+    return ann.as_cosine(index), "cosine"
+
+
+def _metadata_files(directory: Path) -> list[Path]:
+    if (directory / CHUNKS_FILE).exists():
+        files = [directory / CHUNKS_FILE, directory / OFFSETS_FILE]
+        if (directory / IDS_FILE).exists():
+            files.append(directory / IDS_FILE)
+        return files
+    return [directory / METADATA_FILE]
+
+
+def _load_ids(directory: Path):
+    path = directory / IDS_FILE
+    if not path.exists():
+        return None
+    return np.load(path, mmap_mode="r")
+
+
+def _build_bm25(records) -> BM25Index:
+    return BM25Index([tokenize(record.get("text", "")) for record in records])
+
+
+def _load_bm25(domain: str, directory: Path, manifest: dict | None, metadata) -> BM25Index | None:
+    """
+    BM25 dari file ingestion (mmap). Tidak ada / versi lama → dibangun di
+    sini (load / reload registry) untuk domain hybrid; domain lain lazy.
+    """
+    info = (manifest or {}).get("bm25") or {}
+    if info.get("version") == BM25_VERSION and info.get("docs") == len(metadata):
+        try:
+            return BM25Index.load(directory)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ BM25 files unusable ({domain}):", e)
+
+    if domain not in HYBRID_DOMAINS:
+        return None
+
+    started = time.perf_counter()
+    bm25 = _build_bm25(metadata)
+    print(
+        f"🔤 BM25 built: {domain} ({len(metadata)} chunks, "
+        f"{(time.perf_counter() - started) * 1000:.0f} ms)"
+    )
+    return bm25
+
+
+def _load_metadata(directory: Path):
+    if (directory / CHUNKS_FILE).exists():
+        return ChunkStore(directory / CHUNKS_FILE, directory / OFFSETS_FILE)
+
+    with open(directory / METADATA_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# =========================
+# SNAPSHOT
+# =========================
+class VectorStore:
+    """
+    Satu snapshot vector store domain: index FAISS + metadata chunk.
+    """
+
+    def __init__(
+        self,
+        domain: str,
+        index,
+        metadata,
+        version: tuple,
+        ids=None,
+        metric: str = "cosine",
+        bm25: BM25Index | None = None,
+    ):
+        self.domain = domain
+        self.index = index
+        self.metric = metric
+        self.metadata = metadata
+        self.version = version
+        self.ids = ids
+
+        # BM25 atas teks chunk: dari load_vectorstore (file ingestion /
+        # dibangun saat load); None → dibangun lazy saat dipakai pertama
+        self._bm25 = bm25
+        self._bm25_lock = threading.Lock()
+
+        # label FAISS (id vektor) → posisi record, via binary search
+        if ids is not None:
+            self._order = np.argsort(ids, kind="stable")
+            self._sorted_ids = np.asarray(ids)[self._order]
+
+    def position(self, label: int) -> int:
+        """
+        Posisi record untuk label hasil search (-1 jika tidak ada).
+        """
+        if self.ids is None:
+            return int(label) if 0 <= label < len(self.metadata) else -1
+
+        i = int(np.searchsorted(self._sorted_ids, label))
+        if i < len(self._sorted_ids) and self._sorted_ids[i] == label:
+            return int(self._order[i])
+        return -1
+
+    def record(self, label: int) -> dict | None:
+        pos = self.position(label)
+        return self.metadata[pos] if pos >= 0 else None
+
+    def bm25(self) -> BM25Index:
+        """
+        Index sparse (BM25) untuk snapshot ini; doc id = posisi record.
+        Snapshot immutable → dibangun sekali, dibuang bersama snapshot.
+        """
+        if self._bm25 is None:
+            with self._bm25_lock:
+                if self._bm25 is None:
+                    self._bm25 = _build_bm25(self.metadata)
+        return self._bm25
+
+    def search(self, query_vecs: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        FAISS search batch: query [dim] atau [n, dim] → (scores, labels) [n, k].
+        Query di-normalize sekali di sini; score selalu cosine similarity.
+        """
+        queries = np.array(query_vecs, dtype="float32", ndmin=2)
+        if queries.shape[1] != self.index.d:
+            raise ValueError(
+                f"Dimensi query {queries.shape[1]} != index {self.domain} {self.index.d}"
+            )
+
+        faiss.normalize_L2(queries)
+        scores, labels = self.index.search(queries, k)
+
+        if self.metric == "l2":
+            scores = 1.0 - scores / 2.0
+
+        return scores, labels
+
+    def score(self, query_vec: np.ndarray, positions: list[int]) -> dict[int, float]:
+        """
+        Cosine query terhadap record tertentu saja (IDSelectorBatch):
+        dipakai untuk chunk yang ditemukan BM25 tapi tidak ada di top-k FAISS.
+        Exact untuk index flat; untuk HNSW / IVF-PQ bisa ada yang terlewat.
+        """
+        if not positions:
+            return {}
+
+        labels = np.asarray(
+            [int(self.ids[p]) if self.ids is not None else p for p in positions],
+            dtype="int64",
+        )
+        queries = np.array(query_vec, dtype="float32", ndmin=2)
+        faiss.normalize_L2(queries)
+
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(labels))
+        scores, found = self.index.search(queries, len(labels), params=params)
+
+        if self.metric == "l2":
+            scores = 1.0 - scores / 2.0
+
+        return {
+            self.position(label): float(score)
+            for score, label in zip(scores[0], found[0])
+            if label >= 0
+        }
+
+    def __len__(self) -> int:
+        return self.index.ntotal
+
+
+def _file_version(directory: Path) -> tuple | None:
+    """
+    Versi store = (mtime_ns, size) dari file index & metadata.
+    None jika salah satu file belum ada.
+    """
+    version = []
+    try:
+        for path in [directory / INDEX_FILE, *_metadata_files(directory)]:
+            stat = path.stat()
+            version += [stat.st_mtime_ns, stat.st_size]
+    except FileNotFoundError:
+        return None
+
+    return tuple(version)
+
+
+def load_vectorstore(domain: str, directory: Path) -> VectorStore | None:
+    """
+    Buka index (mmap) & metadata dari disk (tanpa cache).
+    """
+    directory = Path(directory)
+    version = _file_version(directory)
+    if version is None:
+        return None
+
+    manifest = read_manifest(directory)
+    index = _read_index(directory / INDEX_FILE)
+    index, metric = _resolve_contract(domain, index, manifest)
+    ann.configure(index, domain)  # efSearch / nprobe (HNSW / IVF-PQ)
+    metadata = _load_metadata(directory)
+    ids = _load_ids(directory)
+
+    # file sedang diganti pipeline → tolak, registry pakai snapshot lama
+    if index.ntotal != len(metadata) or (ids is not None and len(ids) != len(metadata)):
+        raise ValueError(
+            f"Index ({index.ntotal}) dan metadata ({len(metadata)}) tidak sinkron"
+        )
+
+    bm25 = _load_bm25(domain, directory, manifest, metadata)
+
+    print(f"📦 Vectorstore loaded: {domain} ({index.ntotal} vectors, {ann.index_kind(index)})")
+    return VectorStore(domain, index, metadata, version, ids, metric, bm25)
+
+
+# =========================
+# REGISTRY
+# =========================
+class IndexRegistry:
+    """
+    Cache process-wide: domain → VectorStore.
+    """
+
+    def __init__(self, directories: dict, reload_interval: float = VECTORSTORE_RELOAD_INTERVAL):
+        self.directories = {k: Path(v) for k, v in directories.items()}
+        self.reload_interval = reload_interval
+
+        self._stores: dict[str, VectorStore | None] = {}
+        self._checked_at: dict[str, float] = {}
+        self._locks = {domain: threading.Lock() for domain in self.directories}
+
+    def get(self, domain: str) -> VectorStore | None:
+        """
+        Ambil snapshot domain. Load saat pertama dipakai,
+        reload jika file di disk berubah.
+        """
+        if domain not in self.directories:
+            raise KeyError(f"Unknown vectorstore domain: {domain}")
+
+        now = time.monotonic()
+        store = self._stores.get(domain)
+
+        # fast path: sudah dimuat & belum waktunya cek disk
+        if domain in self._stores and now - self._checked_at.get(domain, 0) < self.reload_interval:
+            return store
+
+        with self._locks[domain]:
+            # thread lain mungkin sudah memuat / mengecek
+            store = self._stores.get(domain)
+            if domain in self._stores and now - self._checked_at.get(domain, 0) < self.reload_interval:
+                return store
+
+            directory = self.directories[domain]
+            version = _file_version(directory)
+
+            # version None → direktori sedang ditukar (swap_directory) atau
+            # belum ada: snapshot lama tetap dipakai, bukan diganti None
+            if version is not None and (store is None or version != store.version):
+                try:
+                    store = load_vectorstore(domain, directory) or store
+                except Exception as e:
+                    # file sedang ditulis / rusak → pakai snapshot lama
+                    print(f"⚠️ Vectorstore reload failed ({domain}):", e)
+
+            self._stores[domain] = store
+            self._checked_at[domain] = time.monotonic()
+            return store
+
+    def invalidate(self, domain: str | None = None):
+        """
+        Paksa reload pada akses berikutnya (mis. setelah pipeline selesai).
+        """
+        domains = [domain] if domain else list(self.directories)
+        for d in domains:
+            self._checked_at.pop(d, None)
+
+    def disk_versions(self) -> dict:
+        """
+        Versi file di disk per domain (stat saja, tanpa load).
+        Dipakai cache lain untuk mendeteksi index yang di-rebuild.
+        """
+        return {
+            domain: _file_version(directory)
+            for domain, directory in self.directories.items()
+        }
+
+    def versions(self) -> dict:
+        """
+        Versi snapshot yang sedang dimuat per domain.
+        """
+        return {
+            domain: store.version if store else None
+            for domain, store in self._stores.items()
+        }
+
+
+registry = IndexRegistry(VECTOR_DIRS)
@@ -0,0 +1,60 @@
+# gunicorn.conf.py
+"""
+Production launch:
+
+    gunicorn -c gunicorn.conf.py api.main:app
+
+- preload_app → api.main (katalog, retriever) di-import sekali di master,
+  lalu core.prefork.preload() memuat semua index sebelum worker di-fork
+  (apa yang benar-benar dibagi antar worker: lihat core/prefork.py)
+- tiap worker = satu event loop uvicorn (handler FastAPI sudah async)
+- API_WORKERS / API_BIND lewat env (lihat config.py)
+"""
+
+import os
+
+# state follow-up harus terlihat oleh semua worker (request user
+# berikutnya bisa mendarat di worker lain) → default backend sqlite
+os.environ.setdefault("CONVERSATION_BACKEND", "sqlite")
+
+# slot generate tiap worker (core.llm_scheduler) → total semua worker
+# ≈ OLLAMA_NUM_PARALLEL, bukan OLLAMA_NUM_PARALLEL × worker
+_workers = int(os.getenv("API_WORKERS", os.cpu_count() or 1))
+os.environ.setdefault(
+    "LLM_SLOTS", str(max(1, int(os.getenv("OLLAMA_NUM_PARALLEL", "4")) // _workers))
+)
+
+from config import (  # noqa: E402
+    API_BIND, API_WORKERS, API_TIMEOUT, LLM_SLOTS, OLLAMA_NUM_PARALLEL,
+)
+
+# minimal 1 slot per worker → worker > OLLAMA_NUM_PARALLEL = oversubscribe
+# (lihat config.py, LLM SCHEDULER)
+if LLM_SLOTS * API_WORKERS > OLLAMA_NUM_PARALLEL:
+    print(
+        f"⚠️ LLM_SLOTS {LLM_SLOTS} × {API_WORKERS} worker = "
+        f"{LLM_SLOTS * API_WORKERS} generate paralel > OLLAMA_NUM_PARALLEL "
+        f"{OLLAMA_NUM_PARALLEL}: kelebihannya antre di Ollama tanpa admission "
+        f"control. Turunkan API_WORKERS atau naikkan OLLAMA_NUM_PARALLEL."
+    )
+
+bind = API_BIND
+workers = API_WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = API_TIMEOUT
+graceful_timeout = 30
+keepalive = 5
+
+
+def when_ready(server):
+    # dipanggil di master setelah app di-preload, sebelum worker pertama
+    from core.prefork import preload
+
+    preload()
+
+
+def post_fork(server, worker):
+    from core.prefork import after_fork
+
+    after_fork()
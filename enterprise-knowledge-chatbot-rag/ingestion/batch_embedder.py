@@ -0,0 +1,185 @@
+# ingestion/batch_embedder.py
+"""
+Batch embedding stage untuk semua pipeline ingestion.
+
+- Teks dikirim per batch ke Ollama /api/embed (bukan 1 request per chunk)
+- Beberapa batch berjalan paralel (dibatasi max_workers & limiter client)
+- Progress + throughput dicetak per batch
+- Resume: batch yang selesai ditulis ke checkpoint (JSONL, append-only);
+  run berikutnya melewati teks yang sudah ada di checkpoint
+- Embedding cache bersama (core.embedding_cache): teks yang pernah
+  di-embed (ingestion lain / query) tidak dikirim ke Ollama lagi
+
+Output selalu float32 [n, dim] dan L2-normalized (siap untuk IndexFlatIP).
+"""
+
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import requests
+
+from api import ollama_client
+from config import EMBED_MODEL, EMBED_BATCH_SIZE, EMBED_MAX_WORKERS
+from core.embedding_cache import cache as default_cache
+
+CHECKPOINT_FILE = "embed_checkpoint.jsonl"
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class BatchEmbedder:
+    def __init__(
+        self,
+        model: str = EMBED_MODEL,
+        batch_size: int = EMBED_BATCH_SIZE,
+        max_workers: int = EMBED_MAX_WORKERS,
+        checkpoint_dir: Path | None = None,
+        cache=None,
+    ):
+        self.model = model
+        self.cache = cache or default_cache
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.checkpoint_path = (
+            Path(checkpoint_dir) / CHECKPOINT_FILE if checkpoint_dir else None
+        )
+        self._batch_endpoint = True
+
+    # -------------------------
+    # CHECKPOINT
+    # -------------------------
+    def _load_checkpoint(self) -> dict:
+        done = {}
+        if not self.checkpoint_path or not self.checkpoint_path.exists():
+            return done
+
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # baris terakhir terpotong saat crash
+                if row.get("model") == self.model:
+                    done[row["h"]] = row["v"]
+
+        return done
+
+    def _append_checkpoint(self, f, hashes: list, vectors: list):
+        if f is None:
+            return
+        for h, v in zip(hashes, vectors):
+            f.write(json.dumps({"model": self.model, "h": h, "v": v}) + "\n")
+        f.flush()
+
+    def clear_checkpoint(self):
+        if self.checkpoint_path:
+            self.checkpoint_path.unlink(missing_ok=True)
+
+    # -------------------------
+    # OLLAMA CALL
+    # -------------------------
+    def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        if self._batch_endpoint:
+            try:
+                return ollama_client.embed_batch(texts, model=self.model)
+            except requests.exceptions.HTTPError as e:
+                # Ollama lama: /api/embed belum ada → fallback per teks
+                if e.response is None or e.response.status_code != 404:
+                    raise
+                print("⚠️ /api/embed tidak tersedia, fallback ke /api/embeddings")
+                self._batch_endpoint = False
+
+        return [ollama_client.embeddings(t, model=self.model) for t in texts]
+
+    # -------------------------
+    # PUBLIC API
+    # -------------------------
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """
+        Embed semua teks (urutan output = urutan input).
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype="float32")
+
+        hashes = [text_hash(t) for t in texts]
+        done = self._load_checkpoint()
+
+        # teks unik yang belum ter-embed (duplikat cukup sekali)
+        todo = {}
+        for h, t in zip(hashes, texts):
+            if h not in done:
+                todo.setdefault(h, t)
+
+        if done:
+            print(f"♻️ Resume: {len(texts) - len(todo)} chunk dari checkpoint")
+
+        # sisanya dicek ke embedding cache (vektor sudah normalized)
+        pending = list(todo.items())
+        cached = self.cache.get_many(self.model, [t for _, t in pending])
+        for i, vec in cached.items():
+            h = pending[i][0]
+            done[h] = vec
+            del todo[h]
+
+        if cached:
+            print(f"⚡ Cache: {len(cached)} chunk tidak perlu di-embed ulang")
+
+        items = list(todo.items())
+        batches = [
+            items[i:i + self.batch_size]
+            for i in range(0, len(items), self.batch_size)
+        ]
+
+        total = len(items)
+        finished = 0
+        started = time.perf_counter()
+
+        checkpoint = None
+        if self.checkpoint_path and batches:
+            self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+            checkpoint = open(self.checkpoint_path, "a", encoding="utf-8")
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {
+                    pool.submit(self._embed_batch, [t for _, t in batch]): batch
+                    for batch in batches
+                }
+
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    vectors = future.result()
+                    batch_hashes = [h for h, _ in batch]
+
+                    for h, v in zip(batch_hashes, vectors):
+                        done[h] = v
+                    self._append_checkpoint(checkpoint, batch_hashes, vectors)
+                    self.cache.put_many(
+                        self.model, [t for _, t in batch], _normalize_rows(vectors)
+                    )
+
+                    finished += len(batch)
+                    elapsed = time.perf_counter() - started
+                    rate = finished / elapsed if elapsed else 0.0
+                    print(f"🧮 Embedded {finished}/{total} ({rate:.1f} chunk/s)")
+        finally:
+            if checkpoint:
+                checkpoint.close()
+
+        vectors = np.asarray([done[h] for h in hashes], dtype="float32")
+
+        # konsisten untuk kedua endpoint (/api/embeddings tidak normalisasi)
+        return _normalize_rows(vectors)
+
+
+def _normalize_rows(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype="float32")
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
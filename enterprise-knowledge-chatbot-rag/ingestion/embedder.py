@@ -1,44 +1,44 @@
-import os
-import json
 import faiss
-from pathlib import Path
-from sentence_transformers import SentenceTransformer
 
-from config import SOP_VECTOR_DIR
+from config import SOP_VECTOR_DIR, EMBED_MODEL, EMBED_BATCH_SIZE
+from core.vectorstore import save_vectorstore, load_vectorstore
+from ingestion.batch_embedder import BatchEmbedder
 
 
 class Embedder:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
-        self.model = SentenceTransformer(model_name)
+    """
+    Embedding + index SOP dengan kontrak yang sama seperti query
+    (EMBED_MODEL via Ollama, vektor normalized, IndexFlatIP = cosine).
+    """
+
+    def __init__(self, model_name: str = EMBED_MODEL, batch_size: int = EMBED_BATCH_SIZE):
+        self.model_name = model_name
+        self.embedder = BatchEmbedder(model=model_name, batch_size=batch_size)
         self.index = None
         self.metadata = []
 
+    def encode(self, texts):
+        return self.embedder.embed(texts)
+
     def embed_chunks(self, chunks):
         texts = [c["text"] for c in chunks]
-        embeddings = self.model.encode(texts, show_progress_bar=True)
+        embeddings = self.encode(texts)
 
         dimension = embeddings.shape[1]
-        self.index = faiss.IndexFlatL2(dimension)
+        self.index = faiss.IndexFlatIP(dimension)
         self.index.add(embeddings)
 
         self.metadata = chunks
 
     def save(self):
-        SOP_VECTOR_DIR.mkdir(parents=True, exist_ok=True)
-
-        index_path = SOP_VECTOR_DIR / "index.faiss"
-        meta_path = SOP_VECTOR_DIR / "metadata.json"
-
-        faiss.write_index(self.index, str(index_path))
-        with open(meta_path, "w", encoding="utf-8") as f:
-            json.dump(self.metadata, f, ensure_ascii=False, indent=2)
+        save_vectorstore(SOP_VECTOR_DIR, self.index, self.metadata, model=self.model_name)
 
         print(f"💾 Vectorstore SOP disimpan ke {SOP_VECTOR_DIR}")
 
     def load(self):
-        index_path = SOP_VECTOR_DIR / "index.faiss"
-        meta_path = SOP_VECTOR_DIR / "metadata.json"
+        store = load_vectorstore("sop", SOP_VECTOR_DIR)
+        if store is None:
+            raise FileNotFoundError(f"Vectorstore SOP belum ada di {SOP_VECTOR_DIR}")
 
-        self.index = faiss.read_index(str(index_path))
-        with open(meta_path, "r", encoding="utf-8") as f:
-            self.metadata = json.load(f)
\ No newline at end of file
+        self.index = store.index
+        self.metadata = list(store.metadata)
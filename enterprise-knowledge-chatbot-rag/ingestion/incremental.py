@@ -0,0 +1,345 @@
+# ingestion/incremental.py
+"""
+Incremental re-indexing untuk pipeline ingestion.
+
+- Chunk ID deterministik: sha1(source_file + section + text)
+  → chunk yang sama selalu punya ID yang sama antar run
+- Manifest per store (sources.json): hash file, mtime, size, chunk ids
+  → file yang tidak berubah tidak dibaca / di-chunk / di-embed ulang
+- Index disimpan sebagai faiss.IndexIDMap (id vektor = turunan chunk ID)
+  → chunk lama dihapus dengan remove_ids, chunk baru add_with_ids
+- Tipe index inti per domain (flat / hnsw / ivfpq, lihat core.ann);
+  HNSW tidak mendukung remove_ids → dibangun ulang dari vektor tersisa
+- Teks chunk dibersihkan dari boilerplate & chunk hampir identik dibuang
+  SEKALI di sini (core.text_cleaning), bukan per request
+- Vektor selalu di-normalize → IP = cosine (kontrak index, core.vectorstore);
+  store yang dibangun dengan model / metric lain di-rebuild penuh
+- Hasil ditulis ke folder "<store>.building" lalu di-swap atomik
+
+Alur pipeline:
+    plan = plan_sources(STORE_DIR, pdf_paths)
+    docs = load(plan.changed)            # hanya file baru / berubah
+    chunks = build_chunks(docs)
+    update_vectorstore(STORE_DIR, chunks, plan, embed_fn)
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Callable
+
+import faiss
+import numpy as np
+
+from config import EMBED_MODEL, CONTEXT_DEDUP_THRESHOLD
+from core import ann
+from core.text_cleaning import CLEAN_VERSION, clean_text, dedupe
+from core.vectorstore import (
+    INDEX_FILE,
+    IDS_FILE,
+    load_vectorstore,
+    read_manifest,
+    save_vectorstore,
+    swap_directory,
+)
+
+MANIFEST_FILE = "sources.json"
+
+
+# =========================
+# ID & HASH
+# =========================
+def make_chunk_id(source_file: str, text: str, section: str = "") -> str:
+    """
+    Chunk ID stabil berbasis konten (pengganti uuid4).
+    """
+    key = f"{source_file}\x00{section}\x00{text}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def vector_id(chunk_id: str) -> int:
+    """
+    Id int64 untuk IndexIDMap: 60 bit pertama chunk ID (selalu positif).
+    """
+    return int(chunk_id[:15], 16)
+
+
+def file_hash(path: Path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# =========================
+# MANIFEST
+# =========================
+def load_manifest(directory: Path) -> dict:
+    path = Path(directory) / MANIFEST_FILE
+    if not path.exists():
+        return {}
+
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("sources", {})
+
+
+def _write_manifest(directory: Path, sources: dict, index_type: str):
+    path = Path(directory) / MANIFEST_FILE
+    tmp = path.with_name(MANIFEST_FILE + ".tmp")
+
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(
+            {"index_type": index_type, "clean_version": CLEAN_VERSION, "sources": sources},
+            f, ensure_ascii=False, indent=2
+        )
+    os.replace(tmp, path)
+
+
+# =========================
+# PLAN
+# =========================
+class SourcePlan:
+    """
+    Hasil perbandingan file sumber dengan manifest.
+
+    changed      → Path file baru / berubah (harus di-load & di-chunk)
+    deleted      → nama file yang sudah tidak ada
+    unchanged    → nama file yang chunk-nya dipakai ulang apa adanya
+    full_rebuild → True jika store lama tidak bisa di-update incremental
+    """
+
+    def __init__(self, changed, deleted, unchanged, fingerprints, full_rebuild):
+        self.changed = changed
+        self.deleted = deleted
+        self.unchanged = unchanged
+        self.fingerprints = fingerprints
+        self.full_rebuild = full_rebuild
+
+    @property
+    def is_noop(self) -> bool:
+        return not self.full_rebuild and not self.changed and not self.deleted
+
+
+def _supports_incremental(directory: Path, index_type: str, model: str) -> bool:
+    # store lama (IndexFlat tanpa ID map / tanpa manifest) → rebuild sekali
+    if not all(
+        (directory / name).exists()
+        for name in (INDEX_FILE, IDS_FILE, MANIFEST_FILE)
+    ):
+        return False
+
+    # tipe index di config berubah → rebuild (IVF-PQ perlu training ulang)
+    with open(directory / MANIFEST_FILE, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    built_as = manifest.get("index_type", "flat")
+    if built_as != index_type:
+        print(f"🔁 Index type {built_as} → {index_type}, full rebuild")
+        return False
+
+    # aturan pembersihan teks berubah → chunk lama harus dibersihkan ulang
+    if manifest.get("clean_version") != CLEAN_VERSION:
+        print(f"🔁 Clean version {manifest.get('clean_version')} → {CLEAN_VERSION}, full rebuild")
+        return False
+
+    # vektor lama dari model lain / bukan cosine → tidak bisa dicampur
+    contract = read_manifest(directory) or {}
+    if contract.get("model") != model or contract.get("metric") != "cosine":
+        print(
+            f"🔁 Index {contract.get('model')}/{contract.get('metric')} "
+            f"→ {model}/cosine, full rebuild"
+        )
+        return False
+
+    return True
+
+
+def plan_sources(
+    directory: Path,
+    paths: list,
+    incremental: bool = True,
+    index_type: str = "flat",
+    model: str = EMBED_MODEL,
+) -> SourcePlan:
+    """
+    Tentukan file mana yang perlu diproses ulang.
+    mtime + size dicek dulu; hash file hanya dihitung jika salah satunya berubah.
+    """
+    directory = Path(directory)
+    paths = [Path(p) for p in paths]
+
+    full_rebuild = not incremental or not _supports_incremental(directory, index_type, model)
+    manifest = {} if full_rebuild else load_manifest(directory)
+
+    changed, unchanged, fingerprints = [], [], {}
+
+    for path in paths:
+        stat = path.stat()
+        old = manifest.get(path.name)
+
+        if old and old["mtime"] == stat.st_mtime and old["size"] == stat.st_size:
+            fingerprints[path.name] = old
+            unchanged.append(path.name)
+            continue
+
+        digest = file_hash(path)
+        fingerprint = {"hash": digest, "mtime": stat.st_mtime, "size": stat.st_size}
+
+        if old and old["hash"] == digest:
+            # hanya di-touch / disalin ulang → chunk tetap
+            fingerprints[path.name] = {**fingerprint, "chunk_ids": old.get("chunk_ids", [])}
+            unchanged.append(path.name)
+        else:
+            fingerprints[path.name] = fingerprint
+            changed.append(path)
+
+    names = {p.name for p in paths}
+    deleted = [name for name in manifest if name not in names]
+
+    print(
+        f"🔎 Sources: {len(changed)} changed, {len(deleted)} deleted, "
+        f"{len(unchanged)} unchanged" + (" (full rebuild)" if full_rebuild else "")
+    )
+    return SourcePlan(changed, deleted, unchanged, fingerprints, full_rebuild)
+
+
+# =========================
+# UPDATE
+# =========================
+def update_vectorstore(
+    directory: Path,
+    chunks: list,
+    plan: SourcePlan,
+    embed_fn: Callable[[list[str]], np.ndarray],
+    source_key: str = "source_file",
+    index_type: str = "flat",
+    model: str = EMBED_MODEL,
+    strip_boilerplate: bool = False,
+) -> bool:
+    """
+    Terapkan chunk dari file yang berubah ke store.
+
+    chunks     → chunk HANYA dari plan.changed (atau semua file saat full rebuild)
+    embed_fn   → list teks → np.ndarray float32 [n, dim]
+    index_type → flat / hnsw / ivfpq (dipakai saat index dibuat baru)
+    model      → model embedding embed_fn (dicatat di manifest.json)
+    strip_boilerplate → buang kalimat footer / navigasi web
+                        (sumber web-scraped, lihat core.text_cleaning)
+
+    Return True jika store ditulis ulang.
+    """
+    directory = Path(directory)
+
+    if plan.is_noop:
+        print("✅ Index up to date, nothing to embed")
+        return False
+
+    # boilerplate dibuang sekali di sini → teks bersih yang di-embed & disimpan
+    for c in chunks:
+        c["text"] = clean_text(c["text"], strip_boilerplate)
+    cleaned = [c for c in chunks if c["text"]]
+
+    # chunk hampir identik dalam SATU file (overlap chunker, halaman
+    # berulang) cukup sekali. Lintas file tidak: incremental run hanya
+    # melihat file yang berubah, jadi hasilnya akan bergantung pada riwayat
+    # ingestion (hapus a.pdf → paragraf yang juga ada di b.pdf ikut hilang).
+    # Duplikat antar dokumen dibuang per query oleh ContextBuilder.
+    by_source: dict[str, list] = {}
+    for c in cleaned:
+        by_source.setdefault(c[source_key], []).append(c)
+
+    keep = set()
+    for items in by_source.values():
+        keep.update(id(items[i]) for i in dedupe([c["text"] for c in items], CONTEXT_DEDUP_THRESHOLD))
+    unique = [c for c in cleaned if id(c) in keep]
+    if len(unique) < len(chunks):
+        print(f"🧹 Chunks cleaned: {len(chunks)} → {len(unique)} (boilerplate / near-duplicate)")
+
+    # chunk baru: ID deterministik, duplikat dalam satu file cukup sekali
+    incoming = {}
+    for c in unique:
+        cid = make_chunk_id(c[source_key], c["text"], c.get("section", ""))
+        c["chunk_id"] = cid
+        incoming.setdefault(cid, c)
+
+    touched = {p.name for p in plan.changed} | set(plan.deleted)
+
+    records, ids, removed = [], [], []
+    index = None
+
+    if not plan.full_rebuild:
+        store = load_vectorstore(directory.name, directory)
+        # baca penuh (bukan mmap) karena index akan dimodifikasi
+        index = faiss.read_index(str(directory / INDEX_FILE))
+
+        for record, vid in zip(store.metadata, store.ids):
+            cid = record.get("chunk_id")
+            if record.get(source_key) not in touched:
+                records.append(record)
+                ids.append(int(vid))
+            elif cid in incoming:
+                # isi chunk sama → vektor dipakai ulang, metadata disegarkan
+                records.append(incoming[cid])
+                ids.append(int(vid))
+            else:
+                removed.append(int(vid))
+
+        if removed:
+            removed_ids = np.asarray(removed, dtype="int64")
+            try:
+                index.remove_ids(removed_ids)
+            except RuntimeError:
+                # HNSW: remove_ids tidak didukung
+                index = ann.rebuild_without(index, removed_ids)
+
+    existing = {r.get("chunk_id") for r in records}
+    to_add = [c for cid, c in incoming.items() if cid not in existing]
+
+    if to_add:
+        vectors = np.array(embed_fn([c["text"] for c in to_add]), dtype="float32")
+        faiss.normalize_L2(vectors)  # no-op untuk BatchEmbedder, wajib untuk embed_fn lain
+        new_ids = [vector_id(c["chunk_id"]) for c in to_add]
+
+        if index is None:
+            # IVF-PQ di-train dengan vektor build pertama (sampel)
+            index = faiss.IndexIDMap(ann.create_index(index_type, vectors))
+        index.add_with_ids(vectors, np.asarray(new_ids, dtype="int64"))
+
+        records.extend(to_add)
+        ids.extend(new_ids)
+
+    if index is None:
+        raise RuntimeError(f"❌ No chunks to index in {directory}")
+
+    # manifest: chunk ids per file sumber
+    chunk_ids_by_source = {}
+    for record in records:
+        chunk_ids_by_source.setdefault(record.get(source_key), []).append(record.get("chunk_id"))
+
+    sources = {
+        name: {
+            "hash": fp["hash"],
+            "mtime": fp["mtime"],
+            "size": fp["size"],
+            "chunk_ids": chunk_ids_by_source.get(name, []),
+        }
+        for name, fp in plan.fingerprints.items()
+    }
+
+    # build di folder terpisah → swap atomik
+    building = directory.with_name(directory.name + ".building")
+    shutil.rmtree(building, ignore_errors=True)
+    building.mkdir(parents=True)
+
+    save_vectorstore(building, index, records, ids, model=model)
+    _write_manifest(building, sources, index_type)
+    swap_directory(building, directory)
+
+    print(
+        f"✅ Index updated: +{len(to_add)} embedded, -{len(removed)} removed, "
+        f"{len(records) - len(to_add)} reused ({len(records)} total)"
+    )
+    return True
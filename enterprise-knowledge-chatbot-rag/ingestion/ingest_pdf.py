@@ -1,9 +1,11 @@
 # ingestion/ingest_pdf.py
-import os
+import sys
 from pypdf import PdfReader
 from ingestion.chunker import chunk_text
 from ingestion.embedder import Embedder
-from config import DATA_RAW_PDF_DIR
+from ingestion.incremental import plan_sources, update_vectorstore
+from core.ann import index_type_for
+from config import DATA_RAW_PDF_DIR, SOP_VECTOR_DIR
 
 def load_pdf(path: str) -> str:
     reader = PdfReader(path)
@@ -16,32 +18,48 @@ def load_pdf(path: str) -> str:
     return "\n".join(texts)
 
 
-def ingest_all_pdfs():
+def ingest_all_pdfs(incremental: bool = True):
     all_chunks = []
 
-    for file in os.listdir(DATA_RAW_PDF_DIR):
-        if file.lower().endswith(".pdf"):
-            path = os.path.join(DATA_RAW_PDF_DIR, file)
-            print(f"📄 Processing {file}")
+    pdf_paths = sorted(
+        p for p in DATA_RAW_PDF_DIR.iterdir()
+        if p.is_file() and p.suffix.lower() == ".pdf"
+    )
 
-            text = load_pdf(path)
+    # hanya PDF baru / berubah (hash) yang di-chunk & di-embed ulang
+    plan = plan_sources(SOP_VECTOR_DIR, pdf_paths, incremental, index_type_for("sop"))
+    if plan.is_noop:
+        print("✅ PDF index up to date")
+        return
 
-            chunks = chunk_text(
-                text=text,
-                source=file,
-                doc_type="pdf"
-            )
+    for path in plan.changed:
+        print(f"📄 Processing {path.name}")
 
-            all_chunks.extend(chunks)
+        text = load_pdf(str(path))
+
+        chunks = chunk_text(
+            text=text,
+            source=path.name,
+            doc_type="pdf"
+        )
+
+        all_chunks.extend(chunks)
 
     print(f"✂️ Total chunks: {len(all_chunks)}")
 
     embedder = Embedder()
-    embedder.embed_chunks(all_chunks)
-    embedder.save()
+    update_vectorstore(
+        SOP_VECTOR_DIR,
+        all_chunks,
+        plan,
+        embedder.encode,
+        source_key="source",
+        index_type=index_type_for("sop"),
+        model=embedder.model_name,
+    )
 
     print("✅ PDF embedding selesai")
 
 
 if __name__ == "__main__":
-    ingest_all_pdfs()
\ No newline at end of file
+    ingest_all_pdfs(incremental="--full" not in sys.argv)
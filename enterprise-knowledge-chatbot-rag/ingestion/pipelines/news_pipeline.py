@@ -1,20 +1,21 @@
 from typing import List, Dict
 from pathlib import Path
 from pypdf import PdfReader
-import json
-import uuid
+import sys
 
-from config import DATA_RAW_PDF_DIR, VECTORSTORE_DIR
+from config import DATA_RAW_PDF_DIR, NEWS_VECTOR_DIR
+from ingestion.batch_embedder import BatchEmbedder
+from core.ann import index_type_for
+from ingestion.incremental import make_chunk_id, plan_sources, update_vectorstore
 
 NEWS_SOURCE_DIR = DATA_RAW_PDF_DIR / "news"
-NEWS_VECTOR_DIR = VECTORSTORE_DIR / "news"
 NEWS_VECTOR_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def load_news_documents() -> List[Dict]:
+def load_news_documents(paths: List[Path] | None = None) -> List[Dict]:
     docs = []
 
-    for pdf in NEWS_SOURCE_DIR.glob("*.pdf"):
+    for pdf in (list(NEWS_SOURCE_DIR.glob("*.pdf")) if paths is None else paths):
         reader = PdfReader(pdf)
         pages = []
 
@@ -41,9 +42,10 @@ def chunk_news(docs: List[Dict], chunk_size=600) -> List[Dict]:
     for doc in docs:
         words = doc["text"].split()
         for i in range(0, len(words), chunk_size):
+            text = " ".join(words[i:i+chunk_size])
             chunks.append({
-                "chunk_id": str(uuid.uuid4()),
-                "text": " ".join(words[i:i+chunk_size]),
+                "chunk_id": make_chunk_id(doc["source_file"], text),
+                "text": text,
                 "source_file": doc["source_file"]
             })
 
@@ -66,14 +68,26 @@ def attach_metadata(chunks: List[Dict]) -> List[Dict]:
     return enriched
 
 
-def run():
-    docs = load_news_documents()
+def run(incremental: bool = True):
+    plan = plan_sources(
+        NEWS_VECTOR_DIR, list(NEWS_SOURCE_DIR.glob("*.pdf")),
+        incremental, index_type_for("news")
+    )
+    if plan.is_noop:
+        print("✅ News index up to date")
+        return
+
+    docs = load_news_documents(plan.changed)
     chunks = chunk_news(docs)
     enriched = attach_metadata(chunks)
 
-    with open(NEWS_VECTOR_DIR / "metadata.json", "w") as f:
-        json.dump(enriched, f, indent=2)
+    embedder = BatchEmbedder(checkpoint_dir=NEWS_VECTOR_DIR)
+    update_vectorstore(
+        NEWS_VECTOR_DIR, enriched, plan, embedder.embed,
+        index_type=index_type_for("news")
+    )
+    embedder.clear_checkpoint()
 
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    run(incremental="--full" not in sys.argv)
\ No newline at end of file
@@ -1,13 +1,11 @@
 from pypdf import PdfReader
-import json
-import numpy as np
-import faiss
-import requests
-from pathlib import Path
+import sys
 
-from config import DATA_RAW_PDF_DIR
+from config import DATA_RAW_PDF_DIR, PRODUCT_VECTOR_DIR
 import knowledge.products.loader as product_loader
-from core.embeddings import embed, normalize
+from ingestion.batch_embedder import BatchEmbedder
+from core.ann import index_type_for
+from ingestion.incremental import plan_sources, update_vectorstore
 
 
 # ==================================================
@@ -15,34 +13,16 @@ from core.embeddings import embed, normalize
 # ==================================================
 
 PRODUCT_SOURCE_DIR = DATA_RAW_PDF_DIR / "product"
-PRODUCT_VECTOR_DIR = Path("data/vectorstore/product")
 PRODUCT_VECTOR_DIR.mkdir(parents=True, exist_ok=True)
 
-# ==================================================
-# EMBEDDING CONFIG
-# ==================================================
-
-OLLAMA_EMBED_URL = "http://localhost:11434/api/embeddings"
-EMBED_MODEL = "nomic-embed-text"
-
-
-def embed_text(text: str) -> list:
-    r = requests.post(
-        OLLAMA_EMBED_URL,
-        json={"model": EMBED_MODEL, "prompt": text},
-        timeout=60
-    )
-    r.raise_for_status()
-    return r.json()["embedding"]
-
 # ==================================================
 # LOAD PRODUCT PDF
 # ==================================================
 
-def load_product_documents():
+def load_product_documents(paths=None):
     docs = []
 
-    for pdf_path in PRODUCT_SOURCE_DIR.glob("*.pdf"):
+    for pdf_path in (list(PRODUCT_SOURCE_DIR.glob("*.pdf")) if paths is None else paths):
         reader = PdfReader(pdf_path)
         pages = []
 
@@ -74,13 +54,21 @@ def load_product_documents():
 # PIPELINE RUNNER
 # ==================================================
 
-def run():
+def run(incremental: bool = True):
     all_chunks = []
 
-    docs = load_product_documents()
-    if not docs:
+    pdf_paths = list(PRODUCT_SOURCE_DIR.glob("*.pdf"))
+    if not pdf_paths:
         raise RuntimeError("❌ No product documents found")
 
+    plan = plan_sources(PRODUCT_VECTOR_DIR, pdf_paths, incremental, index_type_for("product"))
+    if plan.is_noop:
+        print("✅ Product index up to date")
+        return
+
+    # hanya PDF baru / berubah yang dibaca & di-chunk ulang
+    docs = load_product_documents(plan.changed)
+
     for d in docs:
         chunks = product_loader.build_product_chunks(
             full_text=d["text"],
@@ -97,32 +85,19 @@ def run():
     # EMBEDDING + COSINE FAISS
     # =========================
 
-    vectors = []
-
-    for c in all_chunks:
-        vec = embed(c["text"])      # single source of truth
-        vec = normalize(vec)        # REQUIRED for cosine similarity
-        vectors.append(vec)
-
-    vectors_np = np.array(vectors, dtype="float32")
-
-    dim = vectors_np.shape[1]
-
-    # 🔴 PENTING: ganti L2 → IP
-    index = faiss.IndexFlatIP(dim)  # IP = Inner Product = Cosine
-
-    index.add(vectors_np)
-
-
-
-
-    faiss.write_index(index, str(PRODUCT_VECTOR_DIR / "index.faiss"))
-
-    with open(PRODUCT_VECTOR_DIR / "metadata.json", "w", encoding="utf-8") as f:
-        json.dump(all_chunks, f, ensure_ascii=False, indent=2)
-
-    print(f"✅ Product index built ({len(all_chunks)} chunks, dim={dim})")
+    # batch + paralel, hasil sudah normalized (REQUIRED for cosine similarity)
+    # IndexIDMap(IndexFlatIP): IP = Inner Product = Cosine,
+    # hanya chunk baru yang di-embed, chunk lama dihapus by id
+    embedder = BatchEmbedder(checkpoint_dir=PRODUCT_VECTOR_DIR)
+    # halaman produk hasil scraping web → footer / navigasi dibuang
+    update_vectorstore(
+        PRODUCT_VECTOR_DIR, all_chunks, plan, embedder.embed,
+        index_type=index_type_for("product"),
+        strip_boilerplate=True
+    )
+    embedder.clear_checkpoint()
 
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    # --full → rebuild total (abaikan manifest)
+    run(incremental="--full" not in sys.argv)
\ No newline at end of file
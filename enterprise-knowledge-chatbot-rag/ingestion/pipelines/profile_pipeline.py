@@ -1,50 +1,36 @@
 # ingestion/pipelines/profile_pipeline.py
 
 from pypdf import PdfReader
-import json
-import numpy as np
-import faiss
-import requests
-from pathlib import Path
+import sys
 
-from config import DATA_RAW_PDF_DIR
+from config import DATA_RAW_PDF_DIR, PROFILE_VECTOR_DIR
 import knowledge.profile.loader as profile_loader
+from ingestion.batch_embedder import BatchEmbedder
+from core.ann import index_type_for
+from ingestion.incremental import plan_sources, update_vectorstore
 
 # ==================================================
 # PATH CONFIG
 # ==================================================
 
 PROFILE_SOURCE_DIR = DATA_RAW_PDF_DIR / "company sop profile"
-PROFILE_VECTOR_DIR = Path("data/vectorstore/profile")
 PROFILE_VECTOR_DIR.mkdir(parents=True, exist_ok=True)
 
-# ==================================================
-# EMBEDDING CONFIG
-# ==================================================
-
-OLLAMA_EMBED_URL = "http://localhost:11434/api/embeddings"
-EMBED_MODEL = "nomic-embed-text"
-
-
-def embed_text(text: str) -> list:
-    r = requests.post(
-        OLLAMA_EMBED_URL,
-        json={"model": EMBED_MODEL, "prompt": text},
-        timeout=60
-    )
-    r.raise_for_status()
-    return r.json()["embedding"]
-
 # ==================================================
 # STEP 1 — LOAD PROFILE PDF (ROBUST)
 # ==================================================
 
-def load_profile_documents():
+def list_profile_pdfs():
+    return [
+        pdf_path
+        for pdf_path in PROFILE_SOURCE_DIR.glob("*.pdf")
+        if "profile" in pdf_path.name.lower()
+    ]
+
+def load_profile_documents(paths=None):
     docs = []
 
-    for pdf_path in PROFILE_SOURCE_DIR.glob("*.pdf"):
-        if "profile" not in pdf_path.name.lower():
-            continue
+    for pdf_path in (list_profile_pdfs() if paths is None else paths):
         reader = PdfReader(pdf_path)   # ✅ PASTI TER-DEFINE
         pages = []
 
@@ -73,11 +59,16 @@ def load_profile_documents():
 # PIPELINE RUNNER
 # ==================================================
 
-def run():
+def run(incremental: bool = True):
     all_chunks = []
 
-    docs = load_profile_documents()
-    if not docs:
+    plan = plan_sources(PROFILE_VECTOR_DIR, list_profile_pdfs(), incremental, index_type_for("profile"))
+    if plan.is_noop:
+        print("✅ Profile index up to date")
+        return
+
+    docs = load_profile_documents(plan.changed)
+    if not docs and not plan.deleted:
         raise RuntimeError("❌ No valid profile documents found.")
 
     for d in docs:
@@ -89,30 +80,25 @@ def run():
 
     print(f"DEBUG: total profile chunks = {len(all_chunks)}")
 
-    if not all_chunks:
+    if not all_chunks and not plan.deleted:
         raise RuntimeError(
             "❌ No profile chunks generated. "
             "PDF likely has no usable text layer."
         )
 
     # =========================
-    # EMBEDDING + FAISS
+    # EMBEDDING + COSINE FAISS
     # =========================
 
-    vectors = [embed_text(c["text"]) for c in all_chunks]
-    vectors_np = np.array(vectors, dtype="float32")
-
-    dim = vectors_np.shape[1]
-    index = faiss.IndexFlatL2(dim)
-    index.add(vectors_np)
-
-    faiss.write_index(index, str(PROFILE_VECTOR_DIR / "index.faiss"))
-
-    with open(PROFILE_VECTOR_DIR / "metadata.json", "w", encoding="utf-8") as f:
-        json.dump(all_chunks, f, ensure_ascii=False, indent=2)
-
-    print(f"✅ Profile index built ({len(all_chunks)} chunks, dim={dim})")
+    # batch + paralel, hasil normalized → IP = cosine
+    # hanya chunk baru / berubah yang di-embed (IndexIDMap)
+    embedder = BatchEmbedder(checkpoint_dir=PROFILE_VECTOR_DIR)
+    update_vectorstore(
+        PROFILE_VECTOR_DIR, all_chunks, plan, embedder.embed,
+        index_type=index_type_for("profile")
+    )
+    embedder.clear_checkpoint()
 
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    run(incremental="--full" not in sys.argv)
\ No newline at end of file
@@ -1,13 +1,13 @@
 from typing import List, Dict
+from pathlib import Path
 from pypdf import PdfReader
-import json
-import uuid
-import requests
-import numpy as np
-import faiss
+import sys
 import re
 
 from config import DATA_RAW_PDF_DIR, SOP_VECTOR_DIR
+from ingestion.batch_embedder import BatchEmbedder
+from core.ann import index_type_for
+from ingestion.incremental import make_chunk_id, plan_sources, update_vectorstore
 
 # ==================================================
 # DOMAIN CONFIG — SOP ONLY
@@ -16,33 +16,21 @@ from config import DATA_RAW_PDF_DIR, SOP_VECTOR_DIR
 SOP_SOURCE_DIR = DATA_RAW_PDF_DIR / "company sop profile"
 SOP_VECTOR_DIR.mkdir(parents=True, exist_ok=True)
 
-OLLAMA_EMBED_URL = "http://localhost:11434/api/embeddings"
-EMBED_MODEL = "nomic-embed-text"
-
-# ==================================================
-# EMBEDDING
-# ==================================================
-
-def embed_text(text: str) -> list:
-    r = requests.post(
-        OLLAMA_EMBED_URL,
-        json={"model": EMBED_MODEL, "prompt": text},
-        timeout=60
-    )
-    r.raise_for_status()
-    return r.json()["embedding"]
-
 # ==================================================
 # STEP 1 — LOAD PDF
 # ==================================================
 
-def load_sop_documents() -> List[Dict]:
+def list_sop_pdfs() -> List[Path]:
+    return [
+        pdf_path
+        for pdf_path in SOP_SOURCE_DIR.glob("*.pdf")
+        if pdf_path.name.lower() == "sop_cs_cni.pdf"
+    ]
+
+def load_sop_documents(paths: List[Path] | None = None) -> List[Dict]:
     docs = []
 
-    #for pdf_path in SOP_SOURCE_DIR.glob("*.pdf"):
-    for pdf_path in SOP_SOURCE_DIR.glob("*.pdf"):
-        if pdf_path.name.lower() != "sop_cs_cni.pdf":
-            continue
+    for pdf_path in (list_sop_pdfs() if paths is None else paths):
         reader = PdfReader(pdf_path)
         pages = [
             page.extract_text().strip()
@@ -113,7 +101,7 @@ def build_sop_chunks(documents: List[Dict], max_words: int = 400) -> List[Dict]:
                     continue
 
                 chunks.append({
-                    "chunk_id": str(uuid.uuid4()),
+                    "chunk_id": make_chunk_id(doc["source_file"], chunk_text, section),
                     "source_file": doc["source_file"],
                     "section": section,
                     "text": chunk_text
@@ -163,29 +151,32 @@ def enrich_chunks(chunks: List[Dict]) -> List[Dict]:
 # STEP 5 — EMBED + STORE
 # ==================================================
 
-def embed_and_store(chunks: List[Dict]):
-    vectors = [embed_text(c["text"]) for c in chunks]
-    vectors_np = np.array(vectors).astype("float32")
-
-    index = faiss.IndexFlatL2(vectors_np.shape[1])
-    index.add(vectors_np)
-
-    faiss.write_index(index, str(SOP_VECTOR_DIR / "index.faiss"))
+def embed_and_store(chunks: List[Dict], plan):
+    # batch + paralel, hasil normalized → IP = cosine
+    # hanya chunk baru / berubah yang di-embed (IndexIDMap)
+    embedder = BatchEmbedder(checkpoint_dir=SOP_VECTOR_DIR)
 
-    with open(SOP_VECTOR_DIR / "metadata.json", "w", encoding="utf-8") as f:
-        json.dump(chunks, f, ensure_ascii=False, indent=2)
-
-    print(f"✅ FAISS index stored ({len(chunks)} chunks)")
+    update_vectorstore(
+        SOP_VECTOR_DIR, chunks, plan, embedder.embed,
+        index_type=index_type_for("sop")
+    )
+    embedder.clear_checkpoint()
 
 # ==================================================
 # PIPELINE RUNNER
 # ==================================================
 
-def run():
-    docs = load_sop_documents()
+def run(incremental: bool = True):
+    plan = plan_sources(SOP_VECTOR_DIR, list_sop_pdfs(), incremental, index_type_for("sop"))
+    if plan.is_noop:
+        print("✅ SOP index up to date")
+        return
+
+    docs = load_sop_documents(plan.changed)
     chunks = build_sop_chunks(docs)
     enriched = enrich_chunks(chunks)
-    embed_and_store(enriched)
+    embed_and_store(enriched, plan)
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    # python -m ingestion.pipelines.sop_pipeline --full → rebuild total
+    run(incremental="--full" not in sys.argv)
\ No newline at end of file
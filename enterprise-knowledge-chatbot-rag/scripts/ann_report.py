@@ -0,0 +1,165 @@
+# scripts/ann_report.py
+"""
+Recall vs latency report: index ANN (HNSW / IVF-PQ) dibandingkan baseline flat.
+
+- Vektor diambil dari vector store domain (atau dibangkitkan sintetis)
+- Sebagian vektor di-hold-out sebagai query; index dibangun dari sisanya
+- Ground truth = hasil IndexFlat (exact) pada data yang sama
+- Setiap efSearch / nprobe di-sweep → recall@k, latency p50/p95, ukuran index
+
+Contoh:
+    python -m scripts.ann_report --domain news
+    python -m scripts.ann_report --synthetic 100000 --dim 768 --json report.json
+"""
+
+import argparse
+import json
+import time
+
+import faiss
+import numpy as np
+
+from config import VECTOR_DIRS
+from core import ann
+from core.vectorstore import load_vectorstore
+
+EF_SEARCH_SWEEP = [16, 32, 64, 128, 256]
+NPROBE_SWEEP = [1, 4, 8, 16, 32, 64]
+
+
+# =========================
+# DATA
+# =========================
+def load_domain_vectors(domain: str) -> np.ndarray:
+    store = load_vectorstore(domain, VECTOR_DIRS[domain])
+    if store is None or len(store) == 0:
+        raise FileNotFoundError(f"Vectorstore {domain} belum ada / kosong")
+
+    if ann.index_kind(store.index) == "ivfpq":
+        print("⚠️ Index IVF-PQ: vektor hasil reconstruct bersifat lossy")
+
+    vectors, _ = ann.reconstruct_all(store.index)
+    return vectors
+
+
+def synthetic_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    # cluster gaussian → lebih mirip embedding asli daripada uniform
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, n // 500), dim))
+    vectors = centers[rng.integers(len(centers), size=n)] + 0.3 * rng.normal(size=(n, dim))
+    return vectors.astype("float32")
+
+
+def split_queries(vectors: np.ndarray, n_queries: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(vectors))
+    n_queries = min(n_queries, len(vectors) // 10 or 1)
+    return vectors[order[n_queries:]], vectors[order[:n_queries]]
+
+
+# =========================
+# MEASURE
+# =========================
+def _search_timed(index, queries: np.ndarray, k: int):
+    latencies = []
+    labels = np.empty((len(queries), k), dtype="int64")
+
+    # satu query per panggilan = pola request chat
+    for i, q in enumerate(queries):
+        started = time.perf_counter()
+        _, ids = index.search(q.reshape(1, -1), k)
+        latencies.append(time.perf_counter() - started)
+        labels[i] = ids[0]
+
+    latencies = np.asarray(latencies) * 1000
+    return labels, float(np.percentile(latencies, 50)), float(np.percentile(latencies, 95))
+
+
+def _recall(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def _size_mb(index) -> float:
+    return len(faiss.serialize_index(index)) / 1e6
+
+
+def run_report(vectors: np.ndarray, n_queries: int, k: int) -> list[dict]:
+    # semua vector store memakai vektor normalized + inner product
+    faiss.normalize_L2(vectors)
+    base, queries = split_queries(vectors, n_queries)
+    print(f"📐 base={len(base)} queries={len(queries)} dim={base.shape[1]} k={k}")
+
+    rows = []
+
+    flat = ann.create_index("flat", base)
+    flat.add(base)
+    truth, p50, p95 = _search_timed(flat, queries, k)
+    rows.append({
+        "index": "flat", "param": "-", "recall": 1.0,
+        "p50_ms": p50, "p95_ms": p95, "size_mb": _size_mb(flat), "build_s": 0.0,
+    })
+
+    for kind, sweep, param in [
+        ("hnsw", EF_SEARCH_SWEEP, "efSearch"),
+        ("ivfpq", NPROBE_SWEEP, "nprobe"),
+    ]:
+        started = time.perf_counter()
+        index = ann.create_index(kind, base)
+        if ann.index_kind(index) != kind:
+            print(f"⏭️ {kind} dilewati (korpus terlalu kecil untuk {kind})")
+            continue
+        index.add(base)
+        build_s = time.perf_counter() - started
+
+        for value in sweep:
+            ann.set_search_params(index, **{param: value})
+            found, p50, p95 = _search_timed(index, queries, k)
+            rows.append({
+                "index": kind, "param": f"{param}={value}",
+                "recall": _recall(found, truth),
+                "p50_ms": p50, "p95_ms": p95,
+                "size_mb": _size_mb(index), "build_s": build_s,
+            })
+
+    return rows
+
+
+def print_table(rows: list[dict]):
+    print(f"\n{'index':<7} {'param':<14} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8} {'size MB':>8} {'build s':>8}")
+    print("-" * 66)
+    for r in rows:
+        print(
+            f"{r['index']:<7} {r['param']:<14} {r['recall']:>7.3f} "
+            f"{r['p50_ms']:>8.3f} {r['p95_ms']:>8.3f} {r['size_mb']:>8.1f} {r['build_s']:>8.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ANN recall vs latency report")
+    parser.add_argument("--domain", choices=sorted(VECTOR_DIRS), help="pakai vektor vector store")
+    parser.add_argument("--synthetic", type=int, help="jumlah vektor sintetis")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=500, help="jumlah query hold-out")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--json", help="simpan hasil ke file JSON")
+    args = parser.parse_args()
+
+    if args.domain:
+        vectors = load_domain_vectors(args.domain)
+    elif args.synthetic:
+        vectors = synthetic_vectors(args.synthetic, args.dim)
+    else:
+        parser.error("pilih --domain atau --synthetic")
+
+    rows = run_report(np.ascontiguousarray(vectors, dtype="float32"), args.queries, args.k)
+    print_table(rows)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\n💾 Report disimpan ke {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+# scripts/bench_rag.py
+"""
+Benchmark RAG offline: latency & kualitas retrieval terhadap golden set.
+
+- Ollama diganti scripts.fake_ollama (embedding deterministik, jawaban
+  kalengan, latency bisa diatur) → jalan di CI tanpa GPU / model
+- Korpus & pertanyaan berlabel dari scripts/bench_golden.json
+  (SOP / profile / product / general); vector store & products.json
+  dibangun di folder sementara, data/ asli tidak disentuh
+- Target: route_query, search_products, retriever per domain, fan-out,
+  handle_chat_engine → throughput, latency p50/p95/p99, error
+- Kualitas: akurasi router, recall@k & MRR (retriever, search_products)
+- Output JSON (urutan key stabil) → bisa di-diff antar commit;
+  --compare menampilkan selisih terhadap hasil sebelumnya
+
+Contoh:
+    python -m scripts.bench_rag --json bench.json
+    python -m scripts.bench_rag --repeat 5 --generate-ms 500 --token-ms 30 \\
+        --json bench_new.json --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from scripts.fake_ollama import start_in_thread
+
+GOLDEN_FILE = Path(__file__).with_name("bench_golden.json")
+TOP_K = 5
+PRODUCT_LIMIT = 3
+
+
+# =========================
+# MEASUREMENT
+# =========================
+def latency_summary(samples: list[float]) -> dict:
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0}
+
+    ms = np.asarray(samples) * 1000
+    return {
+        "p50": round(float(np.percentile(ms, 50)), 3),
+        "p95": round(float(np.percentile(ms, 95)), 3),
+        "p99": round(float(np.percentile(ms, 99)), 3),
+        "mean": round(float(ms.mean()), 3),
+    }
+
+
+def run_target(fn, items: list, repeat: int, concurrency: int, before_pass=None):
+    """
+    Panggil fn(item) untuk semua item, repeat kali.
+    Return (stats, outputs pass terakhir).
+    """
+    samples, errors, first_error = [], 0, None
+    outputs = [None] * len(items)
+
+    def call(i):
+        started = time.perf_counter()
+        try:
+            result = fn(items[i])
+        except Exception as e:
+            return time.perf_counter() - started, None, e
+        return time.perf_counter() - started, result, None
+
+    wall = 0.0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(repeat):
+            if before_pass:
+                before_pass()
+
+            started = time.perf_counter()
+            for i, (elapsed, result, error) in enumerate(pool.map(call, range(len(items)))):
+                samples.append(elapsed)
+                outputs[i] = result
+                if error is not None:
+                    errors += 1
+                    first_error = first_error or f"{type(error).__name__}: {error}"
+            wall += time.perf_counter() - started
+
+    stats = {
+        "calls": len(samples),
+        "errors": errors,
+        "throughput_qps": round(len(samples) / wall, 2) if wall else 0.0,
+        "latency_ms": latency_summary(samples),
+    }
+    if first_error:
+        stats["first_error"] = first_error
+    return stats, outputs
+
+
+def ranking_quality(ranked: list, expected: list, k: int) -> dict:
+    """
+    ranked[i]: id hasil (urut), expected[i]: id yang benar.
+    """
+    recalls, reciprocal = [], []
+
+    for got, want in zip(ranked, expected):
+        got = list(got or [])[:k]
+        want = set(want)
+        recalls.append(len(want & set(got)) / len(want))
+        rank = next((r for r, doc_id in enumerate(got, 1) if doc_id in want), None)
+        reciprocal.append(1 / rank if rank else 0.0)
+
+    return {
+        f"recall@{k}": round(float(np.mean(recalls)), 4) if recalls else 0.0,
+        "mrr": round(float(np.mean(reciprocal)), 4) if reciprocal else 0.0,
+        "queries": len(recalls),
+    }
+
+
+# =========================
+# SANDBOX
+# =========================
+def write_sandbox_data(workdir: Path, golden: dict) -> tuple[dict, Path]:
+    """
+    Bangun vector store & products.json dari golden set lewat fake Ollama
+    dengan layout DATA_DIR (vectorstore/<domain>, json/products.json),
+    jadi workdir juga bisa dipakai sebagai DATA_DIR proses lain.
+    """
+    import faiss
+
+    from core.embedding_cache import cache
+    from core.vectorstore import save_vectorstore
+    from ingestion.batch_embedder import BatchEmbedder
+
+    cache.path = None  # embedding cache memory-only
+
+    embedder = BatchEmbedder()
+    directories = {}
+    for domain, docs in golden["corpus"].items():
+        vectors = embedder.embed([d["text"] for d in docs])
+        index = faiss.IndexFlatIP(vectors.shape[1])
+        index.add(vectors)
+
+        directories[domain] = workdir / "vectorstore" / domain
+        save_vectorstore(directories[domain], index, docs)
+
+    products_file = workdir / "json" / "products.json"
+    products_file.parent.mkdir(parents=True, exist_ok=True)
+    products_file.write_text(json.dumps(golden["products"], ensure_ascii=False), encoding="utf-8")
+    return directories, products_file
+
+
+def build_sandbox(workdir: Path, golden: dict, answer_cache_enabled: bool):
+    """
+    Arahkan semua path tulis / baca project ke workdir, lalu bangun
+    vector store & products.json dari golden set lewat fake Ollama.
+    """
+    import api.learning as learning
+    import api.logger as chat_logger
+    import core.confidence as confidence
+    import core.telemetry as telemetry_module
+    from api.search import catalog
+    from core.answer_cache import answer_cache
+    from core.router import router
+    from core.vectorstore import registry
+
+    learning.LEARNING_DB = str(workdir / "learning.sqlite3")
+    confidence.CONF_LOG = workdir / "confidence_log.jsonl"
+    chat_logger.LOG_FILE = str(workdir / "chat_logs.jsonl")
+    router.classifier.log_path = None
+    answer_cache.enabled = answer_cache_enabled
+    telemetry_module.TELEMETRY_LOG_REQUESTS = False
+
+    directories, products_file = write_sandbox_data(workdir, golden)
+    router.classifier.warm(wait=True)  # akurasi diukur dengan centroid siap
+
+    for domain, directory in directories.items():
+        registry.directories[domain] = directory
+        registry._stores.pop(domain, None)
+        registry._checked_at.pop(domain, None)
+
+    catalog.path = products_file
+    catalog._version = None
+
+
+# =========================
+# BENCHMARK
+# =========================
+def run_benchmark(golden: dict, repeat: int, concurrency: int, warm: bool) -> dict:
+    from api.search import catalog, search_products
+    from core.embedding_cache import cache
+    from core.fanout import retrieve_all
+    from core.retriever import get_retriever
+    from core.router import route_query, router
+
+    queries = golden["queries"]
+    texts = [q["query"] for q in queries]
+    chunk_domain = {
+        doc["chunk_id"]: domain
+        for domain, docs in golden["corpus"].items()
+        for doc in docs
+    }
+
+    def cold_pass():
+        # pertanyaan user umumnya unik → embedding query tidak ada di cache
+        if not warm:
+            cache.clear()
+        router._cache.clear()
+
+    results = {}
+
+    # --- router
+    stats, outputs = run_target(route_query, texts, repeat, concurrency, cold_pass)
+    correct = [out == q["route"] for out, q in zip(outputs, queries)]
+    stats["quality"] = {
+        "accuracy": round(sum(correct) / len(correct), 4),
+        "misrouted": sorted(q["query"] for q, ok in zip(queries, correct) if not ok),
+    }
+    results["route_query"] = stats
+
+    # --- product search (katalog)
+    labeled = [q for q in queries if q.get("products")]
+    stats, outputs = run_target(
+        lambda q: [p["kode"] for p in search_products(q, catalog.products(), PRODUCT_LIMIT)],
+        [q["query"] for q in labeled], repeat, concurrency,
+    )
+    stats["quality"] = ranking_quality(outputs, [q["products"] for q in labeled], PRODUCT_LIMIT)
+    results["search_products"] = stats
+
+    # --- retriever per domain
+    for domain in golden["corpus"]:
+        retriever = get_retriever(domain, top_k=TOP_K)
+        labeled = [
+            q for q in queries
+            if any(chunk_domain.get(c) == domain for c in q.get("chunks", []))
+        ]
+        stats, outputs = run_target(
+            lambda q: [d.get("chunk_id") for d in retriever.retrieve(q)],
+            [q["query"] for q in labeled], repeat, concurrency, cold_pass,
+        )
+        stats["quality"] = ranking_quality(outputs, [q["chunks"] for q in labeled], TOP_K)
+        results[f"retriever.{domain}"] = stats
+
+    # --- fan-out (semua domain, satu embedding)
+    stats, _ = run_target(
+        lambda q: retrieve_all(q, top_k=TOP_K, domains=tuple(golden["corpus"])),
+        texts, repeat, concurrency, cold_pass,
+    )
+    results["fanout"] = stats
+
+    # --- end-to-end
+    try:
+        from api.chat_engine import handle_chat_engine
+    except Exception as e:
+        results["handle_chat_engine"] = {"error": f"{type(e).__name__}: {e}"}
+    else:
+        stats, outputs = run_target(
+            lambda q: handle_chat_engine(q, user_id="bench", products_data=catalog.products()),
+            texts, repeat, concurrency, cold_pass,
+        )
+        answered = [out for out in outputs if out and out[0]]
+        stats["quality"] = {"answered": round(len(answered) / len(texts), 4)}
+        results["handle_chat_engine"] = stats
+
+    return results
+
+
+# =========================
+# REPORT
+# =========================
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report: dict):
+    print(f"\n{'target':<22} {'calls':>6} {'err':>4} {'qps':>9} {'p50 ms':>9} {'p95 ms':>9}  quality")
+    for name, stats in report["targets"].items():
+        if "error" in stats:
+            print(f"{name:<22} ⚠️ {stats['error']}")
+            continue
+
+        lat = stats["latency_ms"]
+        quality = {k: v for k, v in stats.get("quality", {}).items() if not isinstance(v, list)}
+        print(
+            f"{name:<22} {stats['calls']:>6} {stats['errors']:>4} "
+            f"{stats['throughput_qps']:>9.1f} {lat['p50']:>9.2f} {lat['p95']:>9.2f}  {quality}"
+        )
+
+
+def print_comparison(old: dict, new: dict):
+    """
+    Selisih p95, throughput & metrik kualitas numerik (baru vs lama).
+    """
+    print(f"\nvs {old['meta'].get('commit')} → {new['meta'].get('commit')}")
+    for name, stats in new["targets"].items():
+        before = old["targets"].get(name)
+        if not before or "error" in stats or "error" in before:
+            continue
+
+        p95_old, p95_new = before["latency_ms"]["p95"], stats["latency_ms"]["p95"]
+        change = (p95_new - p95_old) / p95_old * 100 if p95_old else 0.0
+        line = f"{name:<22} p95 {p95_old:>8.2f} → {p95_new:>8.2f} ms ({change:+.1f}%)"
+
+        for key, value in stats.get("quality", {}).items():
+            prev = before.get("quality", {}).get(key)
+            if isinstance(value, (int, float)) and isinstance(prev, (int, float)) and key != "queries":
+                line += f" | {key} {prev:.3f} → {value:.3f}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline RAG benchmark (fake Ollama)")
+    parser.add_argument("--golden", default=str(GOLDEN_FILE))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--embed-ms", type=float, default=5.0)
+    parser.add_argument("--generate-ms", type=float, default=50.0)
+    parser.add_argument("--token-ms", type=float, default=2.0)
+    parser.add_argument("--warm", action="store_true", help="embedding cache tidak dikosongkan antar pass")
+    parser.add_argument("--answer-cache", action="store_true", help="aktifkan semantic answer cache")
+    parser.add_argument("--json", help="tulis hasil ke file JSON")
+    parser.add_argument("--compare", help="JSON hasil sebelumnya untuk dibandingkan")
+    args = parser.parse_args()
+
+    with open(args.golden, encoding="utf-8") as f:
+        golden = json.load(f)
+
+    server, base_url = start_in_thread(
+        embed_ms=args.embed_ms, generate_ms=args.generate_ms, token_ms=args.token_ms
+    )
+    # config membaca OLLAMA_BASE_URL saat import → modul project di-import setelah ini
+    os.environ["OLLAMA_BASE_URL"] = base_url
+
+    with tempfile.TemporaryDirectory(prefix="bench_rag_") as workdir:
+        build_sandbox(Path(workdir), golden, args.answer_cache)
+
+        from core.telemetry import telemetry
+        telemetry.reset()
+
+        started = time.perf_counter()
+        targets = run_benchmark(golden, args.repeat, args.concurrency, args.warm)
+        elapsed = time.perf_counter() - started
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "golden_version": golden.get("version"),
+            "repeat": args.repeat,
+            "concurrency": args.concurrency,
+            "warm": args.warm,
+            "answer_cache": args.answer_cache,
+            "fake_ollama": {
+                "embed_ms": args.embed_ms,
+                "generate_ms": args.generate_ms,
+                "token_ms": args.token_ms,
+                "requests": dict(sorted(server.RequestHandlerClass.stats.items())),
+            },
+            "duration_s": round(elapsed, 2),
+        },
+        "targets": targets,
+        "stages": telemetry.snapshot()["stages"],
+    }
+    server.shutdown()
+
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, sort_keys=True)
+        print(f"\n💾 {args.json}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,10 @@ import os
 import json
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+from config import EMBED_MODEL
+from core.vectorstore import save_vectorstore
+from ingestion.batch_embedder import BatchEmbedder
 
 # =========================
 # PATH CONFIG
@@ -13,16 +16,13 @@ DATA_DIR = os.path.join(BASE_DIR, "data", "json")
 PRODUCT_FILE = os.path.join(DATA_DIR, "products.json")
 VECTOR_DIR = os.path.join(DATA_DIR, "vector_store", "products")
 
-INDEX_FILE = os.path.join(VECTOR_DIR, "index.faiss")
-META_FILE = os.path.join(VECTOR_DIR, "metadata.json")
-
 os.makedirs(VECTOR_DIR, exist_ok=True)
 
 # =========================
-# LOAD MODEL
+# EMBEDDING MODEL
 # =========================
-print("🔄 Loading embedding model...")
-model = SentenceTransformer("all-MiniLM-L6-v2")
+# Model sama dengan query (core.embeddings) → vektor bisa dibandingkan
+embedder = BatchEmbedder(model=EMBED_MODEL)
 
 # =========================
 # LOAD PRODUCTS
@@ -111,22 +111,20 @@ yang dimaksud adalah PRODUK CNI ini.
 # EMBEDDING
 # =========================
 print("🔄 Membuat embedding...")
-embeddings = model.encode(texts, convert_to_numpy=True)
+embeddings = embedder.embed(texts)
 
 if embeddings.size == 0:
     raise ValueError("Embedding kosong")
 
+# BatchEmbedder → normalized, IP = cosine (kontrak index)
 dim = embeddings.shape[1]
-index = faiss.IndexFlatL2(dim)
+index = faiss.IndexFlatIP(dim)
 index.add(embeddings)
 
 # =========================
 # SAVE VECTOR STORE
 # =========================
-faiss.write_index(index, INDEX_FILE)
-
-with open(META_FILE, "w", encoding="utf-8") as f:
-    json.dump(metadata, f, ensure_ascii=False, indent=2)
+save_vectorstore(VECTOR_DIR, index, metadata, model=EMBED_MODEL)
 
 # =========================
 # LOG
@@ -1,14 +1,11 @@
 import json
-import requests
 import faiss
 import numpy as np
 from pathlib import Path
 
-from config import (
-    PROFILE_VECTOR_DIR,
-    OLLAMA_EMBED_URL,
-    EMBED_MODEL,
-)
+from config import PROFILE_VECTOR_DIR, EMBED_MODEL
+from core.embeddings import embed
+from core.vectorstore import save_vectorstore
 
 # =========================
 # SOURCE PROFILE DATA
@@ -22,19 +19,10 @@ PROFILE_SOURCE_FILE = Path("data/processed/profile.json")
 def embed_text(text: str) -> np.ndarray:
     """
     Embed teks menggunakan Ollama embedding model.
-    HARUS sama dengan model yang dipakai di retriever.
+    HARUS sama dengan model yang dipakai di retriever
+    (core.embeddings: normalized + embedding cache).
     """
-    r = requests.post(
-        OLLAMA_EMBED_URL,
-        json={
-            "model": EMBED_MODEL,
-            "prompt": text,
-        },
-        timeout=60,
-    )
-    r.raise_for_status()
-
-    return np.array(r.json()["embedding"], dtype="float32")
+    return embed(text)
 
 
 # =========================
@@ -64,15 +52,12 @@ def build_profile_index():
     if not vectors:
         raise ValueError("Tidak ada data profile untuk di-embed.")
 
+    # embed() sudah normalized → IP = cosine (kontrak index)
     dim = len(vectors[0])
-    index = faiss.IndexFlatL2(dim)
+    index = faiss.IndexFlatIP(dim)
     index.add(np.vstack(vectors))
 
-    PROFILE_VECTOR_DIR.mkdir(parents=True, exist_ok=True)
-
-    faiss.write_index(index, str(PROFILE_VECTOR_DIR / "index.faiss"))
-    with open(PROFILE_VECTOR_DIR / "metadata.json", "w", encoding="utf-8") as f:
-        json.dump(metadata, f, ensure_ascii=False, indent=2)
+    save_vectorstore(PROFILE_VECTOR_DIR, index, metadata, model=EMBED_MODEL)
 
     print("✅ Profile vectorstore berhasil dibuat.")
     print(f"   - Total chunk : {len(metadata)}")
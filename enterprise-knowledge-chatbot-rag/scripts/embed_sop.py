@@ -1,14 +1,14 @@
 import os
 from dotenv import load_dotenv
-import json
-import faiss   
-import numpy as np
-from sentence_transformers import SentenceTransformer
+import faiss
 
 load_dotenv()
 
 from api.loaders.pdf_loader import load_pdf
 from ingestion.chunker import chunk_pdf_page
+from core.vectorstore import save_vectorstore
+from ingestion.batch_embedder import BatchEmbedder
+from config import EMBED_MODEL
 
 
 # =========================
@@ -17,7 +17,6 @@ from ingestion.chunker import chunk_pdf_page
 # =========================
 # CONFIG
 # =========================
-MODEL_NAME = os.getenv("MODEL_NAME", "all-MiniLM-L6-v2")
 PDF_DIR = os.getenv("PDF_DIR", "data/raw/pdf")
 OUT_DIR = os.getenv(
     "SOP_VECTOR_DIR",
@@ -26,7 +25,8 @@ OUT_DIR = os.getenv(
 
 os.makedirs(OUT_DIR, exist_ok=True)
 
-MODEL = SentenceTransformer(MODEL_NAME)
+# model sama dengan query (core.embeddings), bukan model lokal terpisah
+EMBEDDER = BatchEmbedder(model=EMBED_MODEL)
 
 
 # =========================
@@ -56,16 +56,14 @@ def build_sop_vectorstore(pdf_paths: list[str]):
         return
 
     texts = [c["text"] for c in all_chunks]
-    embeddings = MODEL.encode(texts, show_progress_bar=True)
+    embeddings = EMBEDDER.embed(texts)
 
+    # normalized + IP = cosine (kontrak index)
     dim = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dim)
-    index.add(np.array(embeddings))
+    index = faiss.IndexFlatIP(dim)
+    index.add(embeddings)
 
-    faiss.write_index(index, os.path.join(OUT_DIR, "index.faiss"))
-
-    with open(os.path.join(OUT_DIR, "metadata.json"), "w", encoding="utf-8") as f:
-        json.dump(all_chunks, f, ensure_ascii=False, indent=2)
+    save_vectorstore(OUT_DIR, index, all_chunks, model=EMBED_MODEL)
 
     print(f"✅ SOP vector store dibuat dari {len(pdf_paths)} PDF → {len(all_chunks)} chunks")
 
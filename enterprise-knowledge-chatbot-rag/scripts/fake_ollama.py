@@ -0,0 +1,251 @@
+# scripts/fake_ollama.py
+"""
+Pengganti Ollama lokal untuk benchmark / load test (offline, tanpa GPU).
+
+Endpoint yang dipakai project ini:
+- POST /api/embeddings  {"prompt"}          → {"embedding"}
+- POST /api/embed       {"input": [...]}    → {"embeddings"} (normalized)
+- POST /api/generate    {"prompt", "stream"} → jawaban kalengan (NDJSON jika stream)
+- POST /api/chat        {"messages"}         → jawaban kalengan
+- GET  /api/tags, /api/version               → health check
+
+Embedding deterministik: hashing kata + trigram karakter ke EMBED_DIM
+dimensi → teks dengan kata yang sama tetap mirip (cosine), jadi
+retrieval & router bisa dinilai kualitasnya, bukan hanya latency-nya.
+
+Latency bisa diatur (prefill, per token, embedding) untuk meniru VM CPU.
+
+Contoh:
+    python -m scripts.fake_ollama --port 11435 --generate-ms 800 --token-ms 40
+    OLLAMA_BASE_URL=http://127.0.0.1:11435 uvicorn api.main:app
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+EMBED_DIM = 768
+
+_WORD_RE = re.compile(r"\w+")
+
+
+# =========================
+# DETERMINISTIC EMBEDDING
+# =========================
+def _bucket(feature: str, dim: int) -> tuple[int, float]:
+    h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    return h % dim, (1.0 if (h >> 63) & 1 else -1.0)
+
+
+def fake_embedding(text: str, dim: int = EMBED_DIM) -> list[float]:
+    vec = np.zeros(dim, dtype="float32")
+
+    for word in _WORD_RE.findall(text.lower()):
+        i, sign = _bucket("w:" + word, dim)
+        vec[i] += sign
+
+        # trigram → typo / imbuhan ("keluhannya") tetap dekat dengan kata dasar
+        padded = f"#{word}#"
+        for j in range(len(padded) - 2):
+            i, sign = _bucket("c:" + padded[j:j + 3], dim)
+            vec[i] += 0.3 * sign
+
+    norm = np.linalg.norm(vec)
+    if norm == 0:
+        vec[0] = 1.0
+        norm = 1.0
+    return (vec / norm).tolist()
+
+
+def canned_answer(prompt: str) -> str:
+    # baris terakhir yang berisi teks ≈ pertanyaan user di semua template prompt
+    lines = [line.strip() for line in prompt.splitlines() if line.strip()]
+    question = lines[-1] if lines else ""
+    return f"Jawaban uji untuk: {question[:120]}"
+
+
+# =========================
+# HTTP HANDLER
+# =========================
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeOllama/1.0"
+    # header & body ditulis terpisah → tanpa TCP_NODELAY kena delayed ACK ~40 ms
+    disable_nagle_algorithm = True
+
+    # diisi oleh make_server()
+    settings: dict = {}
+    stats: dict = {}
+    stats_lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass  # tanpa access log per request
+
+    def _count(self, endpoint: str):
+        with self.stats_lock:
+            self.stats[endpoint] = self.stats.get(endpoint, 0) + 1
+
+    def _sleep_ms(self, ms: float):
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+    def _send_json(self, data: dict, status: int = 200):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, data: dict):
+        body = (json.dumps(data) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(body):X}\r\n".encode() + body + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": self.settings["model"]}]})
+        elif self.path == "/api/version":
+            self._send_json({"version": "0.0.0-fake"})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json({"error": "invalid json"}, 400)
+            return
+
+        endpoint = self.path.removeprefix("/api/")
+        self._count(endpoint)
+
+        if endpoint == "embeddings":
+            self._sleep_ms(self.settings["embed_ms"])
+            self._send_json({"embedding": fake_embedding(payload.get("prompt", ""))})
+
+        elif endpoint == "embed":
+            texts = payload.get("input", [])
+            texts = [texts] if isinstance(texts, str) else texts
+            self._sleep_ms(self.settings["embed_ms"] * max(1, len(texts)) ** 0.5)
+            self._send_json({"embeddings": [fake_embedding(t) for t in texts]})
+
+        elif endpoint in ("generate", "chat"):
+            if endpoint == "chat":
+                messages = payload.get("messages") or [{}]
+                prompt = messages[-1].get("content", "")
+            else:
+                prompt = payload.get("prompt", "")
+            self._generate(endpoint, prompt, payload.get("stream", True))
+
+        else:
+            self._send_json({"error": f"unknown endpoint {endpoint}"}, 404)
+
+    def _generate(self, endpoint: str, prompt: str, stream: bool):
+        answer = canned_answer(prompt)
+        tokens = answer.split(" ")
+        prefill_ms = self.settings["generate_ms"]
+        token_ms = self.settings["token_ms"]
+
+        stats = {
+            "model": self.settings["model"],
+            "done": True,
+            "prompt_eval_count": max(1, len(prompt) // 4),
+            "prompt_eval_duration": int(prefill_ms * 1e6),
+            "eval_count": len(tokens),
+            "eval_duration": int(token_ms * len(tokens) * 1e6),
+            "load_duration": 0,
+        }
+        key = "response" if endpoint == "generate" else "message"
+
+        def content(text: str):
+            return text if endpoint == "generate" else {"role": "assistant", "content": text}
+
+        self._sleep_ms(prefill_ms)
+
+        if not stream:
+            self._sleep_ms(token_ms * len(tokens))
+            self._send_json({**stats, key: content(answer)})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        for i, token in enumerate(tokens):
+            self._sleep_ms(token_ms)
+            text = token if i == 0 else " " + token
+            self._send_chunk({"model": self.settings["model"], "done": False, key: content(text)})
+
+        self._send_chunk({**stats, key: content("")})
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def make_server(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    embed_ms: float = 0.0,
+    generate_ms: float = 0.0,
+    token_ms: float = 0.0,
+    model: str = "fake",
+) -> ThreadingHTTPServer:
+    """
+    Server belum berjalan; port=0 → port bebas (lihat server.server_address).
+    """
+    handler = type("Handler", (FakeOllamaHandler,), {
+        "settings": {
+            "embed_ms": embed_ms,
+            "generate_ms": generate_ms,
+            "token_ms": token_ms,
+            "model": model,
+        },
+        "stats": {},
+        "stats_lock": threading.Lock(),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_thread(**kwargs) -> tuple[ThreadingHTTPServer, str]:
+    """
+    Jalankan server di background thread; return (server, base_url).
+    """
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, name="fake-ollama", daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama HTTP server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--embed-ms", type=float, default=5.0)
+    parser.add_argument("--generate-ms", type=float, default=300.0, help="latency prefill")
+    parser.add_argument("--token-ms", type=float, default=20.0, help="latency per token")
+    args = parser.parse_args()
+
+    server = make_server(
+        args.host, args.port, args.embed_ms, args.generate_ms, args.token_ms
+    )
+    print(f"🧪 Fake Ollama listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,448 @@
+# scripts/load_test.py
+"""
+Load test endpoint /chat (atau /chat/stream) dengan sweep concurrency.
+
+- Traffic = replay pertanyaan dari user_queries.jsonl (user_id di-hash,
+  jawaban tidak dipakai); tanpa log → pertanyaan golden set benchmark
+- Closed loop (default): N virtual user, masing-masing kirim request
+  berikutnya setelah jawaban diterima (+ think time)
+- Open loop (--rate): kedatangan Poisson R request/detik, maks N in-flight;
+  latency dihitung dari jadwal kedatangan → antrean client ikut terukur
+- --spawn: jalankan fake Ollama + uvicorn api.main:app lokal selama test,
+  dengan data golden set di folder sementara (data/ asli tidak disentuh)
+- Per step: throughput, latency p50/p95/p99, error / timeout / jawaban
+  degradasi ("AI sedang tidak tersedia" dsb.), max in-flight,
+  p95 server per stage (GET /metrics) → tanda worker jenuh
+
+Contoh:
+    python -m scripts.load_test run --url http://127.0.0.1:8000 --sweep 10,50,200 --json run_a.json
+    python -m scripts.load_test run --spawn --workers 2 --sweep 10,50 --duration 30 --json run_b.json
+    python -m scripts.load_test compare run_a.json run_b.json
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from scripts.bench_rag import GOLDEN_FILE, git_commit, latency_summary
+from scripts.fake_ollama import start_in_thread
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+QUERY_LOG = ROOT_DIR / "data" / "json" / "logs" / "user_queries.jsonl"
+
+# Jawaban fallback api.ollama / chat_engine → request "berhasil" tapi degradasi
+# (di RAG produk fallback tertempel setelah prefix "(Tingkat keyakinan…")
+DEGRADED_MARKERS = ("⚠️", "AI sedang tidak tersedia", "AI tidak memberikan jawaban")
+
+_QUANTILE_RE = re.compile(
+    r'^rag_stage_quantile_seconds\{stage="(?P<stage>[^"]+)",quantile="(?P<q>[^"]+)"\} (?P<v>\S+)$'
+)
+
+
+# =========================
+# TRAFFIC
+# =========================
+def anonymize(user_id: str) -> str:
+    return "u" + hashlib.sha1(str(user_id).encode("utf-8")).hexdigest()[:10]
+
+
+def load_traffic(path: Path | None, limit: int) -> list[dict]:
+    """
+    [{"message", "user_id", "platform"}] dari log, atau golden set.
+    """
+    traffic = []
+
+    if path and path.exists():
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                question = (record.get("question") or "").strip()
+                if question:
+                    traffic.append({
+                        "message": question,
+                        "user_id": anonymize(record.get("user_id", "anonymous")),
+                        "platform": "loadtest",
+                    })
+
+    if not traffic:
+        with open(GOLDEN_FILE, encoding="utf-8") as f:
+            golden = json.load(f)
+        traffic = [
+            {"message": q["query"], "user_id": f"u{i % 50}", "platform": "loadtest"}
+            for i, q in enumerate(golden["queries"])
+        ]
+        print(f"ℹ️ {path} tidak ada / kosong → {len(traffic)} pertanyaan golden set")
+
+    return traffic[-limit:] if limit else traffic
+
+
+# =========================
+# CLIENT
+# =========================
+class Step:
+    def __init__(self, concurrency: int, rate: float | None):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.latencies: list[float] = []
+        self.queue_times: list[float] = []
+        self.first_bytes: list[float] = []
+        self.ok = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.degraded = 0
+        self.status: dict[str, int] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.wall = 0.0
+        self.offered_rps = 0.0
+
+
+async def send(client: httpx.AsyncClient, step: Step, item: dict, stream: bool, scheduled: float):
+    started = time.perf_counter()
+    step.queue_times.append(started - scheduled)
+    step.in_flight += 1
+    step.max_in_flight = max(step.max_in_flight, step.in_flight)
+
+    try:
+        if stream:
+            answer, event = None, None
+            async with client.stream("POST", "/chat/stream", json=item) as r:
+                first = None
+                async for line in r.aiter_lines():
+                    if first is None:
+                        first = time.perf_counter()
+                        step.first_bytes.append(first - started)
+                    if line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:") and event == "done":
+                        answer = json.loads(line[5:]).get("answer")
+                    elif event == "error":
+                        # SSE sudah 200, error engine dikirim sebagai event
+                        answer = "⚠️ stream error"
+                status = r.status_code
+        else:
+            r = await client.post("/chat", json=item)
+            status = r.status_code
+            answer = r.json().get("answer") if status == 200 else None
+
+        step.status[str(status)] = step.status.get(str(status), 0) + 1
+        if status == 200:
+            step.ok += 1
+            if answer is None or any(m in str(answer) for m in DEGRADED_MARKERS):
+                step.degraded += 1
+        else:
+            step.errors += 1
+
+    except httpx.TimeoutException:
+        step.timeouts += 1
+    except httpx.HTTPError as e:
+        step.errors += 1
+        key = type(e).__name__
+        step.status[key] = step.status.get(key, 0) + 1
+    finally:
+        step.in_flight -= 1
+        # dari jadwal kedatangan (open loop) → termasuk antre di client
+        step.latencies.append(time.perf_counter() - scheduled)
+
+
+async def closed_loop(client, step: Step, traffic: list, duration: float, think_ms: float, stream: bool):
+    deadline = time.perf_counter() + duration
+    cursor = iter(range(sys.maxsize))
+
+    async def user():
+        while time.perf_counter() < deadline:
+            item = traffic[next(cursor) % len(traffic)]
+            await send(client, step, item, stream, time.perf_counter())
+            if think_ms:
+                await asyncio.sleep(random.expovariate(1000 / think_ms))
+
+    await asyncio.gather(*(user() for _ in range(step.concurrency)))
+
+
+async def open_loop(client, step: Step, traffic: list, duration: float, stream: bool):
+    limiter = asyncio.Semaphore(step.concurrency)
+    tasks = []
+
+    async def arrival(item, scheduled):
+        async with limiter:
+            await send(client, step, item, stream, scheduled)
+
+    started = time.perf_counter()
+    i = 0
+    while time.perf_counter() - started < duration:
+        tasks.append(asyncio.create_task(
+            arrival(traffic[i % len(traffic)], time.perf_counter())
+        ))
+        i += 1
+        await asyncio.sleep(random.expovariate(step.rate))
+
+    # laju yang benar-benar terkirim (granularity sleep event loop)
+    step.offered_rps = len(tasks) / (time.perf_counter() - started)
+    await asyncio.gather(*tasks)
+
+
+async def server_quantiles(client: httpx.AsyncClient) -> dict:
+    """
+    p95 per stage dari /metrics server (ms); kosong jika endpoint tidak ada.
+    """
+    try:
+        r = await client.get("/metrics")
+        r.raise_for_status()
+    except httpx.HTTPError:
+        return {}
+
+    p95 = {}
+    for line in r.text.splitlines():
+        m = _QUANTILE_RE.match(line)
+        if m and m["q"] == "0.95":
+            p95[m["stage"]] = round(float(m["v"]) * 1000, 2)
+    return p95
+
+
+async def run_step(url: str, traffic: list, args, concurrency: int) -> dict:
+    step = Step(concurrency, args.rate)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        if args.rate:
+            await open_loop(client, step, traffic, args.duration, args.stream)
+        else:
+            await closed_loop(client, step, traffic, args.duration, args.think_ms, args.stream)
+        step.wall = time.perf_counter() - started
+        server = await server_quantiles(client)
+
+    total = step.ok + step.errors + step.timeouts
+    result = {
+        "concurrency": concurrency,
+        "rate": args.rate,
+        "requests": total,
+        "ok": step.ok,
+        "errors": step.errors,
+        "timeouts": step.timeouts,
+        "degraded": step.degraded,
+        "error_rate": round((step.errors + step.timeouts) / total, 4) if total else 0.0,
+        "throughput_rps": round(step.ok / step.wall, 2) if step.wall else 0.0,
+        "latency_ms": latency_summary(step.latencies),
+        "client_queue_ms": latency_summary(step.queue_times),
+        "max_in_flight": step.max_in_flight,
+        "status": dict(sorted(step.status.items())),
+        # server p95 (kumulatif sejak server start, per worker yang menjawab scrape)
+        "server_p95_ms": server,
+    }
+    if step.first_bytes:
+        result["first_byte_ms"] = latency_summary(step.first_bytes)
+
+    if args.rate:
+        # < 1 → server tidak sanggup mengikuti laju kedatangan
+        result["offered_rps"] = round(step.offered_rps, 2)
+        result["saturation"] = round(result["throughput_rps"] / step.offered_rps, 3) if step.offered_rps else 0.0
+
+    return result
+
+
+# =========================
+# LOCAL SERVER (--spawn)
+# =========================
+def spawn_server(args, workdir: Path):
+    """
+    Fake Ollama + API dengan DATA_DIR / RUNTIME_LOG_DIR di workdir:
+    vector store & katalog dibangun dari golden set (embedding fake,
+    seperti bench_rag), cache / log / learning DB / conversation store
+    ikut di sandbox → data asli tidak tersentuh.
+    """
+    fake, fake_url = start_in_thread(
+        embed_ms=args.embed_ms, generate_ms=args.generate_ms, token_ms=args.token_ms
+    )
+    sandbox = {
+        "OLLAMA_BASE_URL": fake_url,
+        "DATA_DIR": str(workdir),
+        "RUNTIME_LOG_DIR": str(workdir / "logs"),
+    }
+    # sebelum import config: proses ini juga membangun data sandbox
+    os.environ.update(sandbox)
+
+    from scripts.bench_rag import write_sandbox_data
+
+    with open(GOLDEN_FILE, encoding="utf-8") as f:
+        write_sandbox_data(workdir, json.load(f))
+
+    env = {**os.environ, **sandbox, "TELEMETRY_ENABLED": "1"}
+
+    cmd = [
+        sys.executable, "-m", "uvicorn", "api.main:app",
+        "--host", "127.0.0.1", "--port", str(args.port),
+        "--workers", str(args.workers), "--log-level", "warning",
+    ]
+    proc = subprocess.Popen(cmd, cwd=ROOT_DIR, env=env)
+    url = f"http://127.0.0.1:{args.port}"
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"API server exited ({proc.returncode})")
+        try:
+            if httpx.get(url + "/", timeout=1).status_code == 200:
+                print(f"🚀 API {url} ({args.workers} worker) ← fake Ollama {fake_url}, data {workdir}")
+                return proc, fake, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+
+    proc.terminate()
+    raise RuntimeError("API server tidak siap dalam 60 detik")
+
+
+# =========================
+# REPORT
+# =========================
+def print_steps(steps: list):
+    print(
+        f"\n{'conc':>5} {'req':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+        f"{'err%':>6} {'t/o':>5} {'degr':>5} {'inflt':>6}  server p95 (chat / llm)"
+    )
+    for s in steps:
+        lat = s["latency_ms"]
+        server = s.get("server_p95_ms", {})
+        print(
+            f"{s['concurrency']:>5} {s['requests']:>6} {s['throughput_rps']:>8.2f} "
+            f"{lat['p50']:>9.1f} {lat['p95']:>9.1f} {lat['p99']:>9.1f} "
+            f"{s['error_rate'] * 100:>6.1f} {s['timeouts']:>5} {s['degraded']:>5} "
+            f"{s['max_in_flight']:>6}  {server.get('chat', '-')} / {server.get('llm', '-')}"
+        )
+
+
+def compare(old: dict, new: dict):
+    """
+    Bandingkan dua run per concurrency: throughput, p95, error rate.
+    """
+    print(f"\n{old['meta'].get('label') or old['meta'].get('commit')} → "
+          f"{new['meta'].get('label') or new['meta'].get('commit')}")
+    print(f"{'conc':>5} {'rps':>22} {'p95 ms':>26} {'err%':>16}")
+
+    before = {s["concurrency"]: s for s in old["steps"]}
+    for s in new["steps"]:
+        b = before.get(s["concurrency"])
+        if b is None:
+            continue
+
+        def delta(a, c):
+            return f"{(c - a) / a * 100:+.0f}%" if a else "n/a"
+
+        rps = f"{b['throughput_rps']:.1f} → {s['throughput_rps']:.1f} ({delta(b['throughput_rps'], s['throughput_rps'])})"
+        p95 = f"{b['latency_ms']['p95']:.0f} → {s['latency_ms']['p95']:.0f} ({delta(b['latency_ms']['p95'], s['latency_ms']['p95'])})"
+        err = f"{b['error_rate'] * 100:.1f} → {s['error_rate'] * 100:.1f}"
+        print(f"{s['concurrency']:>5} {rps:>22} {p95:>26} {err:>16}")
+
+
+def cmd_run(args):
+    traffic = load_traffic(Path(args.queries) if args.queries else QUERY_LOG, args.limit)
+    random.seed(args.seed)
+
+    proc = fake = sandbox = None
+    url = args.url
+    if args.spawn:
+        sandbox = tempfile.TemporaryDirectory(prefix="load_test_")
+        proc, fake, url = spawn_server(args, Path(sandbox.name))
+
+    steps = []
+    try:
+        for concurrency in [int(c) for c in args.sweep.split(",")]:
+            print(f"▶️ concurrency {concurrency} ({args.duration:.0f} s)")
+            steps.append(asyncio.run(run_step(url, traffic, args, concurrency)))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+        if fake is not None:
+            fake.shutdown()
+        if sandbox is not None:
+            sandbox.cleanup()
+
+    report = {
+        "meta": {
+            "label": args.label,
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "url": url,
+            "endpoint": "/chat/stream" if args.stream else "/chat",
+            "mode": "open" if args.rate else "closed",
+            "duration_s": args.duration,
+            "think_ms": args.think_ms,
+            "timeout_s": args.timeout,
+            "traffic": len(traffic),
+            "spawn": {
+                "workers": args.workers,
+                "embed_ms": args.embed_ms,
+                "generate_ms": args.generate_ms,
+                "token_ms": args.token_ms,
+            } if args.spawn else None,
+        },
+        "steps": steps,
+    }
+
+    print_steps(steps)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, sort_keys=True)
+        print(f"\n💾 {args.json}")
+
+
+def cmd_compare(args):
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    compare(old, new)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /chat (asyncio + httpx)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run")
+    run.add_argument("--url", default="http://127.0.0.1:8000")
+    run.add_argument("--sweep", default="10,50,200", help="daftar concurrency")
+    run.add_argument("--duration", type=float, default=30.0, help="detik per step")
+    run.add_argument("--rate", type=float, help="open loop: kedatangan per detik")
+    run.add_argument("--think-ms", type=float, default=0.0, help="closed loop: jeda antar request")
+    run.add_argument("--timeout", type=float, default=60.0)
+    run.add_argument("--stream", action="store_true", help="uji /chat/stream (time to first byte)")
+    run.add_argument("--queries", help=f"log JSONL (default {QUERY_LOG})")
+    run.add_argument("--limit", type=int, default=5000, help="maks pertanyaan terakhir dari log")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--label", help="nama run di laporan perbandingan")
+    run.add_argument("--json")
+    run.add_argument("--spawn", action="store_true", help="jalankan fake Ollama + API lokal")
+    run.add_argument("--port", type=int, default=8765)
+    run.add_argument("--workers", type=int, default=1)
+    run.add_argument("--embed-ms", type=float, default=5.0)
+    run.add_argument("--generate-ms", type=float, default=300.0)
+    run.add_argument("--token-ms", type=float, default=20.0)
+    run.set_defaults(func=cmd_run)
+
+    cmp_ = sub.add_parser("compare")
+    cmp_.add_argument("old")
+    cmp_.add_argument("new")
+    cmp_.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,18 @@
-from core.router import route_query
+from core.router import route_query, router
+
+router.classifier.warm(wait=True)
 
 queries = [
     "bagaimana prosedur penanganan keluhan?",
     "apa visi dan misi perusahaan?",
     "ceritakan sejarah singkat CNI",
     "produk apa saja yang tersedia?",
-    "berapa harga produk kesehatan?"
+    "berapa harga produk kesehatan?",
+    "harga discs berapa?",            # "cs" di dalam "discs" bukan SOP
+    "barang yang saya terima rusak",  # tanpa keyword → centroid
 ]
 
 for q in queries:
-    print(f"{q}  →  {route_query(q)}")
\ No newline at end of file
+    print(f"{q}  →  {route_query(q)}")
+
+print(router.stats())
\ No newline at end of file
@@ -1,21 +1,33 @@
-import faiss
-import json
-from sentence_transformers import SentenceTransformer
+from config import DATA_DIR
+from core.embeddings import embed
+from core.vectorstore import load_vectorstore
 
-INDEX_FILE = "data/json/vector_store/index.faiss"
-META_FILE = "data/json/vector_store/metadata.json"
+# output scripts/embed_products.py
+VECTOR_DIR = DATA_DIR / "json" / "vector_store" / "products"
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
-
-index = faiss.read_index(INDEX_FILE)
-with open(META_FILE, "r", encoding="utf-8") as f:
-    metadata = json.load(f)
+# kontrak index sama dengan API: EMBED_MODEL + cosine (lihat manifest.json)
+store = load_vectorstore("product", VECTOR_DIR)
 
 query = "Apa manfaat CNI Ginseng Coffee?"
-q_emb = model.encode([query])
+q_emb = embed(query)
+
+D, I = store.search(q_emb, k=3)
+
+for score, label in zip(D[0], I[0]):
+    print("----", round(float(score), 3))
+    print(store.record(label)["text"][:300])
+
+# alias produk (skema products.json: {"nama": [...], "kode": [...]})
+from api.search import ProductIndex
 
-D, I = index.search(q_emb, k=3)
+products = [
+    {"kode": "GC01", "nama": "CNI Ginseng Coffee", "alias": {"nama": ["ginseng kopi"], "kode": ["GKC"]}},
+    {"kode": "SC01", "nama": "Sunchlorella", "alias": {"nama": ["chlorella"], "kode": ["SCL"]}},
+]
+index = ProductIndex(products)
 
-for idx in I[0]:
-    print("----")
-    print(metadata[idx]["text"][:300])
\ No newline at end of file
+assert "nama" not in index.exact and "kode" not in index.exact
+assert index.search("kode sunchlorella")[0]["kode"] == "SC01"
+assert index.search("GKC")[0]["kode"] == "GC01"
+assert index.search("chlorella")[0]["kode"] == "SC01"
+print("alias OK")
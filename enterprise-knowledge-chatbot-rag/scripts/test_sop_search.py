@@ -1,25 +1,11 @@
-import faiss
-import json
 import numpy as np
-import requests
 from config import SOP_VECTOR_DIR
+from api.embedding import embed_text as embed
+from core.vectorstore import load_vectorstore
 
-OLLAMA_EMBED_URL = "http://localhost:11434/api/embeddings"
-EMBED_MODEL = "nomic-embed-text"
 
-
-def embed(text):
-    r = requests.post(
-        OLLAMA_EMBED_URL,
-        json={"model": EMBED_MODEL, "prompt": text}
-    )
-    return r.json()["embedding"]
-
-
-index = faiss.read_index(str(SOP_VECTOR_DIR / "index.faiss"))
-
-with open(SOP_VECTOR_DIR / "metadata.json", "r", encoding="utf-8") as f:
-    metadata = json.load(f)
+store = load_vectorstore("sop", SOP_VECTOR_DIR)
+index = store.index
 
 query = "bagaimana prosedur keluhan?"
 
@@ -33,4 +19,5 @@ print("Query vector dimension:", q_vec.shape[1])
 D, I = index.search(q_vec, k=3)
 
 for idx in I[0]:
-    print(metadata[idx]["doc_id"], metadata[idx]["function"])
\ No newline at end of file
+    record = store.record(idx)  # label IndexIDMap → record
+    print(record["doc_id"], record["function"])
\ No newline at end of file